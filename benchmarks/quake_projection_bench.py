@@ -0,0 +1,76 @@
+"""
+对比Quake请求开启和关闭字段投影时每页的响应大小和JSON解析耗时
+
+用法:
+    python benchmarks/quake_projection_bench.py --key <Quake Token> --query 'app:"nginx"' --size 100 --pages 3
+
+注意每次请求都会消耗Quake积分，关闭和开启投影各请求pages页
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quake_api import QuakeAPI, projection_params
+
+
+def measure(api, query, size, pages):
+    """按指定的投影设置请求pages页，返回响应统计"""
+    api.reset_payload_stats()
+    for page in range(1, pages + 1):
+        result = api.search(query, page=page, size=size)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+    return api.get_payload_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--key", default=os.environ.get("QUAKE_KEY", ""), help="Quake API Token")
+    parser.add_argument("--query", required=True, help="查询语句")
+    parser.add_argument("--size", type=int, default=100, help="每页结果数")
+    parser.add_argument("--pages", type=int, default=3, help="每种设置请求的页数")
+    parser.add_argument("--base-url", default=None, help="API地址，默认使用官方地址")
+    parser.add_argument("--output", default=None, help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    if not args.key:
+        parser.error("请通过--key或QUAKE_KEY环境变量提供Quake API Token")
+
+    api = QuakeAPI(key=args.key)
+    if args.base_url:
+        api.base_url = args.base_url
+
+    api.projection = False
+    full = measure(api, args.query, args.size, args.pages)
+    api.projection = True
+    projected = measure(api, args.query, args.size, args.pages)
+
+    report = {
+        "query": args.query,
+        "size": args.size,
+        "pages": args.pages,
+        "projection": projection_params(api.fields),
+        "full": full,
+        "projected": projected,
+        "bytes_saved_per_page": full["bytes_per_page"] - projected["bytes_per_page"],
+        "decode_ms_saved_per_page": full["decode_ms_per_page"] - projected["decode_ms_per_page"]
+    }
+
+    print(f"{'':<10}{'KB/页':>12}{'解析ms/页':>14}")
+    print(f"{'完整':<10}{full['bytes_per_page'] / 1024:>12.1f}{full['decode_ms_per_page']:>14.2f}")
+    print(f"{'投影':<10}{projected['bytes_per_page'] / 1024:>12.1f}{projected['decode_ms_per_page']:>14.2f}")
+    print(f"每页节省 {report['bytes_saved_per_page'] / 1024:.1f} KB，"
+          f"解析耗时节省 {report['decode_ms_saved_per_page']:.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+无界面（Qt offscreen平台）多次启动VRST，汇总启动耗时报告，用于跟踪启动耗时的变化
+
+用法:
+    python benchmarks/startup_bench.py --runs 5 --output startup.json
+    python benchmarks/startup_bench.py --runs 5 --baseline startup.json --threshold 20
+
+每次启动都通过 main.py --profile-startup --profile-exit 运行，窗口第一次绘制且当前选项卡的页面创建完成后写入报告并退出。
+指定--baseline时与之前保存的结果比较，当前页面创建完成的耗时超出基准threshold%时返回非0退出码。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 汇总时关注的时间点：当前选项卡的页面创建完成后窗口才可以使用，主窗口已显示为窗口第一次绘制
+PAGE_MARK = "当前页面已创建"
+WINDOW_MARK = "主窗口已显示"
+
+
+def run_once(report_file, all_tabs=False, timeout=60):
+    """启动一次程序，返回启动耗时报告"""
+    command = [sys.executable, os.path.join(ROOT, "main.py"),
+               f"--profile-startup={report_file}", "--profile-exit"]
+    if all_tabs:
+        command.append("--profile-all-tabs")
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    env.pop("VRST_PROFILE_STARTUP", None)
+    completed = subprocess.run(command, cwd=ROOT, env=env, timeout=timeout,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, encoding='utf-8', errors='replace')
+    if completed.returncode != 0 or not os.path.exists(report_file):
+        raise RuntimeError(f"启动失败（退出码 {completed.returncode}）:\n{completed.stdout}")
+    with open(report_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def summarize(reports, top=15):
+    """按名称汇总多次启动的耗时，取中位数"""
+    marks = {}
+    phases = {}
+    imports = {}
+    for report in reports:
+        for name, value in report["marks"].items():
+            marks.setdefault(name, []).append(value)
+        for phase in report["phases"]:
+            phases.setdefault(phase["name"], []).append(phase["duration_ms"])
+        for item in report["imports"]["modules"]:
+            # 只统计最外层的导入，嵌套导入的耗时已包含在内
+            if item["depth"] == 0:
+                imports.setdefault(item["module"], []).append(item["cumulative_ms"])
+
+    def median(values):
+        return round(statistics.median(values), 3)
+
+    slowest = sorted(((name, median(values)) for name, values in imports.items()),
+                     key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "runs": len(reports),
+        "total_ms": median([report["total_ms"] for report in reports]),
+        "import_total_ms": median([report["imports"]["total_ms"] for report in reports]),
+        "marks": {name: median(values) for name, values in marks.items()},
+        "phases": {name: median(values) for name, values in phases.items()},
+        "slowest_imports": [{"module": name, "cumulative_ms": value} for name, value in slowest]
+    }
+
+
+def print_summary(summary):
+    print(f"启动 {summary['runs']} 次，各项耗时取中位数（ms）")
+    print(f"{'总耗时':<24}{summary['total_ms']:>10.1f}")
+    print(f"{'模块导入':<24}{summary['import_total_ms']:>10.1f}")
+    print("\n时间点")
+    for name, value in summary["marks"].items():
+        print(f"  {name:<22}{value:>10.1f}")
+    print("\n阶段")
+    for name, value in summary["phases"].items():
+        print(f"  {name:<22}{value:>10.1f}")
+    print("\n耗时最多的导入")
+    for item in summary["slowest_imports"]:
+        print(f"  {item['module']:<40}{item['cumulative_ms']:>10.1f}")
+
+
+def compare(summary, baseline, threshold):
+    """
+    与基准结果比较
+
+    Returns:
+        bool: 当前页面创建完成的耗时是否超出基准threshold%
+    """
+    current = summary["marks"].get(PAGE_MARK)
+    previous = baseline.get("marks", {}).get(PAGE_MARK)
+    if current is None or not previous:
+        print("基准结果中没有当前页面创建完成的耗时，跳过比较")
+        return False
+    change = (current - previous) / previous * 100
+    print(f"\n当前页面创建完成耗时 {current:.1f} ms，基准 {previous:.1f} ms，变化 {change:+.1f}%")
+    return change > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="启动次数")
+    parser.add_argument("--all-tabs", action="store_true", help="写入报告前创建全部选项卡的页面")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的导入数量")
+    parser.add_argument("--output", default=None, help="将汇总结果写入JSON文件")
+    parser.add_argument("--baseline", default=None, help="与之前保存的汇总结果比较")
+    parser.add_argument("--threshold", type=float, default=20.0, help="允许超出基准的百分比")
+    args = parser.parse_args()
+
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(args.runs):
+            report = run_once(os.path.join(directory, f"startup_{run}.json"), args.all_tabs)
+            reports.append(report)
+            print(f"第 {run + 1} 次: 当前页面创建完成 {report['marks'].get(PAGE_MARK, 0):.1f} ms，"
+                  f"主窗口显示 {report['marks'].get(WINDOW_MARK, 0):.1f} ms，"
+                  f"总耗时 {report['total_ms']:.1f} ms")
+
+    summary = summarize(reports, args.top)
+    print()
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(summary, baseline, args.threshold):
+            print(f"启动耗时超出基准 {args.threshold}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
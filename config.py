@@ -15,7 +15,28 @@ class Config:
             'afrog_path': '',
             'last_region': '全部',
             'last_query': '',
-            'fingerprint_update_url': ''
+            'fingerprint_update_url': '',
+            'fofa_concurrency': 5,
+            'quake_concurrency': 1,
+            'http_pool_connections': 10,
+            'http_pool_maxsize': 10,
+            'fetch_all_limit': 10000,
+            'cache_enabled': True,
+            'cache_ttl': 86400,
+            'cache_max_mb': 200,
+            'fofa_rate': 2.0,
+            'fofa_burst': 2,
+            'quake_rate': 1.0,
+            'quake_burst': 1,
+            'retry_max_attempts': 4,
+            'retry_base_delay': 1.0,
+            'retry_max_delay': 30.0,
+            'batch_preflight': True,
+            'quake_projection': True,
+            'stream_batch_size': 200,
+            'quota_refresh_interval': 300,
+            'page_prefetch_depth': 1,
+            'page_cache_mb': 64
         }
         # 加载配置文件，如果不存在则创建
         self.load_config()
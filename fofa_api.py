@@ -1,20 +1,30 @@
+import asyncio
 import base64
-import requests
 import json
-from pypinyin import pinyin, Style
 from urllib.parse import quote
 
+from utils import http_session, async_http, rate_limit, retry, regions, json_stream, quota
+
 """
-翻译中文城市
+翻译中文城市，优先查预先生成的对照表，表中没有的名称才使用pypinyin转换
 """
 def trans(str):
-    str = str[:-1]
-    trans_list = []
-    for pinyin_name in pinyin(str, style=Style.NORMAL):
-        for pinyin_name_ in pinyin_name:
-            pinyin_name__ = pinyin_name_.capitalize()
-            trans_list.append(pinyin_name__)
-    return ''.join(trans_list)
+    return regions.to_fofa(str)
+
+
+async def _single(coro):
+    """把单个协程的结果包装为只产出一项的异步生成器"""
+    yield await coro
+
+
+class FofaSearchError(Exception):
+    """逐页检索时遇到的错误，result为出错页的返回数据"""
+
+    def __init__(self, result):
+        super().__init__(str(result.get("error", "未知错误")))
+        self.result = result
+
+
 class FofaAPI:
     """FOFA API调用类"""
 
@@ -22,30 +32,29 @@ class FofaAPI:
         self.email = email
         self.key = key
         self.base_url = "https://fofa.info/api/v1/search/all"
+        self.info_url = "https://fofa.info/api/v1/info/my"
+        # 查询结果缓存，为None时不使用缓存
+        self.cache = None
+        self.use_cache = True
+        # 请求失败时的重试策略
+        self.retry_policy = retry.RetryPolicy()
 
     def set_credentials(self, email, key):
         """设置FOFA API凭证"""
         self.email = email
         self.key = key
 
-    def search(self, query, region=None, page=1, size=1000):
+    def build_query(self, query, region=None):
         """
-        搜索FOFA
+        拼接地区筛选条件
 
         Args:
             query: FOFA查询语句
-            region: 省份筛选，None表示全部
-            city: 城市筛选，None表示全部
-            page: 页码，从1开始
-            size: 每页结果数，最大为10000
+            region: 省份或"省份 城市"，None表示全部
 
         Returns:
-            dict: 包含查询结果的字典
+            str: 最终的查询语句
         """
-        if not self.email or not self.key:
-            return {"error": "FOFA API凭证未配置"}
-
-        # 处理地区筛选
         if region and region != "全部":
             if ' ' in region:  # 处理"省份 城市"格式
                 province, city = region.split(' ', 1)
@@ -54,39 +63,319 @@ class FofaAPI:
                 query = f"{query} && region=\"{province}\" && city=\"{city.lower()}\""
             else:  # 单独省份
                 query = f"{query} && region=\"{region}\""
+        return query
+
+    def build_params(self, query, region=None, page=1, size=1000):
+        """构造请求参数"""
+        # 处理地区筛选
+        query = self.build_query(query, region)
 
         # 对查询语句进行Base64编码
         encoded_query = base64.b64encode(query.encode()).decode()
 
-        # 构造请求参数
-        params = {
+        return {
             "key": self.key,
             "qbase64": encoded_query,
             "page": page,
             "size": size,
             "fields": "host,ip,port,protocol,title,domain,server,city"
         }
-        # print(params)
+
+    def cache_key(self, query, region, page, size):
+        """生成缓存键，未启用缓存时返回None"""
+        if self.cache is None or not self.use_cache:
+            return None
+        fields = "host,ip,port,protocol,title,domain,server,city"
+        return self.cache.make_key("fofa", self.build_query(query, region), region, page, size, fields)
+
+    def cached_result(self, cache_key):
+        """读取缓存的结果，未命中时返回None"""
+        if not cache_key:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached["from_cache"] = True
+        return cached
+
+    def cache_result(self, cache_key, result):
+        """缓存查询成功的结果"""
+        if cache_key and not ("error" in result and result["error"] is not False):
+            self.cache.put(cache_key, "fofa", result)
+        return result
+
+    @staticmethod
+    def record_usage(result):
+        """记录一次请求消耗的查询次数和数据条数"""
+        if "error" not in result or result["error"] is False:
+            quota.record("fofa", requests=1, rows=len(result.get("results", [])))
+        return result
+
+    def get_account_info(self):
+        """
+        获取账户剩余额度，并更新额度跟踪
+
+        Returns:
+            dict: requests为剩余查询次数，rows为剩余数据条数，points为F点，出错时包含error
+        """
+        if not self.key:
+            return {"error": "FOFA API凭证未配置"}
         try:
-            # 发送请求
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()  # 如果响应状态码不是200，抛出异常
-
-            # 解析响应
-            result = response.json()
-            # print(result)
-            # 检查是否有错误
-            if "error" in result and result["error"] is not False:
-                return {"error": result.get("errmsg", "未知错误")}
+            response = http_session.get(self.info_url, params={"key": self.key}, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            return {"error": f"获取账户信息失败: {str(e)}"}
+        if data.get("error"):
+            return {"error": data.get("errmsg", "获取账户信息失败")}
 
-            return result
-        except requests.exceptions.RequestException as e:
+        info = {
+            "requests": data.get("remain_api_query"),
+            "rows": data.get("remain_api_data"),
+            "points": data.get("fofa_point")
+        }
+        quota.update("fofa", info)
+        return info
+
+    @staticmethod
+    def http_error(status, retry_after=None):
+        """构造HTTP请求失败的结果，并标记是否可重试或致命"""
+        if status in retry.FATAL_STATUS:
+            return {"error": f"请求错误: HTTP {status}，请检查FOFA API凭证", "fatal": True}
+        return {
+            "error": f"请求错误: HTTP {status}",
+            "retryable": status in retry.RETRYABLE_STATUS,
+            "retry_after": retry.parse_retry_after(retry_after)
+        }
+
+    @staticmethod
+    def parse_result(result):
+        """检查FOFA返回的数据是否包含错误"""
+        if "error" in result and result["error"] is not False:
+            return {"error": result.get("errmsg", "未知错误")}
+        return result
+
+    def search(self, query, region=None, page=1, size=1000):
+        """
+        搜索FOFA，在共享事件循环中执行async_search并等待结果
+
+        Args:
+            query: FOFA查询语句
+            region: 省份筛选，None表示全部
+            page: 页码，从1开始
+            size: 每页结果数，最大为10000
+
+        Returns:
+            dict: 包含查询结果的字典
+        """
+        return async_http.run(self.async_search(query, region, page, size))
+
+    async def async_search(self, query, region=None, page=1, size=1000):
+        """search的协程版本，参数和返回值与search一致"""
+        if not self.email or not self.key:
+            return {"error": "FOFA API凭证未配置"}
+
+        # 优先使用缓存，SQLite的读写放到线程池中，不阻塞事件循环中的其他请求
+        loop = asyncio.get_running_loop()
+        cache_key = self.cache_key(query, region, page, size)
+        if cache_key:
+            cached = await loop.run_in_executor(None, self.cached_result, cache_key)
+            if cached is not None:
+                return cached
+
+        params = self.build_params(query, region, page, size)
+        result = await retry.run_with_retry(lambda: self.async_search_once(params), self.retry_policy)
+        result = self.record_usage(result)
+        if cache_key:
+            await loop.run_in_executor(None, self.cache_result, cache_key, result)
+        return result
+
+    async def async_search_once(self, params):
+        """发送一次搜索请求，失败时在结果中标记是否可重试或致命"""
+        try:
+            # 按FOFA的频率限制等待令牌，等待期间不占用线程
+            await rate_limit.get_limiter("fofa").acquire_async()
+
+            session = await async_http.get_session()
+            async with session.get(self.base_url, params=params,
+                                   timeout=async_http.timeout(30)) as response:
+                if response.status in retry.RETRYABLE_STATUS or response.status in retry.FATAL_STATUS:
+                    return self.http_error(response.status, response.headers.get("Retry-After"))
+                response.raise_for_status()  # 如果响应状态码不是200，抛出异常
+                content = await response.read()
+
+            # 大页面的JSON解析放到线程池中，不阻塞其他请求
+            payload = await asyncio.get_running_loop().run_in_executor(None, json.loads, content)
+            return retry.classify(self.parse_result(payload))
+        except (async_http.ClientConnectionError, async_http.ClientPayloadError, asyncio.TimeoutError) as e:
+            return {"error": f"请求错误: {str(e)}", "retryable": True}
+        except async_http.ClientError as e:
             return {"error": f"请求错误: {str(e)}"}
-        except json.JSONDecodeError:
+        except ValueError:
             return {"error": "解析响应失败"}
         except Exception as e:
             return {"error": f"未知错误: {str(e)}"}
 
+    def stream_search(self, query, region=None, page=1, size=1000, batch_size=500):
+        """
+        流式获取一页结果，边接收响应边解析，每解析出batch_size条结果就返回一批
+
+        不经过缓存，适合一次请求大量结果的场景
+
+        Yields:
+            dict: 每批结果，包含results和size，出错时为带error的结果字典
+        """
+        yield from async_http.iterate(self.async_stream_search(query, region, page, size, batch_size))
+
+    async def async_stream_search(self, query, region=None, page=1, size=1000, batch_size=500):
+        """stream_search的异步生成器版本"""
+        if not self.email or not self.key:
+            yield {"error": "FOFA API凭证未配置"}
+            return
+
+        params = self.build_params(query, region, page, size)
+        requested = False
+        async for result in retry.iter_with_retry(lambda: self.async_stream_once(params, batch_size),
+                                                  self.retry_policy):
+            if "error" not in result or result["error"] is False:
+                quota.record("fofa", requests=0 if requested else 1, rows=len(result.get("results", [])))
+                requested = True
+            yield result
+
+    async def async_stream_once(self, params, batch_size=500):
+        """发送一次流式搜索请求，失败时产出标记了是否可重试或致命的结果"""
+        try:
+            await rate_limit.get_limiter("fofa").acquire_async()
+
+            session = await async_http.get_session()
+            async with session.get(self.base_url, params=params,
+                                   timeout=async_http.timeout(30)) as response:
+                if response.status in retry.RETRYABLE_STATUS or response.status in retry.FATAL_STATUS:
+                    yield self.http_error(response.status, response.headers.get("Retry-After"))
+                    return
+                response.raise_for_status()
+
+                decoder = json_stream.ArrayStreamDecoder("results", response.charset or 'utf-8')
+                batch = []
+                delivered = False
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    batch.extend(decoder.feed(chunk))
+                    if len(batch) >= batch_size:
+                        yield {"results": batch, "size": decoder.fields.get("size", 0)}
+                        delivered = True
+                        batch = []
+                fields = decoder.close()
+
+            # 错误信息在顶层字段中
+            result = self.parse_result(fields)
+            if "error" in result and result["error"] is not False:
+                yield retry.classify(result)
+                return
+            if batch or not delivered:
+                yield {"results": batch, "size": fields.get("size", 0)}
+        except (async_http.ClientConnectionError, async_http.ClientPayloadError, asyncio.TimeoutError) as e:
+            yield {"error": f"请求错误: {str(e)}", "retryable": True}
+        except async_http.ClientError as e:
+            yield {"error": f"请求错误: {str(e)}"}
+        except ValueError:
+            yield {"error": "解析响应失败"}
+        except Exception as e:
+            yield {"error": f"未知错误: {str(e)}"}
+
+    def count(self, query, region=None):
+        """
+        只获取结果总数，请求1条结果以减少消耗
+
+        Returns:
+            dict: size为结果总数，出错时包含error
+        """
+        result = self.search(query=query, region=region, page=1, size=1)
+        if "error" in result and result["error"] is not False:
+            return result
+        return {"size": result.get("size", 0)}
+
+    async def async_count(self, query, region=None):
+        """count的协程版本"""
+        result = await self.async_search(query=query, region=region, page=1, size=1)
+        if "error" in result and result["error"] is not False:
+            return result
+        return {"size": result.get("size", 0)}
+
+    def iter_pages(self, query, region=None, limit=10000, page_size=1000, batch_size=None):
+        """
+        逐页获取查询结果，直到取满limit条或没有更多数据
+
+        每次只请求并返回一页，调用方处理完一页再请求下一页，内存占用与总页数无关
+
+        Args:
+            query: FOFA查询语句
+            region: 省份筛选，None表示全部
+            limit: 最多获取的结果数
+            page_size: 每页结果数，最大为10000
+            batch_size: 不为None时使用流式解析，每页按batch_size条分批返回，
+                        第一批结果不必等待整页响应下载完成
+
+        Yields:
+            dict: 每一页（或每一批）的查询结果，最后一页的results会被截断到limit
+
+        Raises:
+            FofaSearchError: 某一页查询失败
+        """
+        for result in async_http.iterate(self.async_iter_pages(query, region, limit, page_size, batch_size)):
+            # 任务已取消时iterate最后产出取消的结果
+            if result.get("cancelled"):
+                raise FofaSearchError(result)
+            yield result
+
+    async def async_iter_pages(self, query, region=None, limit=10000, page_size=1000, batch_size=None):
+        """iter_pages的异步生成器版本，参数、产出的结果和异常与iter_pages一致"""
+        fetched = 0
+        page = 1
+        while fetched < limit:
+            if batch_size:
+                batches = self.async_stream_search(query, region=region, page=page, size=page_size,
+                                                   batch_size=batch_size)
+            else:
+                batches = _single(self.async_search(query=query, region=region, page=page, size=page_size))
+
+            page_rows = 0
+            total = 0
+            try:
+                async for result in batches:
+                    if "error" in result and result["error"] is not False:
+                        raise FofaSearchError(result)
+
+                    rows = result.get("results", [])
+                    total = min(result.get("size", 0), limit)
+                    if fetched + len(rows) > limit:
+                        rows = rows[:limit - fetched]
+                        result["results"] = rows
+                    fetched += len(rows)
+                    page_rows += len(rows)
+
+                    yield result
+
+                    if fetched >= limit:
+                        break
+            finally:
+                # 提前结束时关闭流式请求，释放连接
+                await batches.aclose()
+
+            # 不足一页或已取完全部结果时停止
+            if page_rows < page_size or fetched >= total:
+                break
+            page += 1
+
+    def iter_search(self, query, region=None, limit=10000, page_size=1000, batch_size=None):
+        """
+        逐条返回查询结果，自动翻页，参数同iter_pages
+
+        Yields:
+            list: 单条结果，字段顺序与search返回的fields一致
+        """
+        for result in self.iter_pages(query, region=region, limit=limit, page_size=page_size,
+                                      batch_size=batch_size):
+            yield from result.get("results", [])
+
     def get_regions(self):
         """
         获取FOFA支持的地区列表
@@ -8,25 +8,67 @@
 @Software: PyCharm
 """
 
+import time
+
+# 记录启动开始的时间，用于统计窗口出现前的耗时
+STARTUP_BEGIN = time.perf_counter()
+
+import sys
+
+# 启动耗时分析需要在导入其他模块之前启用，才能统计到全部模块的导入耗时
+from utils import startup_profiler
+startup_profiler.enable_from_args(sys.argv, STARTUP_BEGIN)
+
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
-import sys
+from PyQt5.QtCore import QTimer
 import os
 
 from config import Config
+from utils import http_session, rate_limit
 from ui.main_window import MainWindow
-from ui.main_page import MainPage
-from ui.config_page import ConfigPage
-from ui.tools_intro_page import ToolsIntroPage
-from ui.about_page import AboutPage
-from ui.vulnerability_fingerprint_page import VulnerabilityFingerprintPage
-from ui.vulnerability_page import VulnerabilityPage
+
+# 启动到当前选项卡页面创建完成的耗时预算（毫秒），超出时打印提示
+STARTUP_BUDGET_MS = 1000
+
+# 启动耗时统计的时间点
+WINDOW_MARK = "主窗口已显示"
+PAGE_MARK = "当前页面已创建"
+
+
+def report_startup_time():
+    """在当前选项卡的页面创建完成后统计启动耗时，此时窗口才可以使用"""
+    elapsed = (time.perf_counter() - STARTUP_BEGIN) * 1000
+    print(f"当前页面已创建，启动耗时 {elapsed:.0f} ms")
+    if elapsed > STARTUP_BUDGET_MS:
+        print(f"启动耗时超出预算 {STARTUP_BUDGET_MS} ms")
+    startup_profiler.mark(PAGE_MARK)
+
+
+def finish_startup_profile(app, main_window):
+    """
+    窗口第一次绘制且当前选项卡的页面创建完成后写入启动耗时报告
+
+    两个时间点的先后顺序与平台有关，每个时间点之后各调用一次，两者都记录后才写入报告
+    """
+    profiler = startup_profiler.get_profiler()
+    if profiler is None or WINDOW_MARK not in profiler.marks or PAGE_MARK not in profiler.marks:
+        return
+    if profiler.all_tabs:
+        for index in range(main_window.tab_widget.count()):
+            main_window.ensure_tab(index)
+        startup_profiler.mark("全部页面已创建")
+    startup_profiler.finish()
+    if profiler.exit_after_report:
+        app.quit()
+
 
 def main():
 
     """应用程序入口点"""
     # 创建QApplication实例
-    app = QApplication(sys.argv)
+    with startup_profiler.phase("创建QApplication"):
+        app = QApplication(sys.argv)
 
     # 设置应用程序图标 - 优化Windows平台图标显示
     # 定义可能的图标路径列表，按优先级排序
@@ -59,44 +101,88 @@ def main():
         print("警告: 未找到有效的应用图标文件")
 
     # 创建配置实例（配置会在初始化时自动加载）
-    config = Config()
+    with startup_profiler.phase("加载配置"):
+        config = Config()
+
+    # 按配置初始化共享的HTTP连接池
+    http_session.configure(
+        pool_connections=config.get('http_pool_connections', http_session.DEFAULT_POOL_CONNECTIONS),
+        pool_maxsize=config.get('http_pool_maxsize', http_session.DEFAULT_POOL_MAXSIZE)
+    )
+
+    # 按配置初始化各引擎的请求限速
+    for engine in ('fofa', 'quake'):
+        default_rate, default_burst = rate_limit.DEFAULT_LIMITS[engine]
+        rate_limit.configure(
+            engine,
+            config.get(f'{engine}_rate', default_rate),
+            config.get(f'{engine}_burst', default_burst)
+        )
 
     # 创建主窗口
-    main_window = MainWindow(config)
+    with startup_profiler.phase("创建主窗口"):
+        main_window = MainWindow(config)
 
-    # 创建配置页面
-    config_page = ConfigPage(config)
-    
-    # 创建主页面
-    main_page = MainPage(config)
-    
-    # 创建工具介绍页面
-    tools_intro_page = ToolsIntroPage()
-    VulnerabilityFingerprint_Page = VulnerabilityFingerprintPage(config)
-    # 创建关于页面
-    about_page = AboutPage()
-    
-    # 创建漏洞页面
-    vulnerability_page = VulnerabilityPage()
+    # 各页面在第一次切换到时才导入和创建，窗口先显示出来
+    def create_main_page():
+        # 创建主页面
+        from ui.main_page import MainPage
+        from utils.async_loop import get_task_runner
+        main_page = MainPage(config)
+        # 连接主页面的状态变化信号到主窗口的状态栏
+        main_page.status_changed.connect(main_window.set_status)
+        main_page.quota_changed.connect(main_window.set_quota_status)
+        # 退出前停止asyncio事件循环线程
+        app.aboutToQuit.connect(get_task_runner().stop)
+        return main_page
+
+    def create_vulnerability_fingerprint_page():
+        from ui.vulnerability_fingerprint_page import VulnerabilityFingerprintPage
+        VulnerabilityFingerprint_Page = VulnerabilityFingerprintPage(config)
+        # 连接漏洞指纹页面的状态变化信号到主窗口的状态栏
+        VulnerabilityFingerprint_Page.status_changed.connect(main_window.set_status)
+        return VulnerabilityFingerprint_Page
+
+    def create_vulnerability_page():
+        # 创建漏洞页面
+        from ui.vulnerability_page import VulnerabilityPage
+        vulnerability_page = VulnerabilityPage()
+        # 连接漏洞页面的状态变化信号到主窗口的状态栏
+        vulnerability_page.status_changed.connect(main_window.set_status)
+        return vulnerability_page
+
+    def create_config_page():
+        # 创建配置页面
+        from ui.config_page import ConfigPage
+        return ConfigPage(config)
+
+    def create_tools_intro_page():
+        # 创建工具介绍页面
+        from ui.tools_intro_page import ToolsIntroPage
+        return ToolsIntroPage()
+
+    def create_about_page():
+        # 创建关于页面
+        from ui.about_page import AboutPage
+        return AboutPage()
 
     # 将页面添加到主窗口
-    main_window.add_tab(main_page, "检索")
-    main_window.add_tab(VulnerabilityFingerprint_Page, "指纹")
-    main_window.add_tab(vulnerability_page, "漏洞")
-    main_window.add_tab(config_page, "配置")
-    main_window.add_tab(tools_intro_page, "工具")
-    main_window.add_tab(about_page, "关于")
-
-    # 连接主页面的状态变化信号到主窗口的状态栏
-    # 连接漏洞页面的状态变化信号到主窗口的状态栏
-    vulnerability_page.status_changed.connect(main_window.set_status)
-
-    main_page.status_changed.connect(main_window.set_status)
-    
-    # 连接漏洞指纹页面的状态变化信号到主窗口的状态栏
-    VulnerabilityFingerprint_Page.status_changed.connect(main_window.set_status)
+    main_window.add_lazy_tab(create_main_page, "检索")
+    main_window.add_lazy_tab(create_vulnerability_fingerprint_page, "指纹")
+    main_window.add_lazy_tab(create_vulnerability_page, "漏洞")
+    main_window.add_lazy_tab(create_config_page, "配置")
+    main_window.add_lazy_tab(create_tools_intro_page, "工具")
+    main_window.add_lazy_tab(create_about_page, "关于")
 
-    # 显示主窗口
+    # 显示主窗口，当前选项卡的页面在窗口出现后创建
+    main_window.current_tab_ready.connect(report_startup_time)
+    main_window.first_painted.connect(lambda: startup_profiler.mark(WINDOW_MARK))
+    if startup_profiler.is_enabled():
+        # 不在绘制过程中创建其他页面和写入报告
+        main_window.current_tab_ready.connect(
+            lambda: QTimer.singleShot(0, lambda: finish_startup_profile(app, main_window)))
+        main_window.first_painted.connect(
+            lambda: QTimer.singleShot(0, lambda: finish_startup_profile(app, main_window)))
     main_window.show()
 
     # 运行应用程序的事件循环
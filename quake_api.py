@@ -1,8 +1,57 @@
-import requests
+import asyncio
 import base64
 import json
+import threading
 import time
-import random
+
+from utils import http_session, async_http, rate_limit, retry, regions, json_stream, quota
+
+# 结果表格显示的字段，与format_result的输出顺序一致
+FIELDS = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
+
+# 每个显示字段在Quake返回数据中对应的字段路径，用于include参数，只返回需要的数据
+FIELD_PATHS = {
+    "host": ["ip", "port"],
+    "ip": ["ip"],
+    "port": ["port"],
+    "protocol": ["service.name"],
+    "title": ["title"],
+    "domain": ["domain"],
+    "server": ["service.http.server"],
+    "city": ["country", "province", "city"]
+}
+
+# 无法使用include时通过exclude排除的大字段（响应正文、证书、原始banner等）
+HEAVY_PATHS = ["service.response", "service.http.body", "service.http.response_headers",
+               "service.http.favicon", "service.cert", "service.tls", "images"]
+
+
+def projection_params(fields):
+    """
+    根据显示字段生成字段投影参数
+
+    Args:
+        fields: 需要的显示字段
+
+    Returns:
+        dict: 所有字段都有对应路径时为include，否则为exclude
+    """
+    if all(field in FIELD_PATHS for field in fields):
+        include = []
+        for field in fields:
+            for path in FIELD_PATHS[field]:
+                if path not in include:
+                    include.append(path)
+        return {"include": include}
+    return {"exclude": list(HEAVY_PATHS)}
+
+
+class QuakeSearchError(Exception):
+    """逐页检索时遇到的错误，result为出错页的返回数据"""
+
+    def __init__(self, result):
+        super().__init__(str(result.get("error", "未知错误")))
+        self.result = result
 
 
 class QuakeAPI:
@@ -15,89 +64,422 @@ class QuakeAPI:
             "Content-Type": "application/json",
             "X-QuakeToken": key
         }
+        # 查询结果缓存，为None时不使用缓存
+        self.cache = None
+        self.use_cache = True
+        # 请求失败时的重试策略
+        self.retry_policy = retry.RetryPolicy()
+        # 需要的字段，开启projection时只请求这些字段对应的数据
+        self.fields = list(FIELDS)
+        self.projection = True
+        # 响应大小和JSON解析耗时统计
+        self.payload_stats = {"pages": 0, "bytes": 0, "decode_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def build_query(self, query, region=None):
+        """拼接地区筛选条件"""
+        if region:
+            region_parts = region.strip().split(' ', 1)
+            if len(region_parts) == 2:  # 包含省份和城市
+                province, city = region_parts
+                query = f"{query} AND province:\"{province}\" AND city:\"{regions.to_quake(city)}\""
+            elif region_parts[0]:  # 只有省份
+                query = f"{query} AND province:\"{region_parts[0]}\""
+        return query
+
+    def build_data(self, query, region=None, page=1, size=100, start_time=None):
+        """
+        构建请求数据
+
+        Args:
+            start_time: 只检索该时间之后更新的数据，为datetime或None
+        """
+        data = {
+            "query": self.build_query(query, region),
+            "start": (page - 1) * size,
+            "size": size,
+        }
+        if start_time is not None:
+            data["start_time"] = start_time.strftime("%Y-%m-%d %H:%M:%S")
+            data["end_time"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if self.projection:
+            data.update(projection_params(self.fields))
+        return data
+
+    def cache_key(self, query, region, page, size):
+        """生成缓存键，未启用缓存时返回None"""
+        if self.cache is None or not self.use_cache:
+            return None
+        return self.cache.make_key("quake", self.build_query(query, region), region, page, size, self.fields)
+
+    def decode_payload(self, content):
+        """解析响应JSON，并记录响应大小和解析耗时"""
+        start = time.perf_counter()
+        payload = json.loads(content)
+        self.record_payload(len(content), time.perf_counter() - start)
+        return payload
+
+    def record_payload(self, size, seconds):
+        """记录一页响应的字节数和解析耗时"""
+        with self._stats_lock:
+            self.payload_stats["pages"] += 1
+            self.payload_stats["bytes"] += size
+            self.payload_stats["decode_seconds"] += seconds
+
+    def get_payload_stats(self):
+        """
+        获取响应大小和JSON解析耗时统计
+
+        Returns:
+            dict: 请求页数、总字节数、总解析秒数，以及每页平均字节数和平均解析毫秒数
+        """
+        with self._stats_lock:
+            stats = dict(self.payload_stats)
+        pages = stats["pages"]
+        stats["bytes_per_page"] = stats["bytes"] / pages if pages else 0
+        stats["decode_ms_per_page"] = stats["decode_seconds"] * 1000 / pages if pages else 0.0
+        return stats
+
+    def reset_payload_stats(self):
+        """清空响应统计"""
+        with self._stats_lock:
+            self.payload_stats = {"pages": 0, "bytes": 0, "decode_seconds": 0.0}
+
+    def cached_result(self, cache_key):
+        """读取缓存的结果，未命中时返回None"""
+        if not cache_key:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached["from_cache"] = True
+        return cached
+
+    def cache_result(self, cache_key, result):
+        """缓存查询成功的结果"""
+        if cache_key and "error" not in result:
+            self.cache.put(cache_key, "quake", result)
+        return result
+
+    @staticmethod
+    def record_usage(result, requests=1):
+        """记录一次请求消耗的积分，Quake按返回的数据条数扣除"""
+        if "error" not in result:
+            quota.record("quake", requests=requests, rows=len(result.get("results", [])))
+        return result
+
+    def get_account_info(self):
+        """
+        获取账户剩余积分，并更新额度跟踪
+
+        Returns:
+            dict: rows为剩余积分，出错时包含error
+        """
+        if not self.key:
+            return {"error": "Quake API凭证未配置"}
+        try:
+            response = http_session.get(f"{self.base_url}/user/info", headers=self.headers, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            return {"error": f"获取账户信息失败: {str(e)}"}
+        if data.get("code", 0) != 0:
+            return {"error": f"获取账户信息失败: {data.get('message', '未知错误')}"}
+
+        account = data.get("data", {})
+        if "month_remaining_credit" in account or "constant_credit" in account:
+            credit = account.get("month_remaining_credit", 0) + account.get("constant_credit", 0)
+        else:
+            credit = account.get("credit")
+        info = {"requests": None, "rows": credit}
+        quota.update("quake", info)
+        return info
+
+    @staticmethod
+    def http_error(status, text, retry_after=None):
+        """构造HTTP请求失败的结果，并标记是否可重试或致命"""
+        result = {
+            "error": f"API请求失败: {status} {text}",
+            "results": [],
+            "size": 0
+        }
+        if status in retry.RETRYABLE_STATUS:
+            result["retryable"] = True
+            result["retry_after"] = retry.parse_retry_after(retry_after)
+        elif status in retry.FATAL_STATUS:
+            result["fatal"] = True
+        return retry.classify(result)
 
-    def search(self, query, region=None, page=1, size=100):
+    @staticmethod
+    def format_result(result):
         """
-        搜索主机
+        检查Quake返回的数据并格式化，使其与FOFA API结果格式一致
+
+        Args:
+            result: Quake接口返回的JSON数据
+
+        Returns:
+            dict: 包含results、fields和size的字典
+        """
+        # 检查是否有错误，错误信息中带上错误码，用于判断是否需要停止检索
+        if "code" in result and result["code"] != 0:
+            return {
+                "error": f"API返回错误: [{result['code']}] {result.get('message', '未知错误')}",
+                "results": [],
+                "size": 0
+            }
+
+        # 格式化结果，使其与FOFA API结果格式一致
+        formatted_results = [QuakeAPI.format_item(item) for item in result.get("data", [])]
+        formatted = QuakeAPI.format_meta(result.get("meta", {}), len(formatted_results))
+        formatted["results"] = formatted_results
+        return formatted
+
+    @staticmethod
+    def format_item(item):
+        """将Quake返回的单条数据转换为FIELDS顺序的结果行"""
+        host = f"{item.get('ip', '')}:{item.get('port', '')}"
+        ip = item.get('ip', '')
+        port = str(item.get('port', ''))
+        protocol = item.get('service', {}).get('name', '')
+        title = item.get('title', '')
+        domain = item.get('domain', '')
+        server = item.get('service', {}).get('http', {}).get('server', '')
+        city = f"{item.get('country', '')} {item.get('province', '')} {item.get('city', '')}".strip()
+        return [host, ip, port, protocol, title, domain, server, city]
+
+    @staticmethod
+    def format_meta(meta, count=0):
+        """根据meta生成结果的fields、size和pagination_id，count为没有总数时使用的结果数"""
+        formatted = {
+            "fields": list(FIELDS),
+            "size": meta.get("total", meta.get("pagination", {}).get("total", count))
+        }
+
+        # 滚动翻页接口返回的游标，用于请求下一页
+        pagination_id = meta.get("pagination_id") or meta.get("pagination", {}).get("pagination_id")
+        if pagination_id:
+            formatted["pagination_id"] = pagination_id
+        return formatted
+
+    def count(self, query, region=None):
+        """
+        只获取结果总数，请求1条结果以减少积分消耗
+
+        Returns:
+            dict: size为结果总数，出错时包含error
+        """
+        result = self.search(query=query, region=region, page=1, size=1)
+        if "error" in result:
+            return result
+        return {"size": result.get("size", 0)}
+
+    async def async_count(self, query, region=None):
+        """count的协程版本"""
+        result = await self.async_search(query=query, region=region, page=1, size=1)
+        if "error" in result:
+            return result
+        return {"size": result.get("size", 0)}
+
+    def search(self, query, region=None, page=1, size=100, start_time=None):
+        """
+        搜索主机，在共享事件循环中执行async_search并等待结果
         :param query: 查询语句
         :param region: 地区
         :param page: 页码
         :param size: 每页数量
+        :param start_time: 只检索该时间之后更新的数据，为datetime或None，按时间检索的结果不缓存
         :return: 搜索结果
         """
-        # print(region)
+        return async_http.run(self.async_search(query, region, page, size, start_time))
+
+    async def async_search(self, query, region=None, page=1, size=100, start_time=None):
+        """search的协程版本，参数和返回值与search一致"""
+        # 优先使用缓存，SQLite的读写放到线程池中，不阻塞事件循环中的其他请求
+        loop = asyncio.get_running_loop()
+        cache_key = self.cache_key(query, region, page, size) if start_time is None else None
+        if cache_key:
+            cached = await loop.run_in_executor(None, self.cached_result, cache_key)
+            if cached is not None:
+                return cached
+
+        # 构建请求数据
+        data = self.build_data(query, region, page, size, start_time)
+        result = await retry.run_with_retry(lambda: self.async_search_once(data), self.retry_policy)
+        result = self.record_usage(result)
+        if cache_key:
+            await loop.run_in_executor(None, self.cache_result, cache_key, result)
+        return result
+
+    async def async_search_once(self, data, path="/search/quake_service"):
+        """发送一次搜索请求，失败时在结果中标记是否可重试或致命"""
         try:
-            # 构建查询语句
-            if region:
-                region_parts = region.strip().split(' ', 1)
-                if len(region_parts) == 2:  # 包含省份和城市
-                    province, city = region_parts
-                    query = f"{query} AND province:\"{province}\" AND city:\"{city}\""
-                elif region_parts[0]:  # 只有省份
-                    query = f"{query} AND province:\"{region_parts[0]}\""
-            # print(query)
-            # 构建请求数据
-            data = {
-                "query": query,
-                "start": (page - 1) * size,
-                "size": size,
-            }
-            # print(data)
-            # 添加1-2秒随机延迟，避免API请求过于频繁
-            delay = random.uniform(1, 2)
-            time.sleep(delay)
-            
-            # 发送请求
-            response = requests.post(
-                f"{self.base_url}/search/quake_service",
+            # 按Quake的频率限制等待令牌，多个请求同时进行时也会依次放行，等待期间不占用线程
+            await rate_limit.get_limiter("quake").acquire_async()
+
+            session = await async_http.get_session()
+            async with session.post(
+                f"{self.base_url}{path}",
                 headers=self.headers,
-                json=data
-            )
-
-            # 检查响应状态
-            if response.status_code != 200:
-                return {
-                    "error": f"API请求失败: {response.status_code} {response.text}",
-                    "results": [],
-                    "size": 0
-                }
-
-            # 解析响应
-            result = response.json()
-
-            # 检查是否有错误
-            if "code" in result and result["code"] != 0:
-                return {
-                    "error": f"API返回错误: {result.get('message', '未知错误')}",
-                    "results": [],
-                    "size": 0
-                }
-
-            # 格式化结果，使其与FOFA API结果格式一致
-            formatted_results = []
-            fields = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
-
-            for item in result.get("data", []):
-                host = f"{item.get('ip', '')}:{item.get('port', '')}"
-                ip = item.get('ip', '')
-                port = str(item.get('port', ''))
-                protocol = item.get('service', {}).get('name', '')
-                title = item.get('title', '')
-                domain = item.get('domain', '')
-                server = item.get('service', {}).get('http', {}).get('server', '')
-                city = f"{item.get('country', '')} {item.get('province', '')} {item.get('city', '')}".strip()
-
-                formatted_results.append([host, ip, port, protocol, title, domain, server, city])
+                json=data,
+                timeout=async_http.timeout(30)
+            ) as response:
+                # 检查响应状态
+                if response.status != 200:
+                    return self.http_error(response.status, await response.text(errors="replace"),
+                                           response.headers.get("Retry-After"))
+                content = await response.read()
+
+            # 大页面的JSON解析放到线程池中，不阻塞其他请求
+            payload = await asyncio.get_running_loop().run_in_executor(None, self.decode_payload, content)
+            return retry.classify(self.format_result(payload))
 
+        except (async_http.ClientConnectionError, async_http.ClientPayloadError, asyncio.TimeoutError) as e:
             return {
-                "results": formatted_results,
-                "fields": fields,
-                "size": result.get("meta", {}).get("total", len(formatted_results))
+                "error": f"请求出错: {str(e)}",
+                "results": [],
+                "size": 0,
+                "retryable": True
             }
-
         except Exception as e:
             return {
                 "error": f"请求出错: {str(e)}",
                 "results": [],
                 "size": 0
             }
+
+    async def async_stream_once(self, data, path="/search/quake_service", batch_size=500):
+        """
+        流式发送一次搜索请求，边接收响应边解析，每解析出batch_size条结果就产出一批
+
+        最后一批包含meta中的size和pagination_id，失败时产出标记了是否可重试或致命的结果
+        """
+        try:
+            await rate_limit.get_limiter("quake").acquire_async()
+
+            session = await async_http.get_session()
+            async with session.post(
+                f"{self.base_url}{path}",
+                headers=self.headers,
+                json=data,
+                timeout=async_http.timeout(30)
+            ) as response:
+                if response.status != 200:
+                    yield self.http_error(response.status, await response.text(errors="replace"),
+                                          response.headers.get("Retry-After"))
+                    return
+
+                decoder = json_stream.ArrayStreamDecoder("data", response.charset or 'utf-8')
+                batch = []
+                decode_seconds = 0.0
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    start = time.perf_counter()
+                    batch.extend(self.format_item(item) for item in decoder.feed(chunk))
+                    decode_seconds += time.perf_counter() - start
+                    # 出错时code在data之前返回，此时不产出结果
+                    if len(batch) >= batch_size and decoder.fields.get("code", 0) == 0:
+                        # 总数和游标在meta中，位于data之后，中间批次不带size
+                        yield {"results": batch, "fields": list(FIELDS)}
+                        batch = []
+                fields = decoder.close()
+                self.record_payload(decoder.bytes_received, decode_seconds)
+
+            if "code" in fields and fields["code"] != 0:
+                yield retry.classify(self.format_result(fields))
+                return
+            result = self.format_meta(fields.get("meta", {}))
+            result["results"] = batch
+            yield result
+        except (async_http.ClientConnectionError, async_http.ClientPayloadError, asyncio.TimeoutError) as e:
+            yield {
+                "error": f"请求出错: {str(e)}",
+                "results": [],
+                "size": 0,
+                "retryable": True
+            }
+        except Exception as e:
+            yield {
+                "error": f"请求出错: {str(e)}",
+                "results": [],
+                "size": 0
+            }
+
+    def iter_pages(self, query, region=None, limit=10000, page_size=500, batch_size=None):
+        """
+        使用滚动翻页接口逐页获取查询结果，直到取满limit条或没有更多数据
+
+        与start偏移翻页不同，每页都通过上一页返回的pagination_id继续读取，
+        翻到再深的位置每页耗时也基本不变，适合导出大量结果
+
+        Args:
+            query: Quake查询语句
+            region: 地区
+            limit: 最多获取的结果数
+            page_size: 每页结果数
+            batch_size: 不为None时使用流式解析，每页按batch_size条分批返回，
+                        只有每页的最后一批带有size和pagination_id
+
+        Yields:
+            dict: 每一页（或每一批）的查询结果，最后一页的results会被截断到limit
+
+        Raises:
+            QuakeSearchError: 某一页查询失败
+        """
+        data = {
+            "query": self.build_query(query, region),
+            "size": page_size,
+            "ignore_cache": False
+        }
+        if self.projection:
+            data.update(projection_params(self.fields))
+        fetched = 0
+        while fetched < limit:
+            request_data = dict(data)
+            if batch_size:
+                batches = async_http.iterate(retry.iter_with_retry(
+                    lambda: self.async_stream_once(request_data, path="/scroll/quake_service",
+                                                   batch_size=batch_size),
+                    self.retry_policy
+                ))
+            else:
+                batches = [async_http.run(retry.run_with_retry(
+                    lambda: self.async_search_once(request_data, path="/scroll/quake_service"),
+                    self.retry_policy
+                ))]
+
+            page_rows = 0
+            pagination_id = None
+            charged = False  # 本页的请求是否已计入消耗，每页只计一次请求
+            for result in batches:
+                if "error" in result:
+                    raise QuakeSearchError(result)
+
+                rows = result.get("results", [])
+                if fetched + len(rows) > limit:
+                    rows = rows[:limit - fetched]
+                    result["results"] = rows
+                fetched += len(rows)
+                page_rows += len(rows)
+                pagination_id = result.get("pagination_id", pagination_id)
+                self.record_usage(result, requests=0 if charged else 1)
+                charged = True
+
+                yield result
+
+                if fetched >= limit:
+                    break
+
+            # 不足一页或没有返回游标时停止
+            if page_rows < page_size or not pagination_id:
+                break
+            data["pagination_id"] = pagination_id
+
+    def iter_search(self, query, region=None, limit=10000, page_size=500, batch_size=None):
+        """
+        逐条返回查询结果，自动翻页，参数同iter_pages
+
+        Yields:
+            list: 单条结果，字段顺序与search返回的fields一致
+        """
+        for result in self.iter_pages(query, region=region, limit=limit, page_size=page_size,
+                                      batch_size=batch_size):
+            yield from result.get("results", [])
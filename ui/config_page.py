@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QFileDialog, QGroupBox, QMessageBox
+    QPushButton, QFileDialog, QGroupBox, QMessageBox, QSpinBox, QDoubleSpinBox, QCheckBox
 )
 from PyQt5.QtCore import Qt
 
@@ -128,6 +128,71 @@ class ConfigPage(QWidget):
         fingerprint_group.setLayout(fingerprint_layout)
         layout.addWidget(fingerprint_group)
 
+        # 批量检索配置
+        batch_group = QGroupBox("批量检索配置")
+        batch_layout = QHBoxLayout()
+
+        # 各引擎同时进行的查询数量
+        fofa_concurrency_label = QLabel("FOFA并发数:")
+        self.fofa_concurrency_input = QSpinBox()
+        self.fofa_concurrency_input.setRange(1, 10)
+        self.fofa_concurrency_input.setValue(int(self.config.get('fofa_concurrency', 5)))
+        quake_concurrency_label = QLabel("Quake并发数:")
+        self.quake_concurrency_input = QSpinBox()
+        self.quake_concurrency_input.setRange(1, 3)
+        self.quake_concurrency_input.setValue(int(self.config.get('quake_concurrency', 1)))
+        batch_layout.addWidget(fofa_concurrency_label)
+        batch_layout.addWidget(self.fofa_concurrency_input)
+        batch_layout.addWidget(quake_concurrency_label)
+        batch_layout.addWidget(self.quake_concurrency_input)
+
+        # 各引擎每秒允许的请求数
+        fofa_rate_label = QLabel("FOFA每秒请求数:")
+        self.fofa_rate_input = QDoubleSpinBox()
+        self.fofa_rate_input.setRange(0.1, 20.0)
+        self.fofa_rate_input.setSingleStep(0.5)
+        self.fofa_rate_input.setValue(float(self.config.get('fofa_rate', 2.0)))
+        quake_rate_label = QLabel("Quake每秒请求数:")
+        self.quake_rate_input = QDoubleSpinBox()
+        self.quake_rate_input.setRange(0.1, 20.0)
+        self.quake_rate_input.setSingleStep(0.5)
+        self.quake_rate_input.setValue(float(self.config.get('quake_rate', 1.0)))
+        batch_layout.addWidget(fofa_rate_label)
+        batch_layout.addWidget(self.fofa_rate_input)
+        batch_layout.addWidget(quake_rate_label)
+        batch_layout.addWidget(self.quake_rate_input)
+        batch_layout.addStretch()
+
+        batch_group.setLayout(batch_layout)
+        layout.addWidget(batch_group)
+
+        # 查询缓存配置
+        cache_group = QGroupBox("查询缓存配置")
+        cache_layout = QHBoxLayout()
+
+        self.cache_enabled_input = QCheckBox("启用缓存")
+        self.cache_enabled_input.setChecked(bool(self.config.get('cache_enabled', True)))
+        cache_ttl_label = QLabel("有效期(小时):")
+        self.cache_ttl_input = QSpinBox()
+        self.cache_ttl_input.setRange(1, 24 * 30)
+        self.cache_ttl_input.setValue(max(1, int(self.config.get('cache_ttl', 86400)) // 3600))
+        cache_size_label = QLabel("容量上限(MB):")
+        self.cache_size_input = QSpinBox()
+        self.cache_size_input.setRange(10, 10240)
+        self.cache_size_input.setValue(int(self.config.get('cache_max_mb', 200)))
+        cache_clear_btn = QPushButton("清空缓存")
+        cache_clear_btn.clicked.connect(self.clear_cache)
+        cache_layout.addWidget(self.cache_enabled_input)
+        cache_layout.addWidget(cache_ttl_label)
+        cache_layout.addWidget(self.cache_ttl_input)
+        cache_layout.addWidget(cache_size_label)
+        cache_layout.addWidget(self.cache_size_input)
+        cache_layout.addWidget(cache_clear_btn)
+        cache_layout.addStretch()
+
+        cache_group.setLayout(cache_layout)
+        layout.addWidget(cache_group)
+
         # 保存按钮
         save_layout = QHBoxLayout()
         save_layout.addStretch()
@@ -150,6 +215,15 @@ class ConfigPage(QWidget):
         if file_path:
             self.afrog_path_input.setText(file_path)
 
+    def clear_cache(self):
+        """清空查询结果缓存"""
+        from utils import query_cache
+        try:
+            (query_cache.get_shared_cache() or query_cache.QueryCache()).clear()
+            QMessageBox.information(self, "成功", "查询缓存已清空")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"清空缓存失败: {str(e)}")
+
     def save_config(self):
         """保存配置"""
         # 获取输入值
@@ -158,6 +232,13 @@ class ConfigPage(QWidget):
         quake_key = self.quake_key_input.text().strip()
         afrog_path = self.afrog_path_input.text().strip()
         fingerprint_update_url = self.update_url_input.text().strip()
+        fofa_concurrency = self.fofa_concurrency_input.value()
+        quake_concurrency = self.quake_concurrency_input.value()
+        cache_enabled = self.cache_enabled_input.isChecked()
+        cache_ttl = self.cache_ttl_input.value() * 3600
+        cache_max_mb = self.cache_size_input.value()
+        fofa_rate = self.fofa_rate_input.value()
+        quake_rate = self.quake_rate_input.value()
 
         # 更新配置
         self.config.set('fofa_email', fofa_email)
@@ -165,6 +246,22 @@ class ConfigPage(QWidget):
         self.config.set('quake_key', quake_key)
         self.config.set('afrog_path', afrog_path)
         self.config.set('fingerprint_update_url', fingerprint_update_url)
+        self.config.set('fofa_concurrency', fofa_concurrency)
+        self.config.set('quake_concurrency', quake_concurrency)
+        self.config.set('cache_enabled', cache_enabled)
+        self.config.set('cache_ttl', cache_ttl)
+        self.config.set('cache_max_mb', cache_max_mb)
+        self.config.set('fofa_rate', fofa_rate)
+        self.config.set('quake_rate', quake_rate)
+
+        # 立即应用新的限速配置
+        from utils import rate_limit
+        rate_limit.configure('fofa', fofa_rate, self.config.get('fofa_burst', 2))
+        rate_limit.configure('quake', quake_rate, self.config.get('quake_burst', 1))
+
+        # 立即应用新的缓存配置
+        from utils import query_cache
+        query_cache.configure(cache_enabled, cache_ttl, cache_max_mb * 1024 * 1024)
 
         # 保存配置到文件
         if not self.config.save_config():
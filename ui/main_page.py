@@ -1,23 +1,151 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                            QComboBox, QLineEdit, QPushButton, QTableWidget,
-                            QTableWidgetItem, QHeaderView, QFileDialog,
+                            QComboBox, QLineEdit, QPushButton, QTableView,
+                            QHeaderView, QFileDialog,
                             QMessageBox, QMenu, QAction, QProgressBar, QApplication,
-                            QStatusBar)
-from PyQt5.QtCore import Qt, pyqtSignal, QThread, QObject
+                            QStatusBar, QCheckBox)
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QObject, QTimer
 from PyQt5.QtGui import QFont, QColor, QCursor
 
-import pandas as pd
+import asyncio
 import os
 import threading
 import time
 import webbrowser
+from datetime import datetime
 
-from fofa_api import FofaAPI
+from fofa_api import FofaAPI, FofaSearchError
 from quake_api import QuakeAPI
 from utils.export import ResultExporter
 from utils.afrog import AfrogScanner
+from utils.retry import RetryPolicy
+from utils.result_store import ResultStore
+from utils.batch_journal import BatchJournal
+from utils.snapshot_store import SnapshotStore
+from utils.result_index import ResultIndex, parse_filter
+from utils.page_cache import PageCache
+from utils import regions, async_http, federated, quota, dedup, cancel, query_cache, http_session
+from utils.async_loop import get_task_runner
+from ui.result_model import ResultTableModel, fit_column_widths
+
+def build_quake_query(query, region=None):
+    """为Quake查询语句拼接省份和城市条件"""
+    if region:
+        province, city = region.split(' ', 1) if ' ' in region else (region, '')
+        query += f' AND province_cn:"{province}"'
+        if city:
+            query += f' AND city_cn:"{regions.to_quake(city)}"'
+    return query
+
+
+def fingerprint_cost(api_type, total, limit):
+    """
+    估算检索单个指纹的消耗
+
+    Args:
+        api_type: 0: FOFA, 1: Quake
+        total: 指纹的结果总数
+        limit: 每个指纹最多获取的结果数
+
+    Returns:
+        tuple: (请求次数, 数据条数)
+    """
+    page_size = 1000 if api_type == 0 else 500
+    rows = min(total, limit)
+    return max(1, (rows + page_size - 1) // page_size), rows
+
+
+def estimate_batch_cost(api_type, costs):
+    """
+    汇总将要检索的指纹的预计消耗
+
+    Args:
+        api_type: 0: FOFA, 1: Quake
+        costs: 每个指纹的(请求次数, 数据条数)，预检失败、结果数量未知的指纹为None
+
+    Returns:
+        dict: rows为预计获取的结果数，requests为预计请求次数，unknown为结果数量未知的指纹数，
+              cost为消耗说明
+    """
+    known = [cost for cost in costs if cost is not None]
+    unknown = len(costs) - len(known)
+    rows = sum(cost[1] for cost in known)
+    requests_count = sum(cost[0] for cost in known)
+    if api_type == 0:
+        cost = f"预计请求 {requests_count} 次，消耗 {rows} 条数据额度"
+    else:
+        # Quake按返回的数据条数扣除积分
+        cost = f"预计请求 {requests_count} 次，消耗约 {rows} 积分"
+    if unknown:
+        cost += f"；另有 {unknown} 个指纹预检失败，结果数量和消耗未知"
+    return {"rows": rows, "requests": requests_count, "unknown": unknown, "cost": cost}
+
+
+async def preflight_counts(api, api_type, fingerprints, region="", concurrency=1):
+    """
+    并发查询每个指纹的结果总数，每个查询只请求1条结果
+
+    Returns:
+        list: (指纹, 查询结果) 列表，查询结果中的size为结果总数
+    """
+    async def count(fingerprint):
+        query = fingerprint.get('url', '')
+        if api_type == 0:  # FOFA模式
+            result = await api.async_count(query, region=region or None)
+        else:  # Quake模式
+            result = await api.async_count(build_quake_query(query, region))
+        return fingerprint, result
+
+    coros = [count(fp) for fp in fingerprints if fp.get('url', '')]
+    return await async_http.gather_limited(coros, concurrency)
+
+
+class QuotaRefreshThread(QThread):
+    """额度刷新线程，从账户信息接口获取各引擎的剩余额度"""
+    # 定义信号
+    quota_refreshed = pyqtSignal(dict)  # 引擎名称 -> 账户信息
+
+    def __init__(self, apis):
+        super().__init__()
+        self.apis = apis  # 引擎名称 -> API实例
+
+    def run(self):
+        infos = {}
+        for engine, api in self.apis.items():
+            try:
+                infos[engine] = api.get_account_info()
+            except Exception as e:
+                infos[engine] = {"error": f"获取账户信息失败: {str(e)}"}
+        self.quota_refreshed.emit(infos)
+
+
+class CancellableThread(QThread):
+    """
+    可以停止的后台线程，子类在work中执行任务
+
+    work执行期间取消令牌绑定到线程，cancel()后网络请求、重试等待和afrog子进程都会尽快停止
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cancel_token = cancel.CancelToken()
+
+    def cancel(self):
+        """请求停止，可以在界面线程调用"""
+        self.cancel_token.cancel()
+
+    def is_cancelled(self):
+        """是否已请求停止"""
+        return self.cancel_token.cancelled
+
+    def run(self):
+        with cancel.use_token(self.cancel_token):
+            self.work()
 
-class FofaSearchThread(QThread):
+    def work(self):
+        """在后台线程中执行的任务，基类不做任何事情，子类重写"""
+
+
+class FofaSearchThread(CancellableThread):
     """FOFA搜索线程"""
     # 定义信号
     search_finished = pyqtSignal(dict)
@@ -31,7 +159,7 @@ class FofaSearchThread(QThread):
         self.page = page
         self.size = size
 
-    def run(self):
+    def work(self):
         try:
             # 执行FOFA搜索
             result = self.fofa_api.search(
@@ -41,6 +169,10 @@ class FofaSearchThread(QThread):
                 size=self.size
             )
 
+            # 已停止的查询不发送结果
+            if result.get("cancelled"):
+                return
+
             # 检查是否有错误
             if "error" in result and result["error"] is not False:
                 self.search_error.emit(str(result["error"]))
@@ -52,7 +184,7 @@ class FofaSearchThread(QThread):
             self.search_error.emit(f"搜索出错: {str(e)}")
 
 
-class QuakeSearchThread(QThread):
+class QuakeSearchThread(CancellableThread):
     """Quake搜索线程"""
     # 定义信号
     search_finished = pyqtSignal(dict)
@@ -66,23 +198,19 @@ class QuakeSearchThread(QThread):
         self.page = page
         self.size = size
 
-    def run(self):
+    def work(self):
         try:
-            # 构建查询语句
-            query = self.query
-            if self.region:
-                province, city = self.region.split(' ', 1) if ' ' in self.region else (self.region, '')
-                query += f' AND province_cn:"{province}"'
-                if city:
-                    query += f'AND city_cn:"{city}"'
-
             # 执行Quake搜索
             result = self.quake_api.search(
-                query=query,
+                query=build_quake_query(self.query, self.region),
                 page=self.page,
                 size=self.size
             )
 
+            # 已停止的查询不发送结果
+            if result.get("cancelled"):
+                return
+
             # 检查是否有错误
             if "error" in result and result["error"] is not False:
                 self.search_error.emit(str(result["error"]))
@@ -94,7 +222,121 @@ class QuakeSearchThread(QThread):
             self.search_error.emit(f"搜索出错: {str(e)}")
 
 
-class ScanThread(QThread):
+class FederatedSearchThread(CancellableThread):
+    """联合检索线程，同时查询FOFA和Quake并合并结果"""
+    # 定义信号
+    search_finished = pyqtSignal(dict)
+    search_error = pyqtSignal(str)
+
+    def __init__(self, fofa_api, quake_api, query, region=None, page=1, size=100):
+        super().__init__()
+        self.fofa_api = fofa_api
+        self.quake_api = quake_api
+        self.query = query
+        self.region = region
+        self.page = page
+        self.size = size
+
+    def work(self):
+        try:
+            # 两个引擎在共享事件循环中并发请求，总耗时取决于较慢的一个
+            results = async_http.run(async_http.gather_limited([
+                self.fofa_api.async_search(query=self.query, region=self.region,
+                                           page=self.page, size=self.size),
+                self.quake_api.async_search(query=build_quake_query(self.query, self.region),
+                                            page=self.page, size=self.size)
+            ], 2))
+
+            if self.is_cancelled():
+                return
+            results = list(zip(("FOFA", "Quake"), results))
+
+            merged = federated.merge_results(results)
+            # 两个引擎都失败时才视为查询失败
+            if len(merged["errors"]) == len(results):
+                self.search_error.emit("；".join(f"{source}: {error}" for source, error in merged["errors"]))
+                return
+
+            self.search_finished.emit(merged)
+        except Exception as e:
+            self.search_error.emit(f"搜索出错: {str(e)}")
+
+
+class FetchAllThread(CancellableThread):
+    """全量获取线程，逐页请求并在每页（流式解析时为每批）返回后立即发送结果，FOFA和Quake通用"""
+    # 定义信号
+    page_fetched = pyqtSignal(list, int, int)  # 本页结果, 已获取数量, 总数
+    search_finished = pyqtSignal(dict)
+    search_error = pyqtSignal(str)
+
+    def __init__(self, api, query, region=None, limit=10000, page_size=1000, batch_size=None):
+        super().__init__()
+        self.api = api
+        self.query = query
+        self.region = region
+        self.limit = limit
+        self.page_size = page_size
+        self.batch_size = batch_size
+
+    def work(self):
+        fetched = 0
+        total = 0
+        fields = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
+        try:
+            for result in self.api.iter_pages(self.query, region=self.region, limit=self.limit,
+                                              page_size=self.page_size, batch_size=self.batch_size):
+                rows = result.get("results", [])
+                fetched += len(rows)
+                # 流式解析的中间批次可能不带总数，沿用上一次的总数
+                total = min(result.get("size", total), self.limit)
+                self.page_fetched.emit(rows, fetched, max(total, fetched))
+                if self.is_cancelled():
+                    break
+        except Exception as e:
+            # 停止后请求以取消的结果结束，不视为出错
+            if not self.is_cancelled():
+                self.search_error.emit(f"搜索出错: {str(e)}")
+                return
+
+        # 发送汇总信息，结果已通过page_fetched分批发送
+        self.search_finished.emit({"fields": fields, "size": fetched, "total": total,
+                                   "cancelled": self.is_cancelled()})
+
+
+class ExportAllThread(CancellableThread):
+    """全量导出线程，边翻页边写入CSV，FOFA和Quake通用"""
+    # 定义信号
+    export_finished = pyqtSignal(str)  # 导出文件路径，失败时为空字符串
+
+    def __init__(self, api, query, region=None, limit=10000, page_size=1000, batch_size=None, output_dir=None):
+        super().__init__()
+        self.api = api
+        self.query = query
+        self.region = region
+        self.limit = limit
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.output_dir = output_dir
+
+    def work(self):
+        fields = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
+        result_file = ResultExporter.export_rows_to_csv(self.iter_rows(), fields, self.output_dir)
+        self.export_finished.emit(result_file or "")
+
+    def iter_rows(self):
+        """逐条返回结果，停止时正常结束，已写入的结果保留在文件中"""
+        try:
+            for row in self.api.iter_search(self.query, region=self.region, limit=self.limit,
+                                            page_size=self.page_size, batch_size=self.batch_size):
+                yield row
+                if self.is_cancelled():
+                    return
+        except Exception:
+            if not self.is_cancelled():
+                raise
+
+
+class ScanThread(CancellableThread):
     """扫描线程"""
     # 定义信号
     scan_finished = pyqtSignal(dict)
@@ -105,9 +347,9 @@ class ScanThread(QThread):
         self.scanner = scanner
         self.target = target
 
-    def run(self):
+    def work(self):
         try:
-            # 执行扫描
+            # 执行扫描，停止时结果中带有cancelled和已发现的漏洞
             result = self.scanner.scan(self.target)
 
             # 检查是否有错误
@@ -121,78 +363,209 @@ class ScanThread(QThread):
             self.scan_error.emit(f"扫描出错: {str(e)}")
 
 
+class FilterThread(QThread):
+    """在后台线程中建立索引，并按索引筛选和排序已加载的结果"""
+    filter_finished = pyqtSignal(object, object, float)  # 结果容器, 显示的行号, 耗时（毫秒）
+
+    def __init__(self, index, conditions, sort_col=None, descending=False):
+        super().__init__()
+        self.index = index
+        self.conditions = conditions
+        self.sort_col = sort_col
+        self.descending = descending
+        # 只处理启动时已有的行，之后追加的行由下一次筛选处理
+        self.count = len(index.store)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.index.build(self.count)
+            rows = self.index.query(self.conditions, self.sort_col, self.descending, self.count)
+        except Exception as e:
+            print(f"筛选结果出错: {e}")
+            rows = None
+        self.filter_finished.emit(self.index.store, rows, (time.perf_counter() - start) * 1000)
+
+
 class BatchSearchWorker(QObject):
     """批量检索工作线程"""
     # 定义信号
-    search_progress = pyqtSignal(int, int, str)  # 当前进度, 总数, 当前指纹名称
-    search_finished = pyqtSignal(list)  # 所有结果列表
+    search_progress = pyqtSignal(int, int, str)  # 已完成数量, 总数, 刚完成的指纹名称
+    result_ready = pyqtSignal(dict)  # 单个指纹的检索结果，每完成一个指纹发送一次
+    search_finished = pyqtSignal(int)  # 检索成功的指纹数量
     search_error = pyqtSignal(str)  # 错误信息
+    search_failed = pyqtSignal(str, str)  # 重试后仍失败的指纹名称, 错误信息
     finished = pyqtSignal()  # 完成信号
 
-    def __init__(self, api, api_type, fingerprints, region=""):
+    # 各引擎允许的最大并发数，避免超出API频率限制 (0: FOFA, 1: Quake)
+    MAX_CONCURRENCY = {0: 10, 1: 3}
+
+    # 增量检索时时间条件向前多取的秒数，避免时区差异和边界遗漏，重复的资产会在比较快照时过滤
+    DELTA_MARGIN = 86400
+
+    def __init__(self, api, api_type, fingerprints, region="", max_workers=1, result_limit=10000,
+                 journal=None, snapshot_store=None):
         super().__init__()
         self.api = api  # 可以是FOFA API或Quake API
         self.api_type = api_type  # 0: FOFA, 1: Quake
         self.fingerprints = fingerprints
         self.region = region
-        self.results = []
+        self.result_limit = result_limit  # FOFA模式下每个指纹最多获取的结果数
+        self.max_workers = max(1, min(int(max_workers), self.MAX_CONCURRENCY.get(api_type, 1)))
+        self.journal = journal  # 断点日志，每完成一个指纹就写入
+        self.snapshot_store = snapshot_store  # 不为None时为增量模式，只返回新增或变化的资产
+        self.succeeded = 0  # 检索成功的指纹数量
+        self.done = 0  # 已完成的指纹数量
+        self.fatal_error = None  # 第一个致命错误，出现后停止检索
+        self.cancel_token = cancel.CancelToken()
+
+    def cancel(self):
+        """请求停止，正在进行的查询会被中断，已完成的结果和断点日志保留"""
+        self.cancel_token.cancel()
+
+    def is_cancelled(self):
+        """是否已请求停止"""
+        return self.cancel_token.cancelled
+
+    async def search_fingerprint(self, fingerprint):
+        """检索单个指纹，在共享事件循环中执行，出错时只返回该指纹的错误，不影响其他指纹和断点日志"""
+        try:
+            return await self.fetch_fingerprint(fingerprint)
+        except Exception as e:
+            return {"error": f"检索出错: {str(e)}"}
+
+    async def fetch_fingerprint(self, fingerprint):
+        """检索单个指纹并与快照比较"""
+        query = fingerprint.get('url', '')
+
+        # 已停止时不再开始新的查询
+        if cancel.is_cancelled():
+            return cancel.cancelled_result()
+
+        # 剩余额度已用完时停止，避免请求到一半因额度不足失败
+        engine = "fofa" if self.api_type == 0 else "quake"
+        if not quota.can_afford(engine, requests=1, rows=1):
+            return {"error": f"{quota.ENGINE_NAMES[engine]}剩余额度不足，已停止检索", "fatal": True}
+
+        # 增量模式下只检索上次检索之后更新的资产，SQLite的读写放到线程池中，不阻塞其他查询
+        loop = asyncio.get_running_loop()
+        run_time = time.time()
+        since = None
+        if self.snapshot_store is not None:
+            last_run = await loop.run_in_executor(None, self.snapshot_store.get_last_run,
+                                                  engine, query, self.region)
+            if last_run is not None:
+                since = datetime.fromtimestamp(last_run - self.DELTA_MARGIN)
+
+        # 根据API类型执行不同的搜索
+        if self.api_type == 0:  # FOFA模式
+            search_query = query
+            if since is not None:
+                search_query = f'({query}) && after="{since.strftime("%Y-%m-%d")}"'
+            # 自动翻页，直到取满result_limit条结果，没有返回任何页面时结果为空
+            result = {"results": [], "size": 0}
+            rows = []
+            try:
+                async for page_result in self.api.async_iter_pages(search_query, region=self.region,
+                                                                   limit=self.result_limit, page_size=1000):
+                    rows.extend(page_result.get("results", []))
+                    result = page_result
+            except FofaSearchError as e:
+                return e.result
+            result["results"] = rows
+        else:  # Quake模式
+            result = await self.api.async_search(
+                query=build_quake_query(query, self.region),
+                page=1,
+                size=500,
+                start_time=since
+            )
+
+        if self.snapshot_store is not None and not ("error" in result and result["error"] is not False):
+            result = await loop.run_in_executor(None, self.diff_snapshot, engine, query, result, run_time)
+        return result
+
+    def diff_snapshot(self, engine, query, result, run_time):
+        """与上次的快照比较，只保留新增或变化的资产，并在每行末尾添加状态"""
+        fields = result.get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
+        changes = self.snapshot_store.diff_and_update(
+            engine, query, self.region, fields, result.get("results", []), run_time
+        )
+        result["fields"] = fields + ["change"]
+        result["results"] = [list(row) + [status] for row, status in changes]
+        return result
+
+    def handle_result(self, fingerprint, result, total):
+        """处理单个指纹的检索结果，在事件循环线程中依次执行"""
+        # 停止后被中断的查询不计入进度，之后可从断点日志继续
+        if result.get("cancelled"):
+            return
+
+        # 更新进度
+        self.done += 1
+        self.search_progress.emit(self.done, total, fingerprint.get('name', '未命名'))
+
+        # 检查是否有错误
+        if "error" in result and result["error"] is not False:
+            if result.get("fatal"):
+                # 凭证无效或积分不足，中断正在进行的查询，避免继续消耗额度，
+                # 已完成的结果照常写入断点日志，之后可从断点日志继续
+                if self.fatal_error is None:
+                    self.fatal_error = str(result["error"])
+                    self.cancel_token.cancel()
+                return
+            # 重试后仍失败的指纹跳过，继续检索其余指纹
+            self.search_failed.emit(fingerprint.get('name', '未命名'), str(result["error"]))
+            return
+
+        # 添加指纹信息到结果中
+        result['fingerprint'] = {
+            'name': fingerprint.get('name', '未命名'),
+            'version': fingerprint.get('version', ''),
+            'description': fingerprint.get('description', '')
+        }
+
+        # 先写入断点日志，再交给界面显示
+        if self.journal is not None:
+            self.journal.append(fingerprint, result)
+        self.succeeded += 1
+        self.result_ready.emit(result)
+
+    async def search_all(self, fingerprints):
+        """在共享事件循环中并发检索全部指纹，最多同时进行max_workers个查询"""
+        total = len(fingerprints)
+
+        async def search(fingerprint):
+            self.handle_result(fingerprint, await self.search_fingerprint(fingerprint), total)
+
+        await async_http.gather_limited([search(fp) for fp in fingerprints], self.max_workers)
 
     def run(self):
-        """执行批量检索"""
+        """执行批量检索，每完成一个指纹就发送其结果"""
         try:
-            total = len(self.fingerprints)
-            for i, fingerprint in enumerate(self.fingerprints):
-                # 更新进度
-                self.search_progress.emit(i + 1, total, fingerprint.get('name', '未命名'))
-                
-                # 获取查询语句
-                query = fingerprint.get('url', '')
-                if not query:
-                    continue
-                
-                # 根据API类型执行不同的搜索
-                if self.api_type == 0:  # FOFA模式
-                    result = self.api.search(
-                        query=query,
-                        region=self.region,
-                        page=1,
-                        size=1000
-                    )
-                else:  # Quake模式
-                    # 构建查询语句
-                    quake_query = query
-                    if self.region:
-                        province, city = self.region.split(' ', 1) if ' ' in self.region else (self.region, '')
-                        quake_query += f' AND province_cn:"{province}"'
-                        if city:
-                            quake_query += f' AND city_cn:"{city}"'
-                    
-                    result = self.api.search(
-                        query=quake_query,
-                        page=1,
-                        size=500
-                    )
-
-                # 检查是否有错误
-                if "error" in result and result["error"] is not False:
-                    self.search_error.emit(str(result["error"]))
-                    return
+            # 跳过没有查询语句的指纹
+            fingerprints = [fp for fp in self.fingerprints if fp.get('url', '')]
 
-                # 添加指纹信息到结果中
-                result['fingerprint'] = {
-                    'name': fingerprint.get('name', '未命名'),
-                    'version': fingerprint.get('version', ''),
-                    'description': fingerprint.get('description', '')
-                }
+            # 所有查询都是共享事件循环中的协程，停止或出现致命错误时正在进行的查询立即被取消
+            with cancel.use_token(self.cancel_token):
+                async_http.run(self.search_all(fingerprints))
 
-                # 添加到结果列表
-                self.results.append(result)
+            if self.fatal_error is not None:
+                self.search_error.emit(self.fatal_error)
+                self.search_finished.emit(self.succeeded)
+                return
 
-            # 发送结果
-            self.search_finished.emit(self.results)
+            # 所有指纹都成功后删除断点日志，有失败或停止时未完成的指纹时保留，之后可以继续检索
+            if self.journal is not None and not self.journal.remaining():
+                self.journal.finish()
+
+            # 全部完成或已停止
+            self.search_finished.emit(self.succeeded)
         except Exception as e:
             self.search_error.emit(f"批量检索出错: {str(e)}")
         finally:
+            if self.journal is not None:
+                self.journal.close()
             self.finished.emit()
 
 
@@ -201,6 +574,10 @@ class MainPage(QWidget):
 
     # 定义信号
     status_changed = pyqtSignal(str)
+    quota_changed = pyqtSignal(str)  # 剩余额度文本
+
+    # 批量检索过程中刷新表格的最短间隔（毫秒），多个指纹的结果合并为一次刷新
+    BATCH_REFRESH_INTERVAL = 300
 
     def __init__(self, config):
         super().__init__()
@@ -219,8 +596,45 @@ class MainPage(QWidget):
         self.quake_api = QuakeAPI(
             key=self.config.get('quake_key', '')
         )
+        # 只请求结果表格需要的字段，减少响应大小和解析耗时
+        self.quake_api.projection = bool(self.config.get('quake_projection', True))
 
-        # 当前搜索模式 (0: FOFA, 1: Quake)
+        # 创建查询结果缓存，两个API共用，未启用时也创建，在配置页启用后立即生效
+        self.query_cache = None
+        try:
+            self.query_cache = query_cache.init_shared_cache(
+                enabled=bool(self.config.get('cache_enabled', True)),
+                ttl=self.config.get('cache_ttl', 86400),
+                max_bytes=self.config.get('cache_max_mb', 200) * 1024 * 1024
+            )
+        except Exception as e:
+            print(f"初始化查询缓存失败: {e}")
+        self.fofa_api.cache = self.query_cache
+        self.quake_api.cache = self.query_cache
+
+        # 请求失败时的重试策略，两个API共用
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.config.get('retry_max_attempts', 4),
+            base_delay=self.config.get('retry_base_delay', 1.0),
+            max_delay=self.config.get('retry_max_delay', 30.0)
+        )
+        self.fofa_api.retry_policy = self.retry_policy
+        self.quake_api.retry_policy = self.retry_policy
+
+        # 共享的asyncio事件循环线程，用于并发执行大量轻量查询
+        self.async_loop = get_task_runner()
+
+        # 定期刷新API剩余额度
+        self.quota_thread = None
+        self.quota_timer = QTimer(self)
+        self.quota_timer.timeout.connect(self.refresh_quota)
+        interval = int(self.config.get('quota_refresh_interval', 300))
+        if interval > 0:
+            self.quota_timer.start(interval * 1000)
+            # 启动后获取一次
+            QTimer.singleShot(0, self.refresh_quota)
+
+        # 当前搜索模式 (0: FOFA, 1: Quake, 2: 联合检索)
         self.current_mode = 0
 
         # 创建Afrog扫描器实例
@@ -230,6 +644,35 @@ class MainPage(QWidget):
 
         # 初始化变量
         self.search_results = None
+        # 批量检索的原始结果和按资产去重后的结果，用于切换显示
+        self.batch_results = None
+        self.batch_running = False
+        # 批量检索过程中定时刷新表格，避免每个指纹的结果都触发一次重绘
+        self.batch_refresh_timer = QTimer(self)
+        self.batch_refresh_timer.setSingleShot(True)
+        self.batch_refresh_timer.setInterval(self.BATCH_REFRESH_INTERVAL)
+        self.batch_refresh_timer.timeout.connect(self.refresh_batch_results)
+        # 已浏览和预取的页面
+        self.page_cache = None
+        page_cache_mb = self.config.get('page_cache_mb', 64)
+        if page_cache_mb:
+            self.page_cache = PageCache(max_bytes=page_cache_mb * 1024 * 1024)
+        self.page_query = None  # 当前分页的查询条件 (模式, 查询语句, 地区)
+        self.prefetch_threads = {}  # (查询键, 页码) -> 正在预取的线程
+        self.waiting_page = None  # 正在等待预取完成的页面
+        # 当前显示结果的索引和正在进行的筛选
+        self.result_index = None
+        self.filter_thread = None
+        self.filter_pending = False
+        # 可以停止的后台任务
+        self.search_thread = None
+        self.fetch_all_thread = None
+        self.export_all_thread = None
+        self.scan_thread = None
+        self.batch_search_worker = None
+        self.preflight_task_id = None
+        # 已停止但尚未退出的线程，退出前保留引用，避免线程对象在运行中被销毁
+        self.stopping_threads = set()
         self.current_page = 1
         self.page_size = 100
 
@@ -309,6 +752,25 @@ class MainPage(QWidget):
         self.mode_button.clicked.connect(self.toggle_search_mode)
         search_layout.addWidget(self.mode_button)
 
+        # 全量获取按钮，自动翻页获取全部结果
+        self.fetch_all_button = QPushButton("获取全部")
+        self.fetch_all_button.setFont(QFont("PingFang SC", font_size_normal))
+        self.fetch_all_button.setMinimumWidth(button_min_width)
+        search_layout.addWidget(self.fetch_all_button)
+
+        # 停止按钮，停止正在进行的查询、批量检索和扫描，已获取的结果保留
+        self.stop_button = QPushButton("停止")
+        self.stop_button.setFont(QFont("PingFang SC", font_size_normal))
+        self.stop_button.setMinimumWidth(button_min_width)
+        self.stop_button.setEnabled(False)
+        search_layout.addWidget(self.stop_button)
+
+        # 跳过缓存开关，勾选后总是向API发起请求，也不使用分页缓存
+        self.bypass_cache_checkbox = QCheckBox("跳过缓存")
+        self.bypass_cache_checkbox.setFont(QFont("PingFang SC", font_size_normal))
+        self.bypass_cache_checkbox.setEnabled(self.query_cache is not None)
+        search_layout.addWidget(self.bypass_cache_checkbox)
+
         main_layout.addLayout(search_layout)
 
         # 创建进度条
@@ -317,16 +779,47 @@ class MainPage(QWidget):
         self.progress_bar.setVisible(False)
         main_layout.addWidget(self.progress_bar)
 
-        # 创建结果表格
-        self.result_table = QTableWidget()
+        # 创建筛选栏，在当前结果中按字段筛选
+        filter_layout = QHBoxLayout()
+        filter_label = QLabel("筛选:")
+        filter_label.setFont(QFont("PingFang SC", font_size_normal))
+        filter_layout.addWidget(filter_label)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setFont(QFont("PingFang SC", font_size_normal))
+        self.filter_input.setPlaceholderText("在当前结果中筛选，例如 server:nginx city:杭州 登录，多个条件同时满足")
+        self.filter_input.setClearButtonEnabled(True)
+        filter_layout.addWidget(self.filter_input)
+
+        self.filter_status_label = QLabel("")
+        self.filter_status_label.setFont(QFont("PingFang SC", font_size_small))
+        filter_layout.addWidget(self.filter_status_label)
+
+        main_layout.addLayout(filter_layout)
+
+        # 输入停顿后再筛选
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+
+        # 创建结果表格，数据由模型按需提供，只绘制可见的单元格
+        self.result_model = ResultTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         self.result_table.setFont(QFont("PingFang SC", font_size_small))
-        self.result_table.setEditTriggers(QTableWidget.NoEditTriggers)  # 设置为不可编辑
-        self.result_table.setSelectionBehavior(QTableWidget.SelectRows)  # 设置为选择整行
+        self.result_table.setEditTriggers(QTableView.NoEditTriggers)  # 设置为不可编辑
+        self.result_table.setSelectionBehavior(QTableView.SelectRows)  # 设置为选择整行
         self.result_table.setContextMenuPolicy(Qt.CustomContextMenu)  # 设置为自定义右键菜单
+        self.result_table.setSortingEnabled(True)  # 点击表头排序
+        self.result_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.result_table.verticalHeader().setDefaultSectionSize(int(24 * self.dpi_scale))
 
         # 设置表格列数和表头
-        self.result_table.setColumnCount(10)
-        self.result_table.setHorizontalHeaderLabels(["指纹系统名称", "主机", "IP", "端口", "协议", "标题", "域名", "服务器", "城市", "系统名称"])
+        self.result_model.set_results(
+            ResultStore(["指纹系统名称", "host", "ip", "port", "protocol", "title", "domain", "server", "city", "os"]),
+            ["指纹系统名称", "主机", "IP", "端口", "协议", "标题", "域名", "服务器", "城市", "系统名称"]
+        )
 
         # 调整列宽（根据DPI缩放）
         self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
@@ -359,6 +852,33 @@ class MainPage(QWidget):
         self.fingerprint_button.clicked.connect(self.show_fingerprint_tab)
         button_layout.addWidget(self.fingerprint_button)
 
+        # 批量检索前先预检结果数量
+        self.preflight_checkbox = QCheckBox("预检结果数量")
+        self.preflight_checkbox.setFont(QFont("PingFang SC", font_size_normal))
+        self.preflight_checkbox.setChecked(bool(self.config.get('batch_preflight', True)))
+        self.preflight_checkbox.setEnabled(async_http.is_available())
+        button_layout.addWidget(self.preflight_checkbox)
+
+        # 批量检索结果按资产去重，取消勾选时显示每个(指纹, 资产)组合的原始结果
+        self.dedup_checkbox = QCheckBox("合并重复资产")
+        self.dedup_checkbox.setFont(QFont("PingFang SC", font_size_normal))
+        self.dedup_checkbox.setChecked(True)
+        self.dedup_checkbox.toggled.connect(self.show_batch_results)
+        button_layout.addWidget(self.dedup_checkbox)
+
+        # 增量模式，只检索上次检索之后更新的资产，并只显示新增或变化的资产
+        self.delta_checkbox = QCheckBox("增量模式")
+        self.delta_checkbox.setFont(QFont("PingFang SC", font_size_normal))
+        self.delta_checkbox.setToolTip("只检索上次批量检索之后更新的资产，并只显示新增或内容有变化的资产")
+        button_layout.addWidget(self.delta_checkbox)
+
+        # 从断点日志继续上次中断的批量检索
+        self.resume_button = QPushButton("继续批量检索")
+        self.resume_button.setFont(QFont("PingFang SC", font_size_normal))
+        self.resume_button.clicked.connect(self.resume_batch_search)
+        button_layout.addWidget(self.resume_button)
+        self.update_resume_button()
+
         # 添加分页控件
         self.prev_page_button = QPushButton("上一页")
         self.prev_page_button.setFont(QFont("PingFang SC", font_size_normal))
@@ -391,12 +911,32 @@ class MainPage(QWidget):
         # 搜索按钮点击事件
         self.search_button.clicked.connect(self.search)
 
+        # 全量获取按钮点击事件
+        self.fetch_all_button.clicked.connect(self.fetch_all)
+
+        # 停止按钮点击事件
+        self.stop_button.clicked.connect(self.stop_tasks)
+
+        # 跳过缓存开关
+        self.bypass_cache_checkbox.toggled.connect(self.toggle_cache_bypass)
+
+        # 预检开关
+        self.preflight_checkbox.toggled.connect(lambda checked: self.config.set('batch_preflight', checked))
+
+        # 事件循环线程中完成的任务
+        self.async_loop.task_finished.connect(self.handle_async_task_finished)
+        self.async_loop.task_error.connect(self.handle_async_task_error)
+
         # 导出按钮点击事件
         self.export_button.clicked.connect(self.export_results)
 
         # 表格右键菜单事件
         self.result_table.customContextMenuRequested.connect(self.show_context_menu)
 
+        # 筛选和排序
+        self.filter_input.textChanged.connect(lambda text: self.filter_timer.start())
+        self.result_model.sort_requested.connect(lambda column, descending: self.apply_filter())
+
         # 表格双击事件
         self.result_table.doubleClicked.connect(self.on_table_double_click)
 
@@ -409,15 +949,12 @@ class MainPage(QWidget):
         row = index.row()
         url = None
 
-        # 获取主机、端口和协议信息
-        host_item = self.result_table.item(row, 0)  # 假设host在第0列
-        port_item = self.result_table.item(row, 1)  # 假设port在第1列
-        protocol_item = self.result_table.item(row, 2)  # 假设protocol在第2列
+        # 按字段名获取主机、端口和协议信息
+        host = self.result_model.row_value(row, "host").strip()
+        port = self.result_model.row_value(row, "port").strip()
+        protocol = self.result_model.row_value(row, "protocol", "http").strip().lower()
 
-        if host_item:
-            host = host_item.text().strip()
-            port = port_item.text().strip() if port_item else ""
-            protocol = protocol_item.text().strip().lower() if protocol_item else "http"
+        if host:
 
             # 清理协议格式
             protocol = protocol.split(":")[0].replace("/", "").lower()
@@ -444,43 +981,8 @@ class MainPage(QWidget):
 
     def load_regions(self):
         """加载中国地区列表"""
-        # 中国省份数据
-        self.china_regions = {
-            "北京市": ["东城区", "西城区", "朝阳区", "丰台区", "石景山区", "海淀区", "顺义区", "通州区", "大兴区", "房山区", "门头沟区", "昌平区", "平谷区", "密云区", "延庆区"],
-            "天津市": ["和平区", "河东区", "河西区", "南开区", "河北区", "红桥区", "东丽区", "西青区", "津南区", "北辰区", "武清区", "宝坻区", "滨海新区", "宁河区", "静海区", "蓟州区"],
-            "河北省": ["石家庄市", "唐山市", "秦皇岛市", "邯郸市", "邢台市", "保定市", "张家口市", "承德市", "沧州市", "廊坊市", "衡水市"],
-            "山西省": ["太原市", "大同市", "阳泉市", "长治市", "晋城市", "朔州市", "晋中市", "运城市", "忻州市", "临汾市", "吕梁市"],
-            "内蒙古自治区": ["呼和浩特市", "包头市", "乌海市", "赤峰市", "通辽市", "鄂尔多斯市", "呼伦贝尔市", "巴彦淖尔市", "乌兰察布市", "兴安盟", "锡林郭勒盟", "阿拉善盟"],
-            "辽宁省": ["沈阳市", "大连市", "鞍山市", "抚顺市", "本溪市", "丹东市", "锦州市", "营口市", "阜新市", "辽阳市", "盘锦市", "铁岭市", "朝阳市", "葫芦岛市"],
-            "吉林省": ["长春市", "吉林市", "四平市", "辽源市", "通化市", "白山市", "松原市", "白城市", "延边朝鲜族自治州"],
-            "黑龙江省": ["哈尔滨市", "齐齐哈尔市", "鸡西市", "鹤岗市", "双鸭山市", "大庆市", "伊春市", "佳木斯市", "七台河市", "牡丹江市", "黑河市", "绥化市", "大兴安岭地区"],
-            "上海市": ["黄浦区", "徐汇区", "长宁区", "静安区", "普陀区", "虹口区", "杨浦区", "闵行区", "宝山区", "嘉定区", "浦东新区", "金山区", "松江区", "青浦区", "奉贤区", "崇明区"],
-            "江苏省": ["南京市", "无锡市", "徐州市", "常州市", "苏州市", "南通市", "连云港市", "淮安市", "盐城市", "扬州市", "镇江市", "泰州市", "宿迁市"],
-            "浙江省": ["杭州市", "宁波市", "温州市", "嘉兴市", "湖州市", "绍兴市", "金华市", "衢州市", "舟山市", "台州市", "丽水市"],
-            "安徽省": ["合肥市", "芜湖市", "蚌埠市", "淮南市", "马鞍山市", "淮北市", "铜陵市", "安庆市", "黄山市", "滁州市", "阜阳市", "宿州市", "六安市", "亳州市", "池州市", "宣城市"],
-            "福建省": ["福州市", "厦门市", "莆田市", "三明市", "泉州市", "漳州市", "南平市", "龙岩市", "宁德市"],
-            "江西省": ["南昌市", "景德镇市", "萍乡市", "九江市", "新余市", "鹰潭市", "赣州市", "吉安市", "宜春市", "抚州市", "上饶市"],
-            "山东省": ["济南市", "青岛市", "淄博市", "枣庄市", "东营市", "烟台市", "潍坊市", "济宁市", "泰安市", "威海市", "日照市", "临沂市", "德州市", "聊城市", "滨州市", "菏泽市"],
-            "河南省": ["郑州市", "开封市", "洛阳市", "平顶山市", "安阳市", "鹤壁市", "新乡市", "焦作市", "濮阳市", "许昌市", "漯河市", "三门峡市", "南阳市", "商丘市", "信阳市", "周口市", "驻马店市", "济源市"],
-            "湖北省": ["武汉市", "黄石市", "十堰市", "宜昌市", "襄阳市", "鄂州市", "荆门市", "孝感市", "荆州市", "黄冈市", "咸宁市", "随州市", "恩施土家族苗族自治州", "仙桃市", "潜江市", "天门市", "神农架林区"],
-            "湖南省": ["长沙市", "株洲市", "湘潭市", "衡阳市", "邵阳市", "岳阳市", "常德市", "张家界市", "益阳市", "郴州市", "永州市", "怀化市", "娄底市", "湘西土家族苗族自治州"],
-            "广东省": ["广州市", "韶关市", "深圳市", "珠海市", "汕头市", "佛山市", "江门市", "湛江市", "茂名市", "肇庆市", "惠州市", "梅州市", "汕尾市", "河源市", "阳江市", "清远市", "东莞市", "中山市", "潮州市", "揭阳市", "云浮市"],
-            "广西壮族自治区": ["南宁市", "柳州市", "桂林市", "梧州市", "北海市", "防城港市", "钦州市", "贵港市", "玉林市", "百色市", "贺州市", "河池市", "来宾市", "崇左市"],
-            "海南省": ["海口市", "三亚市", "三沙市", "儋州市", "五指山市", "琼海市", "文昌市", "万宁市", "东方市", "定安县", "屯昌县", "澄迈县", "临高县", "白沙黎族自治县", "昌江黎族自治县", "乐东黎族自治县", "陵水黎族自治县", "保亭黎族苗族自治县", "琼中黎族苗族自治县"],
-            "重庆市": ["万州区", "涪陵区", "渝中区", "大渡口区", "江北区", "沙坪坝区", "九龙坡区", "南岸区", "北碚区", "綦江区", "大足区", "渝北区", "巴南区", "黔江区", "长寿区", "江津区", "合川区", "永川区", "南川区", "璧山区", "铜梁区", "潼南区", "荣昌区", "开州区", "梁平区", "武隆区"],
-            "四川省": ["成都市", "自贡市", "攀枝花市", "泸州市", "德阳市", "绵阳市", "广元市", "遂宁市", "内江市", "乐山市", "南充市", "眉山市", "宜宾市", "广安市", "达州市", "雅安市", "巴中市", "资阳市", "阿坝藏族羌族自治州", "甘孜藏族自治州", "凉山彝族自治州"],
-            "贵州省": ["贵阳市", "六盘水市", "遵义市", "安顺市", "毕节市", "铜仁市", "黔西南布依族苗族自治州", "黔东南苗族侗族自治州", "黔南布依族苗族自治州"],
-            "云南省": ["昆明市", "曲靖市", "玉溪市", "保山市", "昭通市", "丽江市", "普洱市", "临沧市", "楚雄彝族自治州", "红河哈尼族彝族自治州", "文山壮族苗族自治州", "西双版纳傣族自治州", "大理白族自治州", "德宏傣族景颇族自治州", "怒江傈僳族自治州", "迪庆藏族自治州"],
-            "西藏自治区": ["拉萨市", "日喀则市", "昌都市", "林芝市", "山南市", "那曲市", "阿里地区"],
-            "陕西省": ["西安市", "铜川市", "宝鸡市", "咸阳市", "渭南市", "延安市", "汉中市", "榆林市", "安康市", "商洛市"],
-            "甘肃省": ["兰州市", "嘉峪关市", "金昌市", "白银市", "天水市", "武威市", "张掖市", "平凉市", "酒泉市", "庆阳市", "定西市", "陇南市", "临夏回族自治州", "甘南藏族自治州"],
-            "青海省": ["西宁市", "海东市", "海北藏族自治州", "黄南藏族自治州", "海南藏族自治州", "果洛藏族自治州", "玉树藏族自治州", "海西蒙古族藏族自治州"],
-            "宁夏回族自治区": ["银川市", "石嘴山市", "吴忠市", "固原市", "中卫市"],
-            "新疆维吾尔自治区": ["乌鲁木齐市", "克拉玛依市", "吐鲁番市", "哈密市", "昌吉回族自治州", "博尔塔拉蒙古自治州", "巴音郭楞蒙古自治州", "阿克苏地区", "克孜勒苏柯尔克孜自治州", "喀什地区", "和田地区", "伊犁哈萨克自治州", "塔城地区", "阿勒泰地区"],
-            "台湾省": ["台北市", "新北市", "桃园市", "台中市", "台南市", "高雄市", "基隆市", "新竹市", "嘉义市", "新竹县", "苗栗县", "彰化县", "南投县", "云林县", "嘉义县", "屏东县", "宜兰县", "花莲县", "台东县", "澎湖县", "金门县", "连江县"],
-            "香港特别行政区": ["中西区", "湾仔区", "东区", "南区", "油尖旺区", "深水埗区", "九龙城区", "黄大仙区", "观塘区", "荃湾区", "屯门区", "元朗区", "北区", "大埔区", "西贡区", "沙田区", "葵青区", "离岛区"],
-            "澳门特别行政区": ["花地玛堂区", "圣安多尼堂区", "大堂区", "望德堂区", "顺势堂区", "嘉模堂区", "圣方济各堂区", "路氹城"]
-        }
+        # 中国省份数据，来自地区对照表
+        self.china_regions = regions.get_china_regions()
 
         # 创建省份选择框
         self.province_combo = QComboBox()
@@ -541,8 +1043,20 @@ class MainPage(QWidget):
             if last_city and last_city in self.china_regions[last_province]:
                 self.city_combo.setCurrentText(last_city)
 
+    def get_region(self):
+        """根据省份和城市选择框获取地区参数，未选择时返回空字符串"""
+        province = self.province_combo.currentText()
+        city = self.city_combo.currentText()
+        region = ""
+        if province != "选择省份":
+            if city != "选择城市":
+                region = f"{province} {city}"
+            else:
+                region = province
+        return region
+
     def search(self):
-        """执行搜索"""
+        """执行搜索，当前页已缓存时直接显示"""
         # 获取查询参数
         query = self.query_input.text().strip()
         if not query:
@@ -552,73 +1066,348 @@ class MainPage(QWidget):
         # 获取地区参数
         province = self.province_combo.currentText()
         city = self.city_combo.currentText()
-        region = ""
-        if province != "选择省份":
-            if city != "选择城市":
-                region = f"{province} {city}"
-            else:
-                region = province
+        region = self.get_region()
 
         # 保存查询参数
         self.config.set('last_query', query)
         self.config.set('last_province', province)
         self.config.set('last_city', city)
 
+        # 检查API是否已配置
+        if self.current_mode == 0 and not self.config.is_fofa_configured():
+            QMessageBox.warning(self, "警告", "请先在配置页面设置FOFA API凭证")
+            return
+        if self.current_mode == 1 and not self.config.is_quake_configured():
+            QMessageBox.warning(self, "警告", "请先在配置页面设置Quake API凭证")
+            return
+        if self.current_mode == 2 and not (self.config.is_fofa_configured() and self.config.is_quake_configured()):
+            QMessageBox.warning(self, "警告", "联合检索需要先在配置页面设置FOFA和Quake API凭证")
+            return
+
+        # 上一次查询尚未完成时先停止，避免旧的结果覆盖新的结果
+        self.stop_search()
+
+        # 已浏览或已预取的页面直接显示
+        self.page_query = (self.current_mode, query, region or None)
+        page_key = (self.page_cache_key(), self.current_page)
+        # 之前查询的预取结果不会再显示，停止预取，避免继续消耗额度
+        self.stop_prefetch(keep=page_key[0])
+        self.waiting_page = None
+        if self.use_page_cache():
+            cached = self.page_cache.get(*page_key)
+            if cached is not None:
+                self.show_page_result(dict(cached), from_page_cache=True)
+                return
+
         # 显示进度条
         self.progress_bar.setVisible(True)
         self.search_button.setEnabled(False)
 
-        if self.current_mode == 0:  # FOFA模式
-            # 检查FOFA API是否已配置
-            if not self.config.is_fofa_configured():
-                QMessageBox.warning(self, "警告", "请先在配置页面设置FOFA API凭证")
-                self.progress_bar.setVisible(False)
-                self.search_button.setEnabled(True)
-                return
+        # 该页正在预取时等待预取完成，不重复请求
+        if page_key in self.prefetch_threads:
+            self.waiting_page = page_key
+            self.status_changed.emit(f"正在等待第{self.current_page}页预取完成...")
+            self.update_stop_button()
+            return
 
-            self.status_changed.emit("正在查询FOFA...")
+        mode_name = ["FOFA", "Quake", "FOFA和Quake"][self.current_mode]
+        self.status_changed.emit(f"正在查询{mode_name}...")
 
-            # 创建并启动搜索线程
-            self.search_thread = FofaSearchThread(
+        # 创建并启动搜索线程
+        self.search_thread = self.create_search_thread(self.current_mode, query, region, self.current_page)
+        self.search_thread.page_key = page_key
+        self.search_thread.search_finished.connect(self.handle_search_result)
+        self.search_thread.search_error.connect(self.handle_search_error)
+        self.search_thread.finished.connect(self.update_stop_button)
+        self.search_thread.start()
+        self.update_stop_button()
+
+    def create_search_thread(self, mode, query, region, page):
+        """创建对应搜索模式的搜索线程"""
+        if mode == 0:  # FOFA模式
+            return FofaSearchThread(
                 fofa_api=self.fofa_api,
                 query=query,
                 region=region if region else None,
-                page=self.current_page,
+                page=page,
                 size=self.page_size
             )
-        else:  # Quake模式
-            # 检查Quake API是否已配置
-            if not self.config.is_quake_configured():
-                QMessageBox.warning(self, "警告", "请先在配置页面设置Quake API凭证")
-                self.progress_bar.setVisible(False)
-                self.search_button.setEnabled(True)
-                return
-
-            self.status_changed.emit("正在查询Quake...")
-
-            # 创建并启动搜索线程
-            self.search_thread = QuakeSearchThread(
+        if mode == 1:  # Quake模式
+            return QuakeSearchThread(
                 quake_api=self.quake_api,
                 query=query,
                 region=region if region else None,
-                page=self.current_page,
+                page=page,
                 size=self.page_size
             )
-        self.search_thread.search_finished.connect(self.handle_search_result)
-        self.search_thread.search_error.connect(self.handle_search_error)
-        self.search_thread.start()
+        # 联合检索模式
+        return FederatedSearchThread(
+            fofa_api=self.fofa_api,
+            quake_api=self.quake_api,
+            query=query,
+            region=region if region else None,
+            page=page,
+            size=self.page_size
+        )
+
+    def page_cache_key(self):
+        """当前查询条件的分页缓存键"""
+        mode, query, region = self.page_query
+        return PageCache.make_key(mode, query, region, self.page_size)
+
+    def use_page_cache(self):
+        """跳过缓存时不读取分页缓存"""
+        return self.page_cache is not None and not self.bypass_cache_checkbox.isChecked()
+
+    def prefetch_pages(self):
+        """在后台预取当前页之后的若干页，翻页时可以直接显示"""
+        if not self.use_page_cache() or self.page_query is None or not self.search_results:
+            return
+        depth = int(self.config.get('page_prefetch_depth', 1))
+        total_pages = (self.search_results.get("size", 0) + self.page_size - 1) // self.page_size
+        mode, query, region = self.page_query
+        query_key = self.page_cache_key()
+
+        # 预取同样消耗额度，剩余额度不足时不预取
+        engines = {0: ["fofa"], 1: ["quake"], 2: ["fofa", "quake"]}[mode]
+        for page in range(self.current_page + 1, min(self.current_page + depth, total_pages) + 1):
+            page_key = (query_key, page)
+            if page_key in self.prefetch_threads or self.page_cache.contains(*page_key):
+                continue
+            if not all(quota.can_afford(engine, requests=1, rows=self.page_size) for engine in engines):
+                break
+            thread = self.create_search_thread(mode, query, region, page)
+            thread.search_finished.connect(lambda result, key=page_key: self.handle_prefetch_result(key, result))
+            thread.search_error.connect(lambda error, key=page_key: self.handle_prefetch_error(key, error))
+            thread.finished.connect(lambda key=page_key, thread=thread: self.handle_prefetch_finished(key, thread))
+            self.prefetch_threads[page_key] = thread
+            thread.start()
+
+    def stop_prefetch(self, keep=None):
+        """
+        停止预取，线程在后台退出，之后到达的结果被丢弃
+
+        Args:
+            keep: 需要继续预取的查询的分页缓存键，为None时全部停止
+        """
+        for page_key, thread in list(self.prefetch_threads.items()):
+            if page_key[0] == keep:
+                continue
+            del self.prefetch_threads[page_key]
+            self.retire_thread(thread, thread.search_finished, thread.search_error)
+
+    def handle_prefetch_finished(self, page_key, thread):
+        """预取线程结束，等待线程退出后释放，已停止的线程由retire_thread释放"""
+        if self.prefetch_threads.get(page_key) is thread:
+            del self.prefetch_threads[page_key]
+            thread.wait()
+
+    def handle_prefetch_result(self, page_key, result):
+        """预取完成，写入分页缓存，用户正在等待该页时直接显示"""
+        self.store_page_result(page_key, result)
+        if self.waiting_page == page_key:
+            self.waiting_page = None
+            self.show_page_result(dict(result), from_page_cache=True)
+            self.update_stop_button()
+
+    def handle_prefetch_error(self, page_key, error_message):
+        """预取失败不提示，用户翻到该页时重新请求"""
+        print(f"预取第{page_key[1]}页失败: {error_message}")
+        if self.waiting_page == page_key:
+            self.waiting_page = None
+            self.handle_search_error(error_message)
+            self.update_stop_button()
+
+    def store_page_result(self, page_key, result):
+        """将结果转换为列式存储并写入分页缓存"""
+        if not isinstance(result.get("results"), ResultStore):
+            fields = result.get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
+            result["fields"] = fields
+            result["results"] = ResultStore.from_rows(fields, result.get("results", []))
+        if self.page_cache is not None:
+            self.page_cache.put(page_key[0], page_key[1], dict(result))
+
+    def get_fetch_all_args(self):
+        """
+        检查查询语句和API配置，生成全量获取/导出所需的参数
+
+        Returns:
+            dict: 包含api、query、region和page_size，检查未通过时返回None
+        """
+        query = self.query_input.text().strip()
+        if not query:
+            QMessageBox.warning(self, "警告", "请输入查询语句")
+            return None
+
+        if self.current_mode == 2:
+            QMessageBox.warning(self, "警告", "联合检索模式暂不支持获取全部结果，请切换至FOFA或Quake模式")
+            return None
+
+        region = self.get_region()
+        if self.current_mode == 0:  # FOFA模式
+            if not self.config.is_fofa_configured():
+                QMessageBox.warning(self, "警告", "请先在配置页面设置FOFA API凭证")
+                return None
+            return {"api": self.fofa_api, "query": query, "region": region or None, "page_size": 1000,
+                    "batch_size": self.stream_batch_size()}
+
+        # Quake模式，使用滚动翻页接口
+        if not self.config.is_quake_configured():
+            QMessageBox.warning(self, "警告", "请先在配置页面设置Quake API凭证")
+            return None
+        return {"api": self.quake_api, "query": build_quake_query(query, region), "region": None, "page_size": 500,
+                "batch_size": self.stream_batch_size()}
+
+    def stream_batch_size(self):
+        """流式解析时每批返回的结果数，配置为0时不使用流式解析"""
+        return self.config.get('stream_batch_size', 200) or None
+
+    def fetch_all(self):
+        """自动翻页获取全部结果，每获取一页就追加到表格"""
+        args = self.get_fetch_all_args()
+        if args is None:
+            return
+        limit = self.config.get('fetch_all_limit', 10000)
+        mode_name = "FOFA" if self.current_mode == 0 else "Quake"
+        self.stop_search()
+
+        # 清空表格，准备逐页追加
+        fields = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
+        self.search_results = {"results": ResultStore(fields), "fields": fields, "size": 0}
+        self.batch_results = None
+        self.display_results(self.search_results)
+
+        self.progress_bar.setVisible(True)
+        self.search_button.setEnabled(False)
+        self.fetch_all_button.setEnabled(False)
+        self.status_changed.emit(f"正在获取{mode_name}全部结果...")
+
+        # 创建并启动全量获取线程
+        self.fetch_all_thread = FetchAllThread(limit=limit, **args)
+        self.fetch_all_thread.page_fetched.connect(self.handle_fetch_all_page)
+        self.fetch_all_thread.search_finished.connect(self.handle_fetch_all_finished)
+        self.fetch_all_thread.search_error.connect(self.handle_fetch_all_error)
+        self.fetch_all_thread.finished.connect(self.update_stop_button)
+        self.fetch_all_thread.start()
+        self.update_stop_button()
+
+    def handle_fetch_all_page(self, rows, fetched, total):
+        """追加一页全量获取的结果"""
+        self.search_results["results"].extend(rows)
+        self.search_results["size"] = fetched
+        self.append_results(rows)
+        self.export_button.setEnabled(True)
+        self.status_changed.emit(f"正在获取全部结果 ({fetched}/{total})")
+        self.update_quota_status()
+
+    def handle_fetch_all_finished(self, summary):
+        """全量获取完成或已停止"""
+        self.progress_bar.setVisible(False)
+        self.search_button.setEnabled(True)
+        self.fetch_all_button.setEnabled(True)
+        if summary.get("cancelled"):
+            self.status_changed.emit(f"已停止获取，保留已获取的 {summary.get('size', 0)} 条结果")
+            return
+        self.status_changed.emit(
+            f"获取完成，共获取 {summary.get('size', 0)} 条结果{self.payload_stats_text(self.fetch_all_thread.api)}"
+        )
+
+    def handle_fetch_all_error(self, error_message):
+        """全量获取出错，保留已获取的结果"""
+        self.progress_bar.setVisible(False)
+        self.search_button.setEnabled(True)
+        self.fetch_all_button.setEnabled(True)
+        QMessageBox.critical(self, "错误", f"获取全部结果失败: {error_message}")
+        self.status_changed.emit(f"获取中断，已获取 {len(self.search_results.get('results', []))} 条结果")
+
+    def payload_stats_text(self, api):
+        """生成Quake响应大小和解析耗时统计文本，用于状态栏显示"""
+        if api is not self.quake_api:
+            return ""
+        stats = self.quake_api.get_payload_stats()
+        if not stats["pages"]:
+            return ""
+        return (f"（平均每页 {stats['bytes_per_page'] / 1024:.1f} KB，"
+                f"解析 {stats['decode_ms_per_page']:.1f} ms）")
+
+    def refresh_quota(self):
+        """在后台线程中刷新已配置引擎的剩余额度"""
+        if self.quota_thread is not None and self.quota_thread.isRunning():
+            return
+        apis = {}
+        if self.config.is_fofa_configured():
+            apis["fofa"] = self.fofa_api
+        if self.config.is_quake_configured():
+            apis["quake"] = self.quake_api
+        if not apis:
+            return
+        self.quota_thread = QuotaRefreshThread(apis)
+        self.quota_thread.quota_refreshed.connect(self.handle_quota_refreshed)
+        self.quota_thread.start()
+
+    def handle_quota_refreshed(self, infos):
+        """额度刷新完成"""
+        for engine, info in infos.items():
+            if "error" in info:
+                print(f"刷新{quota.ENGINE_NAMES.get(engine, engine)}额度失败: {info['error']}")
+        self.update_quota_status()
+
+    def update_quota_status(self):
+        """发送最新的剩余额度文本，用于状态栏显示"""
+        self.quota_changed.emit(quota.status_text())
+
+    def toggle_cache_bypass(self, bypass):
+        """切换是否跳过查询缓存"""
+        self.fofa_api.use_cache = not bypass
+        self.quake_api.use_cache = not bypass
+
+    def connection_stats_text(self):
+        """生成本次批量检索的连接复用统计文本，用于状态栏显示"""
+        before = getattr(self, 'batch_http_stats', None)
+        if before is None:
+            return ""
+        stats = http_session.get_stats()
+        requests_count = stats["requests"] - before["requests"]
+        if requests_count <= 0:
+            return ""
+        return (f"，发出 {requests_count} 个请求，新建连接 {stats['connections'] - before['connections']} 个，"
+                f"复用连接 {stats['reused'] - before['reused']} 次")
+
+    def cache_stats_text(self):
+        """生成缓存命中统计文本，用于状态栏显示"""
+        if self.query_cache is None or not self.query_cache.enabled:
+            return ""
+        stats = self.query_cache.get_stats()
+        return f"（缓存命中 {stats['hits']} 次，未命中 {stats['misses']} 次）"
 
     def handle_search_result(self, result):
         """处理搜索结果"""
+        # 保存结果，转换为列式存储，界面和导出共用，同时写入分页缓存
+        self.store_page_result(self.sender().page_key, result)
+        self.show_page_result(result)
+
+    def show_page_result(self, result, from_page_cache=False):
+        """显示一页查询结果，并预取之后的页面"""
         # 隐藏进度条
         self.progress_bar.setVisible(False)
         self.search_button.setEnabled(True)
 
-        # 保存结果
         self.search_results = result
+        self.batch_results = None
 
         # 更新状态
-        self.status_changed.emit(f"查询完成，共找到 {result.get('size', 0)} 条结果")
+        source = "（来自缓存）" if result.get("from_cache") else ""
+        if from_page_cache:
+            source = "（来自分页缓存）"
+        if "duplicates" in result:
+            # 联合检索结果，显示去重数量和失败的引擎
+            failed = "".join(f"，{name}查询失败: {error}" for name, error in result.get("errors", []))
+            self.status_changed.emit(
+                f"联合检索完成，共找到 {result.get('size', 0)} 条结果，"
+                f"合并后 {len(result.get('results', []))} 条（去除重复 {result['duplicates']} 条）{failed}"
+            )
+        else:
+            self.status_changed.emit(f"查询完成{source}，共找到 {result.get('size', 0)} 条结果")
 
         # 显示结果
         self.display_results(result)
@@ -628,6 +1417,10 @@ class MainPage(QWidget):
 
         # 更新分页按钮状态
         self.update_pagination()
+        self.update_quota_status()
+
+        # 后台预取之后的页面
+        self.prefetch_pages()
 
     def handle_search_error(self, error_message):
         """处理搜索错误"""
@@ -641,9 +1434,6 @@ class MainPage(QWidget):
 
     def display_results(self, result):
         """显示查询结果"""
-        # 清空表格
-        self.result_table.clear()
-
         # 获取结果和字段
         data = result.get("results", [])
         fields = result.get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
@@ -686,7 +1476,9 @@ class MainPage(QWidget):
             'language': '语言',
             'app': '应用',
             'framework': '框架',
-            'body': '正文'
+            'body': '正文',
+            'source': '来源',
+            'change': '变化类型'
         }
 
         # 转换列名为中文
@@ -697,22 +1489,68 @@ class MainPage(QWidget):
             else:
                 chinese_fields.append(field)  # 如果没有对应的中文名，保留原名
 
-        # 设置表格列数和表头
-        self.result_table.setColumnCount(len(fields))
-        self.result_table.setHorizontalHeaderLabels(chinese_fields)
-
-        # 设置表格行数
-        self.result_table.setRowCount(len(data))
-
-        # 填充表格
-        for row, item_data in enumerate(data):
-            for col, value in enumerate(item_data):
-                table_item = QTableWidgetItem(str(value))
-                self.result_table.setItem(row, col, table_item)
+        # 模型直接读取列式容器，不复制结果
+        if not isinstance(data, ResultStore):
+            data = ResultStore.from_rows(fields, data)
+        self.set_table_results(data, chinese_fields)
 
         # 调整列宽
         self.adjust_table_columns(fields)
 
+    def set_table_results(self, store, headers=None):
+        """替换表格显示的结果容器，并按筛选栏的条件重新筛选"""
+        self.result_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.result_model.set_results(store, headers)
+        self.result_index = ResultIndex(store)
+        self.apply_filter()
+
+    def apply_filter(self):
+        """按筛选栏的条件和当前排序列，在后台线程中计算显示的行"""
+        self.filter_timer.stop()
+        if self.result_index is None or self.result_index.store is not self.result_model.store:
+            return
+        if self.filter_thread is not None and self.filter_thread.isRunning():
+            # 上一次筛选完成后再按最新的条件筛选
+            self.filter_pending = True
+            return
+
+        conditions = parse_filter(self.filter_input.text(), self.result_model.field_aliases())
+        sort_col = self.result_model.sort_column
+        if not conditions and sort_col is None:
+            # 没有筛选条件时直接显示全部行，后台线程只提前建立索引
+            if self.result_model.order is not None:
+                self.result_model.set_order(None)
+            self.filter_status_label.setText("")
+
+        self.filter_thread = FilterThread(self.result_index, conditions, sort_col, self.result_model.sort_descending)
+        self.filter_thread.filter_finished.connect(self.handle_filter_finished)
+        self.filter_thread.finished.connect(self.handle_filter_thread_done)
+        self.filter_thread.start()
+
+    def handle_filter_finished(self, store, rows, elapsed):
+        """显示筛选和排序的结果"""
+        if store is not self.result_model.store:
+            return
+        if rows is None and self.result_model.order is None:
+            # 只建立了索引，显示的行没有变化，不重置表格
+            return
+        self.result_model.set_order(rows)
+        if self.filter_input.text().strip():
+            shown = len(rows) if rows is not None else len(store)
+            self.filter_status_label.setText(f"显示 {shown} / {len(store)} 条（{elapsed:.0f} ms）")
+        else:
+            self.filter_status_label.setText("")
+
+    def handle_filter_thread_done(self):
+        """筛选线程结束，期间条件有变化时重新筛选"""
+        if self.filter_pending:
+            self.filter_pending = False
+            self.apply_filter()
+
+    def append_results(self, rows):
+        """结果容器追加行之后通知表格，rows已写入当前显示的结果容器"""
+        self.result_model.rows_appended()
+
     def adjust_table_columns(self, fields):
         """调整表格列宽"""
         header = self.result_table.horizontalHeader()
@@ -724,8 +1562,8 @@ class MainPage(QWidget):
         default_width = int(120 * scale_factor)
         header.setDefaultSectionSize(default_width)
 
-        # 为常用字段设置固定宽度（考虑DPI缩放）
-        fixed_width_columns = {
+        # 常用字段的最大宽度（考虑DPI缩放）
+        max_width_columns = {
             'host': int(200 * scale_factor),  # 主机列宽
             'ip': int(120 * scale_factor),    # IP列宽
             'port': int(60 * scale_factor),   # 端口列宽
@@ -741,14 +1579,12 @@ class MainPage(QWidget):
         for col in range(len(fields)):
             header.setSectionResizeMode(col, QHeaderView.Interactive)
 
-        # 为每列设置适当的宽度
+        # 按抽样行的内容计算列宽，常用字段不超过上面的宽度
+        widths = fit_column_widths(self.result_table, min_width=int(60 * scale_factor),
+                                   max_width=int(300 * scale_factor))
         for col, field in enumerate(fields):
-            if field in fixed_width_columns:
-                width = fixed_width_columns[field]
-                header.resizeSection(col, width)
-            else:
-                # 对于未知字段，设置一个合理的默认宽度
-                header.resizeSection(col, default_width)
+            if field in max_width_columns and col < len(widths):
+                header.resizeSection(col, min(widths[col], max_width_columns[field]))
 
         # 设置最后一列为自动拉伸，填充剩余空间
         if len(fields) > 0:
@@ -794,9 +1630,11 @@ class MainPage(QWidget):
         export_csv_action = QAction("导出为CSV", self)
         export_excel_action = QAction("导出为Excel", self)
         export_json_action = QAction("导出为JSON", self)
+        export_all_action = QAction("逐页导出全部结果为CSV", self)
         menu.addAction(export_csv_action)
         menu.addAction(export_excel_action)
         menu.addAction(export_json_action)
+        menu.addAction(export_all_action)
         action = menu.exec_(QCursor.pos())
         if action == export_csv_action:
             self.export_to_csv()
@@ -804,6 +1642,8 @@ class MainPage(QWidget):
             self.export_to_excel()
         elif action == export_json_action:
             self.export_to_json()
+        elif action == export_all_action:
+            self.export_all_to_csv()
     def export_to_csv(self):
         """导出为CSV"""
         output_dir = QFileDialog.getExistingDirectory(self, "选择导出目录", os.path.expanduser("~"))
@@ -818,6 +1658,42 @@ class MainPage(QWidget):
             QMessageBox.information(self, "导出成功", f"结果已导出到: {result_file}")
         else:
             QMessageBox.critical(self, "导出失败", "导出CSV失败")
+    def export_all_to_csv(self):
+        """按当前查询条件逐页获取全部结果并直接写入CSV"""
+        args = self.get_fetch_all_args()
+        if args is None:
+            return
+
+        output_dir = QFileDialog.getExistingDirectory(self, "选择导出目录", os.path.expanduser("~"))
+        if not output_dir:
+            return
+
+        self.progress_bar.setVisible(True)
+        self.status_changed.emit("正在逐页导出全部结果...")
+
+        self.export_all_thread = ExportAllThread(
+            limit=self.config.get('fetch_all_limit', 10000),
+            output_dir=output_dir,
+            **args
+        )
+        self.export_all_thread.export_finished.connect(self.handle_export_all_finished)
+        self.export_all_thread.finished.connect(self.update_stop_button)
+        self.export_all_thread.start()
+        self.update_stop_button()
+
+    def handle_export_all_finished(self, result_file):
+        """逐页导出完成或已停止"""
+        self.progress_bar.setVisible(False)
+        if result_file and self.export_all_thread.is_cancelled():
+            QMessageBox.information(self, "导出已停止", f"已导出的部分结果保存在: {result_file}")
+            self.status_changed.emit("导出已停止")
+        elif result_file:
+            QMessageBox.information(self, "导出成功", f"结果已导出到: {result_file}")
+            self.status_changed.emit("导出完成")
+        else:
+            QMessageBox.critical(self, "导出失败", "导出CSV失败")
+            self.status_changed.emit("导出失败")
+
     def export_to_excel(self):
         """导出为Excel"""
         output_dir = QFileDialog.getExistingDirectory(self, "选择导出目录", os.path.expanduser("~"))
@@ -845,11 +1721,10 @@ class MainPage(QWidget):
     def show_context_menu(self, pos):
         """显示右键菜单"""
         # 获取选中的行
-        selected_items = self.result_table.selectedItems()
-        if not selected_items:
+        selected_rows = self.result_table.selectionModel().selectedRows()
+        if not selected_rows:
             return
-        selected_row = selected_items[0].row()
-        selected_data = [self.result_table.item(selected_row, col).text() for col in range(self.result_table.columnCount())]
+        selected_data = self.result_model.row_values(selected_rows[0].row())
         # 创建菜单
         menu = QMenu(self)
         # scan_nuclei_action = QAction("使用Nuclei扫描", self)
@@ -881,6 +1756,9 @@ class MainPage(QWidget):
         if not self.afrog_scanner.is_available():
             QMessageBox.warning(self, "警告", "Afrog工具未配置或不可用")
             return
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            QMessageBox.warning(self, "警告", "正在扫描，请等待扫描完成或先停止当前扫描")
+            return
         # 显示进度条
         self.progress_bar.setVisible(True)
         self.status_changed.emit("正在使用Afrog扫描...")
@@ -891,9 +1769,11 @@ class MainPage(QWidget):
         )
         self.scan_thread.scan_finished.connect(self.handle_scan_result)
         self.scan_thread.scan_error.connect(self.handle_scan_error)
+        self.scan_thread.finished.connect(self.update_stop_button)
         self.scan_thread.start()
+        self.update_stop_button()
     def handle_scan_result(self, result):
-        """处理扫描结果"""
+        """处理扫描结果，扫描被停止时显示停止前已发现的漏洞"""
         # 隐藏进度条
         self.progress_bar.setVisible(False)
 
@@ -903,19 +1783,20 @@ class MainPage(QWidget):
             self.status_changed.emit("扫描失败")
             return
 
+        stopped = result.get("cancelled", False)
+        state_text = "扫描已停止" if stopped else "扫描完成"
+
         # 检查是否有有效结果
-        if not result.get("success", False) or "results" not in result:
-            QMessageBox.information(self, "扫描结果", "没有找到任何结果")
-            self.status_changed.emit("扫描完成，无结果")
+        scan_results = result.get("results")
+        if not result.get("success", False) or not isinstance(scan_results, list) or not scan_results:
+            if not stopped:
+                QMessageBox.information(self, "扫描结果", "没有找到任何结果")
+            self.status_changed.emit(f"{state_text}，无结果")
             return
 
         # 处理Afrog扫描结果
-        scan_results = result["results"]
-        if not isinstance(scan_results, list):
-            QMessageBox.information(self, "扫描结果", "没有找到任何结果")
-            self.status_changed.emit("扫描完成，无结果")
-            return
-        QMessageBox.information(self, "扫描完成", "扫描已完成，正在处理结果...")
+        if not stopped:
+            QMessageBox.information(self, "扫描完成", "扫描已完成，正在处理结果...")
         # 提取需要显示的字段
         display_data = []
         for item in scan_results:
@@ -940,32 +1821,24 @@ class MainPage(QWidget):
                 vulnerability_page.update_results(display_data)
 
 
-        # 转换为DataFrame
-        df = pd.DataFrame(display_data)
-
         # 显示结果
-        if df.empty:
-            QMessageBox.information(self, "扫描结果", "没有找到任何结果")
-            self.status_changed.emit("扫描完成，无结果")
+        if not display_data:
+            if not stopped:
+                QMessageBox.information(self, "扫描结果", "没有找到任何结果")
+            self.status_changed.emit(f"{state_text}，无结果")
             return
 
         # 显示结果表格
-        self.result_table.clear()
-        self.result_table.setRowCount(len(df))
-        self.result_table.setColumnCount(len(df.columns))
-        self.result_table.setHorizontalHeaderLabels(df.columns.tolist())
-
-        for row in range(len(df)):
-            for col, col_name in enumerate(df.columns):
-                item = QTableWidgetItem(str(df.iloc[row, col]))
-                self.result_table.setItem(row, col, item)
+        columns = list(display_data[0].keys())
+        self.set_table_results(ResultStore.from_rows(columns, (list(item.values()) for item in display_data)))
 
         # 调整列宽
-        self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        fit_column_widths(self.result_table, min_width=int(60 * self.dpi_scale),
+                          max_width=int(400 * self.dpi_scale))
         self.result_table.horizontalHeader().setStretchLastSection(True)
 
         # 更新状态
-        self.status_changed.emit(f"扫描完成，共找到 {len(df)} 条结果")
+        self.status_changed.emit(f"{state_text}，共找到 {len(display_data)} 条结果")
 
         # 启用导出按钮
         self.export_button.setEnabled(True)
@@ -979,18 +1852,16 @@ class MainPage(QWidget):
         self.status_changed.emit("扫描失败")
     def show_fingerprint_tab(self):
         """批量检索漏洞指纹"""
+        if self.batch_running:
+            QMessageBox.warning(self, "警告", "批量检索正在进行，请等待完成或先停止")
+            return
+
         # 获取当前窗口的父窗口（主窗口）
         main_window = self.window()
 
-        # 获取漏洞指纹标签页
-        fingerprint_tab = None
-        for i in range(main_window.tab_widget.count()):
-            tab = main_window.tab_widget.widget(i)
-            if hasattr(tab, 'fingerprints') and hasattr(tab, 'fingerprint_file'):
-                fingerprint_tab = tab
-                break
-
-        if not fingerprint_tab:
+        # 获取漏洞指纹标签页，尚未创建时会立即创建
+        fingerprint_tab = main_window.get_tab("vulnerability_fingerprint")
+        if not (hasattr(fingerprint_tab, 'fingerprints') and hasattr(fingerprint_tab, 'fingerprint_file')):
             QMessageBox.warning(self, "警告", "未找到漏洞指纹标签页")
             return
 
@@ -1011,6 +1882,10 @@ class MainPage(QWidget):
     def batch_search_fingerprints(self, fingerprints):
         """批量检索漏洞指纹"""
         # 根据当前模式检查API是否已配置
+        if self.current_mode == 2:
+            self.progress_bar.setVisible(False)
+            QMessageBox.warning(self, "警告", "联合检索模式暂不支持批量检索，请切换至FOFA或Quake模式")
+            return
         if self.current_mode == 0:  # FOFA模式
             if not self.config.is_fofa_configured():
                 self.progress_bar.setVisible(False)
@@ -1025,107 +1900,481 @@ class MainPage(QWidget):
             api = self.quake_api
 
         # 获取地区参数
-        province = self.province_combo.currentText()
-        city = self.city_combo.currentText()
-        region = ""
-        if province != "选择省份":
-            if city != "选择城市":
-                region = f"{province} {city}"
-            else:
-                region = province
+        region = self.get_region()
+
+        # 先预检每个指纹的结果数量，确认后再完整检索
+        if self.preflight_checkbox.isChecked():
+            self.start_preflight(api, fingerprints, region)
+        else:
+            self.start_batch_search(api, self.current_mode, fingerprints, region)
+
+    def start_preflight(self, api, fingerprints, region):
+        """并发查询每个指纹的结果总数"""
+        self.status_changed.emit(f"正在预检 {len(fingerprints)} 个指纹的结果数量...")
+        concurrency_key = 'fofa_concurrency' if self.current_mode == 0 else 'quake_concurrency'
+        self.preflight_context = (api, self.current_mode, region)
+        self.preflight_task_id = self.async_loop.submit(preflight_counts(
+            api, self.current_mode, fingerprints, region,
+            concurrency=self.config.get(concurrency_key, 1)
+        ))
+        self.update_stop_button()
+
+    def handle_async_task_finished(self, task_id, result):
+        """处理事件循环线程中完成的任务"""
+        if task_id == self.preflight_task_id:
+            self.preflight_task_id = None
+            self.update_stop_button()
+            self.handle_preflight_result(result)
+
+    def handle_async_task_error(self, task_id, error_message):
+        """处理事件循环线程中出错的任务"""
+        if task_id == self.preflight_task_id:
+            self.preflight_task_id = None
+            self.update_stop_button()
+            self.progress_bar.setVisible(False)
+            QMessageBox.critical(self, "预检错误", f"预检结果数量失败: {error_message}")
+            self.status_changed.emit("预检失败")
+
+    def handle_preflight_result(self, counts):
+        """根据预检结果跳过无结果的指纹，并在确认预计消耗后开始批量检索"""
+        api, api_type, region = self.preflight_context
+        # 每个指纹最多获取的结果数，与BatchSearchWorker一致
+        limit = self.config.get('fetch_all_limit', 10000) if api_type == 0 else 500
+
+        selected = []
+        costs = []  # 用于判断额度是否足够，预检失败的指纹按最多获取的数量计算
+        estimates = []  # 用于显示预计消耗，预检失败的指纹为None（未知）
+        skipped = 0
+        for fingerprint, result in counts:
+            if "error" in result and result["error"] is not False:
+                if result.get("fatal"):
+                    self.progress_bar.setVisible(False)
+                    QMessageBox.critical(self, "预检错误", f"预检结果数量失败: {result['error']}")
+                    self.status_changed.emit("预检失败")
+                    return
+                # 预检失败的指纹无法判断结果数量，保留到完整检索中，按最多获取的数量估算消耗
+                selected.append(fingerprint)
+                costs.append(fingerprint_cost(api_type, limit, limit))
+                estimates.append(None)
+                continue
+            if result.get("size", 0) == 0:
+                skipped += 1
+                continue
+            selected.append(fingerprint)
+            costs.append(fingerprint_cost(api_type, result["size"], limit))
+            estimates.append(costs[-1])
+
+        if not selected:
+            self.progress_bar.setVisible(False)
+            QMessageBox.information(self, "预检完成", f"{skipped} 个指纹均没有结果，无需检索")
+            self.status_changed.emit("预检完成，所有指纹均无结果")
+            return
+
+        # 剩余额度不足时只检索额度足够的前几个指纹
+        engine = "fofa" if api_type == 0 else "quake"
+        budget_text = ""
+        remaining = quota.remaining_text(engine)
+        if remaining:
+            budget_text = f"\n当前{remaining}。"
+        affordable = quota.affordable_count(engine, costs)
+        if affordable == 0:
+            self.progress_bar.setVisible(False)
+            QMessageBox.warning(self, "额度不足", f"剩余额度不足以检索任何指纹。{budget_text}")
+            self.status_changed.emit("额度不足，已取消批量检索")
+            return
+        if affordable < len(selected):
+            budget_text += f"\n剩余额度预计只够检索前 {affordable} 个指纹，其余 {len(selected) - affordable} 个将跳过。"
+            selected = selected[:affordable]
+
+        # 只统计实际要检索的指纹
+        estimate = estimate_batch_cost(api_type, estimates[:len(selected)])
+
+        reply = QMessageBox.question(
+            self, "预检完成",
+            f"共 {len(counts)} 个指纹，跳过 {skipped} 个无结果的指纹，将检索 {len(selected)} 个指纹。\n"
+            f"预计获取 {estimate['rows']} 条结果，{estimate['cost']}。{budget_text}\n是否继续？",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            self.progress_bar.setVisible(False)
+            self.status_changed.emit("已取消批量检索")
+            return
+
+        self.start_batch_search(api, api_type, selected, region)
+
+    def update_resume_button(self):
+        """有未完成的批量检索日志时才允许继续检索"""
+        self.resume_button.setEnabled(BatchJournal.find_unfinished_path() is not None)
+
+    def resume_batch_search(self):
+        """从最近一次未完成的断点日志恢复结果，并只检索剩余的指纹"""
+        if self.batch_running:
+            QMessageBox.warning(self, "警告", "批量检索正在进行，请等待完成或先停止")
+            return
+
+        journal = BatchJournal.find_unfinished()
+        if journal is None:
+            QMessageBox.information(self, "提示", "没有需要继续的批量检索")
+            self.update_resume_button()
+            return
+
+        api_type = journal.header.get("api_type", 0)
+        if api_type == 0:
+            if not self.config.is_fofa_configured():
+                QMessageBox.warning(self, "警告", "请先在配置页面设置FOFA API凭证")
+                return
+            api = self.fofa_api
+        else:
+            if not self.config.is_quake_configured():
+                QMessageBox.warning(self, "警告", "请先在配置页面设置Quake API凭证")
+                return
+            api = self.quake_api
+
+        completed = journal.completed_results()
+        remaining = journal.remaining()
+        mode_name = "FOFA" if api_type == 0 else "Quake"
+        reply = QMessageBox.question(
+            self, "继续批量检索",
+            f"上次的{mode_name}批量检索已完成 {len(completed)} 个指纹，剩余 {len(remaining)} 个。\n是否继续？",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        # 先显示已完成的结果，再检索剩余的指纹
+        self.progress_bar.setVisible(True)
+        self.status_changed.emit(f"已恢复 {len(completed)} 个指纹的结果，正在检索剩余 {len(remaining)} 个指纹...")
+        self.start_batch_search(api, api_type, remaining, journal.header.get("region", ""),
+                                journal=journal, completed=completed, delta=journal.header.get("delta", False))
+
+    def get_snapshot_store(self):
+        """获取资产快照存储，第一次使用增量模式时才创建"""
+        if getattr(self, 'snapshot_store', None) is None:
+            self.snapshot_store = SnapshotStore()
+        return self.snapshot_store
+
+    def start_batch_search(self, api, api_type, fingerprints, region, journal=None, completed=None, delta=None):
+        """
+        在后台线程中执行批量检索
+
+        Args:
+            journal: 继续检索时使用的断点日志，为None时创建新的日志
+            completed: 从断点日志恢复的结果，在检索剩余指纹之前显示
+            delta: 是否为增量检索，为None时使用增量模式开关的状态
+        """
+        # 单页查询的结果会覆盖批量检索的结果，先停止
+        self.stop_search()
+
+        # 记录重试后仍失败的指纹
+        self.batch_failures = []
+
+        # 清空上次的结果，之后每完成一个指纹就追加到表格
+        self.batch_results = None
+        self.batch_running = True
+        # 记录开始时的连接统计，完成后显示本次检索的连接复用情况
+        self.batch_http_stats = http_session.get_stats()
+        for result in completed or []:
+            self.add_batch_result(result)
+        self.refresh_batch_results()
+
+        if delta is None:
+            delta = self.delta_checkbox.isChecked()
+        snapshot_store = None
+        if delta:
+            try:
+                snapshot_store = self.get_snapshot_store()
+            except Exception as e:
+                QMessageBox.warning(self, "警告", f"打开资产快照失败，将进行完整检索: {e}")
+
+        # 每完成一个指纹就写入断点日志
+        if journal is None:
+            try:
+                journal = BatchJournal.create(api_type, region, fingerprints, delta=snapshot_store is not None)
+                # 之前未完成或未删除的日志已被新的检索取代
+                BatchJournal.prune(keep=journal.path)
+            except OSError as e:
+                print(f"创建批量检索日志失败: {e}")
 
         # 创建一个线程来执行批量检索，避免界面卡顿
         self.batch_search_thread = QThread()
-        self.batch_search_worker = BatchSearchWorker(api, self.current_mode, fingerprints, region)
+        concurrency_key = 'fofa_concurrency' if api_type == 0 else 'quake_concurrency'
+        self.batch_search_worker = BatchSearchWorker(
+            api, api_type, fingerprints, region,
+            max_workers=self.config.get(concurrency_key, 1),
+            result_limit=self.config.get('fetch_all_limit', 10000),
+            journal=journal,
+            snapshot_store=snapshot_store
+        )
         self.batch_search_worker.moveToThread(self.batch_search_thread)
 
         # 连接信号
         self.batch_search_thread.started.connect(self.batch_search_worker.run)
         self.batch_search_worker.search_progress.connect(self.update_batch_search_progress)
+        self.batch_search_worker.result_ready.connect(self.add_batch_result)
         self.batch_search_worker.search_finished.connect(self.handle_batch_search_result)
         self.batch_search_worker.search_error.connect(self.handle_batch_search_error)
+        self.batch_search_worker.search_failed.connect(self.handle_batch_search_failed)
         self.batch_search_worker.finished.connect(self.batch_search_thread.quit)
+        self.batch_search_worker.finished.connect(self.update_resume_button)
+        self.batch_search_worker.finished.connect(self.update_stop_button)
 
         # 启动线程
         self.batch_search_thread.start()
+        self.update_stop_button()
 
     def update_batch_search_progress(self, current, total, fingerprint_name):
         """更新批量检索进度"""
-        self.status_changed.emit(f"正在检索 ({current}/{total}): {fingerprint_name}")
+        fetched = len(self.batch_results["raw"]) if self.batch_results else 0
+        self.status_changed.emit(
+            f"正在批量检索，已完成 ({current}/{total}): {fingerprint_name}，已获取 {fetched} 条结果"
+        )
+        self.update_quota_status()
+
+    def handle_batch_search_failed(self, fingerprint_name, error_message):
+        """记录检索失败的指纹，批量检索会继续进行"""
+        self.batch_failures.append((fingerprint_name, error_message))
+        print(f"指纹 {fingerprint_name} 检索失败: {error_message}")
+
+    def batch_failures_text(self):
+        """生成失败指纹统计文本，用于状态栏显示"""
+        failures = getattr(self, 'batch_failures', [])
+        if not failures:
+            return ""
+        return f"，{len(failures)} 个指纹检索失败"
+
+    def add_batch_result(self, result):
+        """追加一个指纹的检索结果，表格由定时器合并刷新"""
+        rows = result.get("results")
+        if not rows:
+            return
+
+        if self.batch_results is None:
+            # 第一个有结果的指纹决定字段，指纹系统名称字段在最前方
+            fields = ["指纹系统名称"] + result.get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
+            merger = dedup.AssetMerger(fields)
+            self.batch_results = {
+                "raw": ResultStore(fields),
+                "dedup": merger.merged,
+                "merger": merger,
+                "fields": fields,
+                "changed": None  # 上次刷新之后指纹名称被修改的去重结果行范围
+            }
+            self.show_batch_results()
+            self.export_button.setEnabled(True)
+
+        # 指纹系统名称作为行首的值写入，不复制原结果行
+        raw = self.batch_results["raw"]
+        start = len(raw)
+        fingerprint_name = result.get('fingerprint', {}).get('name', '未知系统')
+        raw.extend(rows, prefix=(fingerprint_name,))
+
+        # 同时合并重复资产，记录需要重绘的已有行
+        changed = self.batch_results["merger"].add(raw, start)
+        if changed is not None:
+            previous = self.batch_results["changed"]
+            if previous is not None:
+                changed = (min(previous[0], changed[0]), max(previous[1], changed[1]))
+            self.batch_results["changed"] = changed
+
+        if not self.batch_refresh_timer.isActive():
+            self.batch_refresh_timer.start()
+
+    def refresh_batch_results(self):
+        """将上次刷新之后追加的批量检索结果显示到表格"""
+        self.batch_refresh_timer.stop()
+        if not self.batch_results or not self.search_results:
+            return
+        # 表格已切换为其他查询的结果时不刷新
+        if self.search_results["results"] not in (self.batch_results["raw"], self.batch_results["dedup"]):
+            return
+        changed = self.batch_results["changed"]
+        self.batch_results["changed"] = None
+        if changed is not None and self.search_results["results"] is self.batch_results["dedup"]:
+            # 已有资产命中了新的指纹，指纹名称的索引需要重新建立
+            self.result_index.invalidate("指纹系统名称")
+        if self.result_model.rows_appended():
+            if changed is not None:
+                self.result_model.rows_changed(*changed)
+        else:
+            # 筛选或排序时由后台线程重新计算显示的行
+            self.apply_filter()
+        self.search_results["size"] = len(self.search_results["results"])
 
-    def handle_batch_search_result(self, results):
-        """处理批量检索结果"""
+    def handle_batch_search_result(self, succeeded):
+        """批量检索结束，结果已在检索过程中显示"""
         # 隐藏进度条
         self.progress_bar.setVisible(False)
+        self.batch_running = False
+        self.refresh_batch_results()
 
-        # 检查是否有结果
-        if not results:
-            QMessageBox.information(self, "检索完成", "批量检索完成，但没有找到任何结果")
-            self.status_changed.emit("批量检索完成，无结果")
-            return
+        # 批量检索结束后重新获取实际剩余额度
+        self.refresh_quota()
 
-        # 合并所有结果，并添加指纹系统名称
-        all_results = []
-        for result in results:
-            if "results" in result and result["results"]:
-                # 获取指纹信息
-                fingerprint_name = result.get('fingerprint', {}).get('name', '未知系统')
-
-                # 为每个结果添加指纹系统名称到最前方
-                for item in result["results"]:
-                    # 将指纹系统名称添加到结果中的最前方
-                    item_with_fingerprint = list(item)
-                    item_with_fingerprint.insert(0, fingerprint_name)
-                    all_results.append(item_with_fingerprint)
-
-        if not all_results:
+        # 检查是否有结果
+        if not self.batch_results:
+            if self.batch_stopped():
+                self.status_changed.emit(f"批量检索已停止，无结果{self.batch_failures_text()}")
+                return
             QMessageBox.information(self, "检索完成", "批量检索完成，但没有找到任何结果")
-            self.status_changed.emit("批量检索完成，无结果")
+            self.status_changed.emit(f"批量检索完成，无结果{self.batch_failures_text()}")
             return
 
-        # 保存合并后的结果，添加指纹系统名称字段到最前方
-        fields = results[0].get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
-        fields.insert(0, "指纹系统名称")  # 添加指纹系统名称字段到最前方
+        self.status_changed.emit(self.batch_status_text())
 
+    def show_batch_results(self):
+        """按去重开关显示批量检索结果，导出和扫描使用当前显示的结果"""
+        if not self.batch_results:
+            return
+        self.refresh_batch_results()
+        rows = self.batch_results["dedup"] if self.dedup_checkbox.isChecked() else self.batch_results["raw"]
         self.search_results = {
-            "results": all_results,
-            "fields": fields,
-            "size": len(all_results)
+            "results": rows,
+            "fields": self.batch_results["fields"],
+            "size": len(rows)
         }
 
         # 显示结果
         self.display_results(self.search_results)
 
-        # 启用导出按钮
-        self.export_button.setEnabled(True)
-
         # 更新状态
-        self.status_changed.emit(f"批量检索完成，共找到 {len(all_results)} 条结果")
+        if not self.batch_running:
+            self.status_changed.emit(self.batch_status_text())
+
+    def batch_stopped(self):
+        """最近一次批量检索是否被停止"""
+        return self.batch_search_worker is not None and self.batch_search_worker.is_cancelled()
+
+    def batch_status_text(self):
+        """生成批量检索完成或停止后的状态文本"""
+        raw = self.batch_results["raw"]
+        merged = self.batch_results["dedup"]
+        state = "已停止" if self.batch_stopped() else "完成"
+        mode_text = f"增量检索{state}，新增或变化" if "change" in self.batch_results["fields"] else f"批量检索{state}，共找到"
+        resume_text = "，可继续检索剩余的指纹" if self.batch_stopped() else ""
+        return (f"{mode_text} {len(raw)} 条结果，去重后 {len(merged)} 个资产"
+                f"{self.batch_failures_text()}{resume_text}{self.connection_stats_text()}"
+                f"{self.cache_stats_text()}")
 
     def handle_batch_search_error(self, error_message):
         """处理批量检索错误"""
         # 隐藏进度条
         self.progress_bar.setVisible(False)
+        self.batch_running = False
 
         # 显示错误消息
         QMessageBox.critical(self, "检索错误", f"批量检索失败: {error_message}")
         self.status_changed.emit("批量检索失败")
 
+    def stop_search(self):
+        """停止正在进行的单页查询，线程在后台退出，之后到达的结果被丢弃"""
+        if self.search_thread is not None and self.search_thread.isRunning():
+            self.retire_thread(self.search_thread, self.search_thread.search_finished,
+                               self.search_thread.search_error)
+        self.search_thread = None
+
+    def retire_thread(self, thread, *signals):
+        """
+        停止线程并断开其结果信号
+
+        线程退出前保留引用，避免线程对象在运行中被销毁
+        """
+        thread.cancel()
+        for signal in signals:
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass
+        if thread.isRunning():
+            self.stopping_threads.add(thread)
+            thread.finished.connect(lambda: self.stopping_threads.discard(thread))
+
+    def running_tasks(self):
+        """
+        正在进行且尚未停止的任务名称
+
+        Returns:
+            list: 任务名称，用于状态栏显示
+        """
+        tasks = []
+        if (self.search_thread is not None and self.search_thread.isRunning()) or self.waiting_page is not None:
+            tasks.append("查询")
+        threads = [("全量获取", self.fetch_all_thread), ("导出", self.export_all_thread), ("扫描", self.scan_thread)]
+        for name, thread in threads:
+            if thread is not None and thread.isRunning() and not thread.is_cancelled():
+                tasks.append(name)
+        if self.batch_running and not self.batch_stopped():
+            tasks.append("批量检索")
+        if self.preflight_task_id is not None:
+            tasks.append("预检")
+        return tasks
+
+    def update_stop_button(self):
+        """有正在进行的任务时才允许停止"""
+        self.stop_button.setEnabled(bool(self.running_tasks()))
+
+    def stop_tasks(self):
+        """
+        停止正在进行的查询、预取、全量获取、导出、批量检索、预检和扫描，已获取的结果保留
+
+        单页查询、全量获取和预检立即结束，界面马上恢复；导出、批量检索和扫描在中断后报告停止前完成的部分
+        """
+        tasks = self.running_tasks()
+        if not tasks:
+            return
+
+        # 预取同样消耗额度，一并停止，已预取的页面保留在分页缓存中
+        self.waiting_page = None
+        for thread in self.prefetch_threads.values():
+            thread.cancel()
+
+        self.stop_search()
+        if "查询" in tasks:
+            self.status_changed.emit("查询已停止")
+
+        if "全量获取" in tasks:
+            thread = self.fetch_all_thread
+            self.retire_thread(thread, thread.page_fetched, thread.search_finished, thread.search_error)
+            self.handle_fetch_all_finished({"size": len(self.search_results.get("results", [])), "cancelled": True})
+
+        if "预检" in tasks:
+            self.async_loop.cancel(self.preflight_task_id)
+            self.preflight_task_id = None
+            self.status_changed.emit("已停止预检")
+
+        waiting = []
+        if "导出" in tasks:
+            self.export_all_thread.cancel()
+            waiting.append("导出")
+        if "批量检索" in tasks:
+            self.batch_search_worker.cancel()
+            waiting.append("批量检索")
+        if "扫描" in tasks:
+            self.scan_thread.cancel()
+            waiting.append("扫描")
+
+        self.search_button.setEnabled(True)
+        if waiting:
+            self.status_changed.emit(f"正在停止{'、'.join(waiting)}...")
+        else:
+            self.progress_bar.setVisible(False)
+        self.update_stop_button()
+
     def toggle_search_mode(self):
         """切换搜索模式"""
-        self.current_mode = 1 - self.current_mode  # 在0和1之间切换
-        mode_name = "FOFA" if self.current_mode == 0 else "Quake"
+        self.current_mode = (self.current_mode + 1) % 3  # 依次切换FOFA、Quake、联合检索
+        mode_name = ["FOFA", "Quake", "联合"][self.current_mode]
         self.mode_button.setText(f"切换模式({mode_name})")
 
         # 根据模式更新UI状态
+        self.province_combo.setEnabled(True)
+        self.city_combo.setEnabled(True)
+        self.fetch_all_button.setEnabled(self.current_mode != 2)
         if self.current_mode == 0:  # FOFA模式
-            self.province_combo.setEnabled(True)
-            self.city_combo.setEnabled(True)
             self.status_changed.emit("已切换至FOFA模式，支持按地区筛选")
-        else:  # Quake模式
-            self.province_combo.setEnabled(True)
-            self.city_combo.setEnabled(True)
+        elif self.current_mode == 1:  # Quake模式
             self.status_changed.emit("已切换至Quake模式，支持按地区筛选(使用province:\"省份\" city:\"城市\"语法)")
+        else:  # 联合检索模式
+            self.status_changed.emit("已切换至联合检索模式，同时查询FOFA和Quake并按IP和端口去重")
 
     def closeEvent(self, event):
         """关闭事件处理"""
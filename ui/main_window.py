@@ -1,18 +1,27 @@
 from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QVBoxLayout,
                             QWidget, QStatusBar, QLabel, QMessageBox, QApplication)
-from PyQt5.QtCore import Qt, QSize, QEvent
+from PyQt5.QtCore import Qt, QSize, QEvent, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont
 import platform
 import os
 import sys
 
+from utils import startup_profiler
+
 class MainWindow(QMainWindow):
     """主窗口类"""
+    # 定义信号
+    first_painted = pyqtSignal()  # 窗口第一次绘制完成
+    current_tab_ready = pyqtSignal()  # 窗口第一次显示时的当前选项卡页面创建完成
 
     def __init__(self, config):
         super().__init__()
         self.config = config
         self.dpi_scale = self.get_dpi_scale()
+        # 尚未创建的选项卡，索引 -> 创建页面的函数
+        self.lazy_tabs = {}
+        self._shown = False
+        self._painted = False
         self.init_ui()
 
     def get_dpi_scale(self):
@@ -71,6 +80,8 @@ class MainWindow(QMainWindow):
         # 根据DPI缩放调整字体大小
         font_size = int(10 * self.dpi_scale)
         self.tab_widget.setFont(QFont("PingFang SC", font_size))
+        # 第一次切换到选项卡时才创建页面
+        self.tab_widget.currentChanged.connect(self.ensure_tab)
         main_layout.addWidget(self.tab_widget)
 
         # 创建状态栏
@@ -81,6 +92,10 @@ class MainWindow(QMainWindow):
         self.status_label = QLabel("就绪")
         self.status_bar.addWidget(self.status_label)
         
+        # 在状态栏右侧显示API剩余额度
+        self.quota_label = QLabel("")
+        self.status_bar.addPermanentWidget(self.quota_label)
+
         # 在状态栏右侧添加版权信息
         copyright_label = QLabel("© 2025 青山 版权所有")
         self.status_bar.addPermanentWidget(copyright_label)
@@ -99,6 +114,65 @@ class MainWindow(QMainWindow):
         """添加选项卡"""
         self.tab_widget.addTab(widget, title)
 
+    def add_lazy_tab(self, factory, title):
+        """
+        添加延迟创建的选项卡，第一次切换到该选项卡或通过get_tab获取时才调用factory创建页面
+
+        Args:
+            factory: 无参数的函数，返回页面实例
+            title: 选项卡标题
+        """
+        # 添加占位页面时不触发创建
+        self.tab_widget.blockSignals(True)
+        index = self.tab_widget.addTab(QWidget(), title)
+        self.tab_widget.blockSignals(False)
+        self.lazy_tabs[index] = factory
+
+    def ensure_tab(self, index):
+        """
+        创建尚未创建的选项卡页面
+
+        Returns:
+            QWidget: 选项卡页面
+        """
+        factory = self.lazy_tabs.pop(index, None)
+        if factory is None:
+            return self.tab_widget.widget(index)
+
+        title = self.tab_widget.tabText(index)
+        with startup_profiler.phase(f"创建页面:{title}"):
+            widget = factory()
+        placeholder = self.tab_widget.widget(index)
+        current = self.tab_widget.currentIndex()
+
+        # 用创建的页面替换占位页面，保持当前选中的选项卡不变
+        self.tab_widget.blockSignals(True)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, widget, title)
+        self.tab_widget.setCurrentIndex(current)
+        self.tab_widget.blockSignals(False)
+        placeholder.deleteLater()
+        return widget
+
+    def showEvent(self, event):
+        """窗口第一次显示后再创建当前选项卡的页面，先让窗口尽快出现"""
+        super().showEvent(event)
+        if not self._shown:
+            self._shown = True
+            QTimer.singleShot(0, self.create_current_tab)
+
+    def create_current_tab(self):
+        """创建当前选项卡的页面，完成后发送current_tab_ready信号"""
+        self.ensure_tab(self.tab_widget.currentIndex())
+        self.current_tab_ready.emit()
+
+    def paintEvent(self, event):
+        """窗口第一次绘制后发送first_painted信号"""
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_painted.emit()
+
     def show_message(self, title, message, icon=QMessageBox.Information):
         """显示消息对话框"""
         msg_box = QMessageBox(self)
@@ -111,6 +185,10 @@ class MainWindow(QMainWindow):
     def set_status(self, message):
         """设置状态栏消息"""
         self.status_label.setText(message)
+
+    def set_quota_status(self, message):
+        """设置状态栏中的剩余额度"""
+        self.quota_label.setText(message)
         
     def switch_to_tab(self, tab_name):
         """切换到指定的标签页"""
@@ -140,7 +218,7 @@ class MainWindow(QMainWindow):
         }
         
         if tab_name in tab_indices and tab_indices[tab_name] < self.tab_widget.count():
-            return self.tab_widget.widget(tab_indices[tab_name])
+            return self.ensure_tab(tab_indices[tab_name])
         return None
 
 
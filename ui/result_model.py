@@ -0,0 +1,169 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QFontMetrics
+
+from utils.result_store import ResultStore
+
+
+class ResultTableModel(QAbstractTableModel):
+    """
+    基于ResultStore的只读表格模型
+
+    单元格只在视图需要绘制时才从列式容器中读取，不为每个单元格创建对象；
+    筛选和排序的结果是一个行号列表，由后台线程计算后通过set_order设置，不移动数据
+    """
+    # 点击表头请求排序，列号, 是否降序
+    sort_requested = pyqtSignal(int, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = ResultStore([])
+        self.headers = []
+        self.order = None  # 筛选或排序后显示的行号，None表示按原始顺序显示全部行
+        self.count = 0  # 已通知视图的行数，结果容器追加行后才更新
+        self.sort_column = None  # 当前排序的列号
+        self.sort_descending = False
+
+    def set_results(self, store, headers=None):
+        """
+        替换显示的结果，清除筛选和排序
+
+        Args:
+            store: ResultStore结果容器
+            headers: 表头文本，默认为字段名
+        """
+        self.beginResetModel()
+        self.store = store
+        self.headers = list(headers) if headers else list(store.fields)
+        self.order = None
+        self.count = len(store)
+        self.sort_column = None
+        self.sort_descending = False
+        self.endResetModel()
+
+    def set_order(self, order):
+        """
+        设置显示的行号
+
+        Args:
+            order: 按显示顺序排列的结果容器行号，None表示按原始顺序显示全部行
+        """
+        self.beginResetModel()
+        self.order = order
+        self.count = len(self.store)
+        self.endResetModel()
+
+    def rows_appended(self):
+        """
+        结果容器追加行之后调用，通知视图新增的行
+
+        Returns:
+            bool: 是否已显示新增的行，筛选或排序时返回False，需要重新计算显示的行号
+        """
+        if self.order is not None:
+            return False
+        start = self.count
+        end = len(self.store)
+        if end > start:
+            self.beginInsertRows(QModelIndex(), start, end - 1)
+            self.count = end
+            self.endInsertRows()
+        return True
+
+    def rows_changed(self, first, last):
+        """结果容器中[first, last]范围内的行被修改后调用，筛选或排序时重绘全部行"""
+        rows = self.rowCount()
+        if rows == 0:
+            return
+        if self.order is not None:
+            first, last = 0, rows - 1
+        else:
+            last = min(last, rows - 1)
+        self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.order is not None:
+            return len(self.order)
+        return self.count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store.fields)
+
+    def source_row(self, row):
+        """将表格行号转换为结果容器中的行号"""
+        return self.order[row] if self.order is not None else row
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self.store.value(self.source_row(index.row()), index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return section + 1
+
+    def field_aliases(self):
+        """表头文本到字段名的映射，用于筛选条件中使用中文列名"""
+        return dict(zip(self.headers, self.store.fields))
+
+    def row_values(self, row):
+        """读取一行的全部值"""
+        return self.store[self.source_row(row)].to_list()
+
+    def row_value(self, row, field, default=""):
+        """按字段名读取一行中的值，没有该字段时返回default"""
+        if field not in self.store.fields:
+            return default
+        return self.store.value(self.source_row(row), self.store.fields.index(field))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """记录排序条件并请求排序，排序在后台线程中进行"""
+        if column < 0 or column >= self.columnCount():
+            return
+        self.sort_column = column
+        self.sort_descending = order == Qt.DescendingOrder
+        self.sort_requested.emit(column, self.sort_descending)
+
+
+def fit_column_widths(view, sample_size=200, min_width=60, max_width=400, padding=24):
+    """
+    按抽样行的内容调整列宽，避免ResizeToContents遍历全部行
+
+    Args:
+        view: 表格视图
+        sample_size: 参与计算的行数，在全部行中均匀抽取
+        min_width: 最小列宽
+        max_width: 最大列宽
+        padding: 文本两侧的留白
+
+    Returns:
+        list: 每列的宽度
+    """
+    model = view.model()
+    rows = model.rowCount()
+    columns = model.columnCount()
+    metrics = QFontMetrics(view.font())
+    header_metrics = QFontMetrics(view.horizontalHeader().font())
+    step = max(1, rows // sample_size)
+    sample = range(0, rows, step)
+
+    widths = []
+    header = view.horizontalHeader()
+    for col in range(columns):
+        width = header_metrics.width(str(model.headerData(col, Qt.Horizontal) or ""))
+        for row in sample:
+            text = model.index(row, col).data()
+            if text:
+                width = max(width, metrics.width(str(text)))
+                if width >= max_width:
+                    break
+        width = max(min_width, min(max_width, width + padding))
+        header.resizeSection(col, width)
+        widths.append(width)
+    return widths
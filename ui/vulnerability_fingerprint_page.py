@@ -13,6 +13,8 @@ from datetime import datetime
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import QProgressDialog
 
+from utils import http_session, startup_profiler
+
 class AddEditFingerprintDialog(QDialog):
     """添加或编辑指纹对话框"""
     def __init__(self, parent=None, fingerprint=None):
@@ -282,11 +284,12 @@ class VulnerabilityFingerprintPage(QWidget):
     def load_fingerprints(self):
         """加载所有已保存的指纹"""
         try:
-            if os.path.exists(self.fingerprint_file):
-                with open(self.fingerprint_file, 'r', encoding='utf-8') as f:
-                    self.fingerprints = json.load(f)
-            else:
-                self.fingerprints = []
+            with startup_profiler.phase("加载指纹"):
+                if os.path.exists(self.fingerprint_file):
+                    with open(self.fingerprint_file, 'r', encoding='utf-8') as f:
+                        self.fingerprints = json.load(f)
+                else:
+                    self.fingerprints = []
 
             # 显示所有指纹
             self.display_fingerprints(self.fingerprints)
@@ -457,7 +460,7 @@ class VulnerabilityFingerprintPage(QWidget):
                 # 检查URL可达性
                 self.progress.emit(10, "正在检查URL可达性...")
                 try:
-                    head_response = requests.head(url, timeout=10)
+                    head_response = http_session.head(url, timeout=10)
                     if head_response.status_code == 404:
                         self.error.emit("远程URL不存在(404错误)")
                         return
@@ -471,7 +474,7 @@ class VulnerabilityFingerprintPage(QWidget):
                 # 获取远程指纹数据
                 self.progress.emit(30, "正在获取远程指纹数据...")
                 try:
-                    response = requests.get(url, timeout=10)
+                    response = http_session.get(url, timeout=10)
                     response.raise_for_status()
                     
                     # 检查内容类型
@@ -5,7 +5,6 @@ from PyQt5.QtWidgets import (
 
 from PyQt5.QtCore import pyqtSignal, Qt, QTimer
 
-import pandas as pd
 import os
 import json
 
@@ -3,9 +3,16 @@ import json
 import os
 from datetime import datetime
 
+from utils import cancel
+
 class AfrogScanner:
     """Afrog工具调用类"""
 
+    # 等待afrog结束期间检查任务是否已取消的间隔（秒）
+    POLL_INTERVAL = 0.2
+    # 终止afrog后等待其退出的时间（秒），超时后强制结束
+    TERMINATE_TIMEOUT = 5
+
     def __init__(self, afrog_path=''):
         self.afrog_path = afrog_path
 
@@ -59,7 +66,16 @@ class AfrogScanner:
                 stderr=subprocess.PIPE,
                 text=True
             )
-            stdout, stderr = process.communicate()
+            stdout, stderr, cancelled = self.wait_process(process)
+
+            # 任务取消时保留已写入结果文件的漏洞
+            if cancelled:
+                return {
+                    "success": True,
+                    "cancelled": True,
+                    "output_file": output_file,
+                    "results": self.load_partial_results(output_file)
+                }
 
             # 检查命令是否成功执行
             if process.returncode != 0:
@@ -81,4 +97,63 @@ class AfrogScanner:
             else:
                 return {"error": "扫描完成，但未生成结果文件"}
         except Exception as e:
-            return {"error": f"执行Afrog时出错: {str(e)}"}
\ No newline at end of file
+            return {"error": f"执行Afrog时出错: {str(e)}"}
+
+    def wait_process(self, process):
+        """
+        等待afrog结束，当前线程的任务取消时终止afrog
+
+        Returns:
+            tuple: (标准输出, 标准错误, 是否已取消)
+        """
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=self.POLL_INTERVAL)
+                return stdout, stderr, False
+            except subprocess.TimeoutExpired:
+                if cancel.is_cancelled():
+                    break
+
+        process.terminate()
+        try:
+            stdout, stderr = process.communicate(timeout=self.TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+        return stdout, stderr, True
+
+    @staticmethod
+    def load_partial_results(output_file):
+        """
+        读取被终止的afrog写入的结果，文件没有写完时恢复已完整写入的条目
+
+        Returns:
+            list: 已发现的漏洞
+        """
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return []
+
+        try:
+            results = json.loads(text)
+            return results if isinstance(results, list) else []
+        except json.JSONDecodeError:
+            pass
+
+        # 结果文件是JSON数组，逐条解析到第一个不完整的条目为止
+        decoder = json.JSONDecoder()
+        results = []
+        position = text.find('[') + 1
+        if position == 0:
+            return results
+        while True:
+            while position < len(text) and text[position] in ' \t\r\n,':
+                position += 1
+            try:
+                item, position = decoder.raw_decode(text, position)
+            except json.JSONDecodeError:
+                break
+            results.append(item)
+        return results
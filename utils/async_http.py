@@ -0,0 +1,240 @@
+import asyncio
+import atexit
+import concurrent.futures
+import importlib.util
+import threading
+
+from utils import http_session, cancel
+
+"""
+asyncio版本的共享HTTP会话和共享事件循环
+
+FOFA和Quake的检索只有协程一种实现，所有请求都在同一个后台线程的事件循环中执行，
+同时进行的大量请求不需要每个请求占用一个线程。同步接口通过run和iterate提交协程并等待结果，
+调用线程绑定的取消令牌（见utils.cancel）被取消时，正在执行的协程会立即被取消，包括等待响应头的阶段
+
+aiohttp导入较慢，第一次检索时才导入，未安装时检索会返回错误
+"""
+
+
+class _MissingAiohttpError(Exception):
+    """未安装aiohttp时的占位异常"""
+
+
+_aiohttp = None
+
+
+def _load_aiohttp():
+    """导入aiohttp，未安装时返回None"""
+    global _aiohttp
+    if _aiohttp is None and is_available():
+        import aiohttp
+        _aiohttp = aiohttp
+    return _aiohttp
+
+
+def __getattr__(name):
+    """ClientError等异常类在第一次访问时才导入aiohttp"""
+    if name in ("ClientError", "ClientConnectionError", "ClientPayloadError"):
+        aiohttp = _load_aiohttp()
+        return getattr(aiohttp, name) if aiohttp else _MissingAiohttpError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 每个事件循环对应一个会话，aiohttp的会话不能跨事件循环使用
+_sessions = {}
+
+# 共享事件循环及其线程
+_loop_lock = threading.Lock()
+_loop = None
+_loop_thread = None
+
+
+def is_available():
+    """检查是否安装了aiohttp，不导入aiohttp"""
+    return _aiohttp is not None or importlib.util.find_spec("aiohttp") is not None
+
+
+def timeout(seconds):
+    """构造请求超时设置，与requests的timeout含义一致：连接和每次读取的超时，不限制总时长"""
+    return _load_aiohttp().ClientTimeout(total=None, sock_connect=seconds, sock_read=seconds)
+
+
+async def get_session():
+    """获取当前事件循环的共享会话，连接池大小与同步会话的配置一致"""
+    aiohttp = _load_aiohttp()
+    if aiohttp is None:
+        raise RuntimeError("未安装aiohttp，无法检索")
+
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        pool_connections, pool_maxsize = http_session.get_pool_config()
+        connector = aiohttp.TCPConnector(
+            limit=pool_connections * pool_maxsize,
+            limit_per_host=pool_maxsize
+        )
+        session = aiohttp.ClientSession(connector=connector, trace_configs=[_trace_config(aiohttp)])
+        _sessions[loop] = session
+    return session
+
+
+def _trace_config(aiohttp):
+    """跟踪每个请求的主机和新建的连接，连接复用统计与requests会话一起通过http_session.get_stats获取"""
+    async def on_request_start(session, context, params):
+        context.host = f"{params.url.scheme}://{params.url.host}:{params.url.port}"
+        http_session.record_async(context.host, requests=1)
+
+    async def on_connection_create_end(session, context, params):
+        http_session.record_async(getattr(context, "host", ""), connections=1)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+async def close_session():
+    """关闭当前事件循环的会话，在事件循环退出前调用"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def gather_limited(coros, limit):
+    """
+    并发执行多个协程，同时运行的数量不超过limit
+
+    Args:
+        coros: 协程列表
+        limit: 最大并发数
+
+    Returns:
+        list: 与coros顺序一致的结果列表
+    """
+    semaphore = asyncio.Semaphore(max(1, int(limit)))
+
+    async def run(coro):
+        try:
+            async with semaphore:
+                return await coro
+        finally:
+            # 取消时还在排队的协程没有开始执行，关闭后不会产生未等待的警告
+            coro.close()
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+def _run_loop(loop):
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        # 关闭共享会话并清理未完成的任务
+        loop.run_until_complete(close_session())
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def get_loop():
+    """获取共享事件循环，第一次调用时启动事件循环线程"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_run_loop, args=(_loop,),
+                                            name="asyncio-loop", daemon=True)
+            _loop_thread.start()
+            # 没有调用shutdown就退出时也关闭会话
+            atexit.register(shutdown)
+        return _loop
+
+
+def shutdown():
+    """停止共享事件循环并等待线程退出，之后再提交协程时会重新启动"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        loop, thread = _loop, _loop_thread
+        _loop = None
+        _loop_thread = None
+    if loop is not None:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def submit(coro):
+    """
+    提交协程到共享事件循环，可在任意线程调用
+
+    Returns:
+        concurrent.futures.Future: 协程的结果
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def _wait(future):
+    """等待协程完成，当前线程的任务取消时取消协程并抛出cancel.Cancelled"""
+    token = cancel.current_token()
+    if token is None:
+        return future.result()
+    try:
+        with token.on_cancel(future.cancel):
+            return future.result()
+    except concurrent.futures.CancelledError:
+        raise cancel.Cancelled()
+
+
+def run(coro):
+    """
+    在共享事件循环中执行检索协程并等待结果，供同步接口使用
+
+    Returns:
+        dict: 协程返回的结果字典，当前线程的任务已取消时为cancel.cancelled_result()
+    """
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("不能在事件循环线程中等待协程，请直接await")
+    if cancel.is_cancelled():
+        coro.close()
+        return cancel.cancelled_result()
+    try:
+        return _wait(submit(coro))
+    except cancel.Cancelled:
+        return cancel.cancelled_result()
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+async def _aclose(agen):
+    try:
+        await agen.aclose()
+    except RuntimeError:
+        # 生成器仍在被取消的任务中执行，任务结束时会自行关闭
+        pass
+
+
+def iterate(agen):
+    """
+    逐项获取检索异步生成器的结果，供同步接口使用
+
+    Yields:
+        dict: 异步生成器产出的结果，当前线程的任务取消时最后产出cancel.cancelled_result()
+    """
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("不能在事件循环线程中等待协程，请直接async for")
+    try:
+        while True:
+            cancel.check()
+            try:
+                item = _wait(submit(_anext(agen)))
+            except StopAsyncIteration:
+                return
+            yield item
+    except cancel.Cancelled:
+        yield cancel.cancelled_result()
+    finally:
+        # 调用方提前结束迭代时关闭生成器，释放连接
+        submit(_aclose(agen))
@@ -0,0 +1,76 @@
+import uuid
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils import async_http
+
+"""
+在async_http的共享事件循环中执行协程，协程的结果通过Qt信号回到界面线程
+"""
+
+
+class AsyncTaskRunner(QObject):
+    """提交协程到共享事件循环，并在协程完成时发送信号"""
+    # 定义信号
+    task_finished = pyqtSignal(str, object)  # 任务ID, 协程返回值
+    task_error = pyqtSignal(str, str)  # 任务ID, 错误信息
+
+    def __init__(self):
+        super().__init__()
+        self._futures = {}  # 任务ID -> 尚未完成的任务
+
+    def submit(self, coro, task_id=None):
+        """
+        提交协程到事件循环，可在任意线程调用
+
+        Args:
+            coro: 要执行的协程
+            task_id: 任务ID，用于在信号中区分不同任务，默认自动生成
+
+        Returns:
+            str: 任务ID，协程完成后通过task_finished或task_error信号返回
+        """
+        task_id = task_id or uuid.uuid4().hex
+        future = async_http.submit(coro)
+        self._futures[task_id] = future
+
+        def on_done(done_future):
+            self._futures.pop(task_id, None)
+            # 已取消的任务不发送信号
+            if done_future.cancelled():
+                return
+            try:
+                self.task_finished.emit(task_id, done_future.result())
+            except Exception as e:
+                self.task_error.emit(task_id, str(e))
+
+        future.add_done_callback(on_done)
+        return task_id
+
+    def cancel(self, task_id):
+        """
+        取消尚未完成的任务，协程在下一个await处停止，不再发送该任务的信号
+
+        Returns:
+            bool: 是否已取消，任务已完成或不存在时返回False
+        """
+        future = self._futures.pop(task_id, None)
+        return future is not None and future.cancel()
+
+    def stop(self):
+        """取消所有未完成的任务，停止事件循环并等待线程退出"""
+        for future in list(self._futures.values()):
+            future.cancel()
+        self._futures.clear()
+        async_http.shutdown()
+
+
+_runner = None
+
+
+def get_task_runner():
+    """获取全局共享的协程任务执行器"""
+    global _runner
+    if _runner is None:
+        _runner = AsyncTaskRunner()
+    return _runner
@@ -0,0 +1,241 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+"""
+批量检索断点日志：每个指纹检索完成后立即追加一行JSON到日志文件，
+程序崩溃、断网或额度不足中断后，可以从日志恢复已完成的结果并只检索剩余的指纹
+
+日志格式（每行一个JSON对象）:
+    {"type": "header", "id", "api_type", "region", "delta", "fingerprints", "created"}
+    {"type": "result", "key", "result"}
+全部完成后删除日志文件，开始新的批量检索时删除其余的日志
+"""
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'results', 'journal')
+
+
+# 结果行的开头，key位于result之前，读取摘要时只解析key，不解析检索结果
+_RESULT_PREFIX = '{"type": "result", "key": '
+
+
+def fingerprint_key(fingerprint):
+    """生成指纹的唯一标识，由名称和查询语句组成"""
+    return f"{fingerprint.get('name', '')}\n{fingerprint.get('url', '')}"
+
+
+def remaining_fingerprints(header, completed):
+    """获取日志头中尚未完成的指纹列表，completed为已完成的指纹标识集合或映射"""
+    return [fp for fp in header.get("fingerprints", [])
+            if fp.get('url', '') and fingerprint_key(fp) not in completed]
+
+
+class BatchJournal:
+    """只追加的批量检索日志，线程安全"""
+
+    def __init__(self, path, header, completed=None):
+        """
+        Args:
+            path: 日志文件路径
+            header: 日志头信息
+            completed: 已完成的指纹标识到检索结果的映射
+        """
+        self.path = path
+        self.header = header
+        self.completed = completed or {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def create(cls, api_type, region, fingerprints, delta=False, journal_dir=DEFAULT_JOURNAL_DIR):
+        """创建新的日志文件并写入日志头，delta表示是否为增量检索"""
+        os.makedirs(journal_dir, exist_ok=True)
+        journal_id = time.strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:8]
+        header = {
+            "type": "header",
+            "id": journal_id,
+            "api_type": api_type,
+            "region": region,
+            "delta": delta,
+            "fingerprints": fingerprints,
+            "created": time.time()
+        }
+        journal = cls(os.path.join(journal_dir, f"batch_{journal_id}.jsonl"), header)
+        journal._write(header)
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取日志文件，最后一行写入不完整时忽略该行
+
+        Returns:
+            BatchJournal: 日志对象，文件没有有效的日志头时返回None
+        """
+        header = None
+        completed = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("type") == "header":
+                        header = entry
+                    elif entry.get("type") == "result":
+                        completed[entry["key"]] = entry["result"]
+        except OSError as e:
+            print(f"读取批量检索日志失败: {e}")
+            return None
+        if header is None:
+            return None
+        return cls(path, header, completed)
+
+    @staticmethod
+    def read_summary(path):
+        """
+        只读取日志头和已完成的指纹标识，不解析检索结果，用于快速判断日志是否已完成
+
+        Returns:
+            tuple: (日志头, 已完成的指纹标识集合)，文件没有有效的日志头时返回None
+        """
+        decoder = json.JSONDecoder()
+        header = None
+        completed = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # 没有换行符的最后一行写入不完整，与load一致忽略
+                    if not line.endswith("\n"):
+                        continue
+                    if line.startswith(_RESULT_PREFIX):
+                        try:
+                            key, _ = decoder.raw_decode(line, len(_RESULT_PREFIX))
+                        except json.JSONDecodeError:
+                            continue
+                        completed.add(key)
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("type") == "header":
+                        header = entry
+        except OSError as e:
+            print(f"读取批量检索日志失败: {e}")
+            return None
+        if header is None:
+            return None
+        return header, completed
+
+    @staticmethod
+    def list_paths(journal_dir=DEFAULT_JOURNAL_DIR):
+        """按修改时间从新到旧列出日志文件"""
+        paths = glob.glob(os.path.join(journal_dir, "batch_*.jsonl"))
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+        return sorted(mtimes, key=mtimes.get, reverse=True)
+
+    @classmethod
+    def find_unfinished_path(cls, journal_dir=DEFAULT_JOURNAL_DIR):
+        """
+        查找最近一次未完成的批量检索日志，只读取摘要
+
+        Returns:
+            str: 日志路径，没有未完成的日志时返回None
+        """
+        for path in cls.list_paths(journal_dir):
+            summary = cls.read_summary(path)
+            if summary is not None and remaining_fingerprints(*summary):
+                return path
+        return None
+
+    @classmethod
+    def find_unfinished(cls, journal_dir=DEFAULT_JOURNAL_DIR):
+        """
+        查找并读取最近一次未完成的批量检索日志
+
+        Returns:
+            BatchJournal: 日志对象，没有未完成的日志时返回None
+        """
+        path = cls.find_unfinished_path(journal_dir)
+        return cls.load(path) if path is not None else None
+
+    @classmethod
+    def prune(cls, keep=None, journal_dir=DEFAULT_JOURNAL_DIR):
+        """
+        删除keep以外的所有日志，开始新的批量检索时调用，之前的日志已被新的检索取代
+
+        Args:
+            keep: 需要保留的日志路径
+        """
+        keep = os.path.abspath(keep) if keep else None
+        for path in cls.list_paths(journal_dir):
+            if os.path.abspath(path) == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"删除批量检索日志失败: {e}")
+
+    def _write(self, entry):
+        """追加一行并立即写入磁盘"""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+                # 上次中断时最后一行可能不完整，从新的一行开始追加，避免与新记录连在一起
+                if self._file.tell() > 0 and not self._ends_with_newline():
+                    self._file.write("\n")
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self):
+        """日志文件是否以换行符结尾"""
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def append(self, fingerprint, result):
+        """记录一个已完成的指纹及其检索结果"""
+        key = fingerprint_key(fingerprint)
+        self._write({"type": "result", "key": key, "result": result})
+        with self._lock:
+            self.completed[key] = result
+
+    def remaining(self):
+        """获取尚未完成的指纹列表"""
+        return remaining_fingerprints(self.header, self.completed)
+
+    def completed_results(self):
+        """按日志头中的指纹顺序返回已完成的检索结果"""
+        results = []
+        for fp in self.header.get("fingerprints", []):
+            result = self.completed.get(fingerprint_key(fp))
+            if result is not None:
+                results.append(result)
+        return results
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self):
+        """全部指纹检索完成，删除日志文件"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"删除批量检索日志失败: {e}")
@@ -0,0 +1,122 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+
+"""
+后台任务的协作式取消
+
+每个可以停止的任务持有一个CancelToken，调用cancel()后：
+    - 通过async_http提交到共享事件循环的检索协程立即被取消，包括请求、重试和限速的等待
+    - 取消导致的失败不再重试
+    - afrog子进程被终止
+任务在下一个检查点停止，已获取的结果保留
+
+令牌通过use_token绑定到当前线程，async_http、retry和afrog通过current_token读取，
+不需要在每个API方法中传递。
+令牌保存在contextvars中，通过async_http提交到共享事件循环的协程也能读取到提交线程的令牌。
+一个令牌只用于一个任务，取消后不能恢复。
+"""
+
+# 取消后结果中的错误信息
+CANCELLED_MESSAGE = "已取消"
+
+
+class Cancelled(Exception):
+    """任务已被取消"""
+
+    def __init__(self, message=CANCELLED_MESSAGE):
+        super().__init__(message)
+
+
+class CancelToken:
+    """线程安全的取消令牌"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        """是否已取消"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """请求取消，可以在任意线程调用，重复调用不会再次执行回调"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"执行取消回调出错: {e}")
+
+    def raise_if_cancelled(self):
+        """已取消时抛出Cancelled"""
+        if self._event.is_set():
+            raise Cancelled()
+
+    def add_callback(self, callback):
+        """注册取消时执行的回调，在调用cancel的线程中执行，已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        """注销回调"""
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """在with块执行期间取消时执行回调"""
+        self.add_callback(callback)
+        try:
+            yield self
+        finally:
+            self.remove_callback(callback)
+
+
+_token = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current_token():
+    """获取绑定到当前线程（或协程）的令牌，没有时返回None"""
+    return _token.get()
+
+
+@contextmanager
+def use_token(token):
+    """在with块执行期间将令牌绑定到当前线程"""
+    reset = _token.set(token)
+    try:
+        yield token
+    finally:
+        _token.reset(reset)
+
+
+def is_cancelled():
+    """当前线程的任务是否已取消"""
+    token = current_token()
+    return token is not None and token.cancelled
+
+
+def check():
+    """当前线程的任务已取消时抛出Cancelled"""
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancelled_result():
+    """生成表示已取消的结果字典"""
+    return {"error": CANCELLED_MESSAGE, "cancelled": True}
@@ -0,0 +1,138 @@
+from utils.result_store import ResultStore
+
+"""
+批量检索结果去重：同一资产命中多个指纹时合并为一行，并记录所有命中的指纹名称，
+支持在批量检索过程中逐批合并
+"""
+
+# 合并后指纹名称之间的分隔符
+NAME_SEPARATOR = ", "
+
+
+def normalize_host(host, port=""):
+    """
+    规范化主机名：转为小写，去掉协议前缀、末尾的斜杠和与端口相同的端口后缀
+
+    Examples:
+        "https://Example.com:443/" -> "example.com"（port为443时）
+    """
+    host = host.strip().lower()
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = host.rstrip("/")
+    if port and host.endswith(f":{port}"):
+        host = host[:-len(port) - 1]
+    return host
+
+
+def asset_key(host, ip, port):
+    """生成资产去重键 (ip, port, host)"""
+    port = str(port).strip()
+    return ip.strip(), port, normalize_host(host, port)
+
+
+class NamesColumn:
+    """
+    合并结果的指纹名称列，保存每行命中的指纹名称列表，读取时才拼接
+
+    名称列表随合并不断变长，不保存拼接后的字符串，内存只与指纹名称的数量有关
+    """
+    __slots__ = ("names",)
+
+    def __init__(self):
+        self.names = []  # 每行命中的指纹名称列表
+
+    def append(self, value):
+        self.names.append([value])
+
+    def add_name(self, index, name):
+        """为已有的行添加指纹名称，已包含该名称时返回False"""
+        names = self.names[index]
+        if name in names:
+            return False
+        names.append(name)
+        return True
+
+    def __getitem__(self, index):
+        return NAME_SEPARATOR.join(self.names[index])
+
+    def __len__(self):
+        return len(self.names)
+
+    def nbytes(self):
+        """估算占用的字节数，相同的名称字符串在各行之间共用，只计算列表本身"""
+        return sum(8 * len(names) for names in self.names)
+
+
+class AssetMerger:
+    """
+    逐批合并重复资产，批量检索过程中每完成一个指纹就可以追加结果
+
+    merged中每个资产只有一行，指纹名称字段为所有命中的指纹名称，
+    保留每个资产第一次出现时的其他字段
+    """
+
+    def __init__(self, fields, name_field="指纹系统名称"):
+        """
+        Args:
+            fields: 结果字段，与原始结果相同
+            name_field: 指纹名称所在的字段
+        """
+        self.merged = ResultStore(fields)
+        self.name_col = list(fields).index(name_field)
+        # 指纹名称列只保存名称列表，合并时不产生新的拼接字符串
+        self.names = self.merged.columns[self.name_col] = NamesColumn()
+        self.rows = {}  # 去重键 -> 合并结果中的行号
+
+    def add(self, store, start=0, end=None):
+        """
+        合并原始结果中[start, end)范围内的行
+
+        Args:
+            store: 原始结果，字段与合并结果相同
+            start: 起始行号
+            end: 结束行号，默认为store末尾
+
+        Returns:
+            tuple: 指纹名称被修改的已有行的范围(最小行号, 最大行号)，没有修改时为None
+        """
+        end = len(store) if end is None else end
+        fields = store.fields
+        # 直接按列读取，不为每行创建视图
+        names = store.columns[self.name_col]
+        empty = [""] * end
+        hosts = store.columns[fields.index("host")] if "host" in fields else empty
+        ips = store.columns[fields.index("ip")] if "ip" in fields else empty
+        ports = store.columns[fields.index("port")] if "port" in fields else empty
+
+        existing = len(self.merged)
+        changed = set()
+        for index in range(start, end):
+            key = asset_key(hosts[index], ips[index], ports[index])
+            name = names[index]
+            row = self.rows.get(key)
+            if row is None:
+                self.rows[key] = len(self.merged)
+                self.merged.append(store[index])
+            elif self.names.add_name(row, name):
+                changed.add(row)
+
+        updated = [row for row in changed if row < existing]
+        return (min(updated), max(updated)) if updated else None
+
+
+def dedup_by_asset(store, name_field="指纹系统名称"):
+    """
+    按(ip, port, host)合并重复资产，一次遍历完成
+
+    Args:
+        store: 批量检索的原始结果，每行为一个(指纹, 资产)组合
+        name_field: 指纹名称所在的字段
+
+    Returns:
+        ResultStore: 去重后的结果，字段与store相同，指纹名称字段为所有命中的指纹名称，
+                     保留每个资产第一次出现时的其他字段
+    """
+    merger = AssetMerger(store.fields, name_field)
+    merger.add(store)
+    return merger.merged
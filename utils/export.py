@@ -1,10 +1,42 @@
 import os
-import pandas as pd
+import csv
+import json
+import sys
 from datetime import datetime
 
+from utils.result_store import ResultStore
+
+
+def is_dataframe(data):
+    """判断是否为DataFrame，pandas尚未导入时不可能是DataFrame，不需要为此导入pandas"""
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(data, pandas.DataFrame)
+
+
 class ResultExporter:
     """结果导出类"""
 
+    @staticmethod
+    def to_dataframe(data):
+        """
+        将导出数据转换为DataFrame
+
+        Args:
+            data: ResultStore、列表或DataFrame，ResultStore按列转换并使用其字段名作为表头
+
+        Returns:
+            pandas.DataFrame: 转换后的数据
+        """
+        # pandas导入较慢，只在导出时才导入
+        import pandas as pd
+
+        if isinstance(data, pd.DataFrame):
+            return data
+        if isinstance(data, ResultStore):
+            return pd.DataFrame(data.to_columns(), columns=data.fields)
+        # 假设data是一个字典列表或二维列表
+        return pd.DataFrame(data)
+
     @staticmethod
     def export_to_csv(data, output_dir=None, filename=None):
         """
@@ -40,11 +72,7 @@ class ResultExporter:
             output_file = os.path.join(output_dir, filename)
 
             # 如果数据不是DataFrame，则转换为DataFrame
-            if not isinstance(data, pd.DataFrame):
-                # 假设data是一个字典列表或二维列表
-                df = pd.DataFrame(data)
-            else:
-                df = data
+            df = ResultExporter.to_dataframe(data)
 
             # 导出为CSV
             df.to_csv(output_file, index=False, encoding='utf-8-sig')
@@ -54,6 +82,53 @@ class ResultExporter:
             print(f"导出CSV失败: {e}")
             return None
 
+    @staticmethod
+    def export_rows_to_csv(rows, fields=None, output_dir=None, filename=None):
+        """
+        逐行写入CSV文件，rows可以是生成器，边获取边写入，不会把全部结果读入内存
+
+        Args:
+            rows: 可迭代的结果行，例如FofaAPI.iter_search的返回值
+            fields: 表头，为None时不写表头
+            output_dir: 输出目录，默认为当前目录下的results/exports
+            filename: 文件名，默认为自动生成
+
+        Returns:
+            str: 导出文件的路径，如果失败则返回None
+        """
+        try:
+            # 如果未指定输出目录，则使用默认目录
+            if not output_dir:
+                output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'results', 'exports')
+
+            # 确保输出目录存在
+            os.makedirs(output_dir, exist_ok=True)
+
+            # 如果未指定文件名，则自动生成
+            if not filename:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"fofa_results_{timestamp}.csv"
+
+            # 确保文件名以.csv结尾
+            if not filename.endswith('.csv'):
+                filename += '.csv'
+
+            # 完整的输出文件路径
+            output_file = os.path.join(output_dir, filename)
+
+            with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                if fields:
+                    writer.writerow(fields)
+                for row in rows:
+                    writer.writerow(row)
+
+            return output_file
+        except Exception as e:
+            print(f"导出CSV失败: {e}")
+            return None
+
     @staticmethod
     def export_to_excel(data, output_dir=None, filename=None):
         """
@@ -89,11 +164,7 @@ class ResultExporter:
             output_file = os.path.join(output_dir, filename)
 
             # 如果数据不是DataFrame，则转换为DataFrame
-            if not isinstance(data, pd.DataFrame):
-                # 假设data是一个字典列表或二维列表
-                df = pd.DataFrame(data)
-            else:
-                df = data
+            df = ResultExporter.to_dataframe(data)
 
             # 导出为Excel
             df.to_excel(output_file, index=False)
@@ -103,6 +174,53 @@ class ResultExporter:
             print(f"导出Excel失败: {e}")
             return None
 
+    @staticmethod
+    def export_to_json(data, output_dir=None, filename=None):
+        """
+        将结果导出为JSON文件
+
+        Args:
+            data: 要导出的数据，ResultStore按字段名导出为对象列表，其他数据原样导出
+            output_dir: 输出目录，默认为当前目录下的results/exports
+            filename: 文件名，默认为自动生成
+
+        Returns:
+            str: 导出文件的路径，如果失败则返回None
+        """
+        try:
+            # 如果未指定输出目录，则使用默认目录
+            if not output_dir:
+                output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'results', 'exports')
+
+            # 确保输出目录存在
+            os.makedirs(output_dir, exist_ok=True)
+
+            # 如果未指定文件名，则自动生成
+            if not filename:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"fofa_results_{timestamp}.json"
+
+            # 确保文件名以.json结尾
+            if not filename.endswith('.json'):
+                filename += '.json'
+
+            # 完整的输出文件路径
+            output_file = os.path.join(output_dir, filename)
+
+            if isinstance(data, ResultStore):
+                data = [dict(zip(data.fields, row)) for row in data]
+            elif is_dataframe(data):
+                data = data.to_dict(orient='records')
+
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+            return output_file
+        except Exception as e:
+            print(f"导出JSON失败: {e}")
+            return None
+
     @staticmethod
     def format_fofa_results(results):
         """
@@ -114,6 +232,8 @@ class ResultExporter:
         Returns:
             pandas.DataFrame: 格式化后的结果
         """
+        import pandas as pd
+
         try:
             # 检查结果格式
             if not isinstance(results, dict) or "results" not in results:
@@ -124,7 +244,10 @@ class ResultExporter:
             fields = results.get("fields", ["host", "ip", "port", "protocol", "title", "domain", "server", "city"])
 
             # 创建DataFrame
-            df = pd.DataFrame(data, columns=fields)
+            if isinstance(data, ResultStore):
+                df = ResultExporter.to_dataframe(data)
+            else:
+                df = pd.DataFrame(data, columns=fields)
 
             return df
         except Exception as e:
@@ -0,0 +1,82 @@
+from utils.result_store import ResultStore
+
+"""
+联合检索结果合并：将FOFA和Quake的结果统一为相同字段，按(ip, port)去重并标记来源
+"""
+
+# 两个引擎统一使用的字段，与QuakeAPI.format_result的映射一致
+FIELDS = ["host", "ip", "port", "protocol", "title", "domain", "server", "city"]
+
+# 合并结果中额外添加的来源字段
+SOURCE_FIELD = "source"
+
+
+def normalize_rows(result):
+    """
+    将单个引擎的结果行转换为FIELDS顺序
+
+    Args:
+        result: 引擎返回的结果字典，fields缺省时视为FIELDS
+
+    Returns:
+        list: 按FIELDS顺序排列的结果行，值均为字符串
+    """
+    fields = result.get("fields", FIELDS)
+    index = {field: i for i, field in enumerate(fields)}
+    rows = []
+    for item in result.get("results", []):
+        if not isinstance(item, (list, tuple)):
+            item = [item]
+        rows.append([
+            str(item[index[field]]) if field in index and index[field] < len(item) else ""
+            for field in FIELDS
+        ])
+    return rows
+
+
+def merge_results(results):
+    """
+    合并多个引擎的结果，按(ip, port)去重
+
+    重复的结果保留先出现的一行，空字段用后出现的结果补全，来源合并为"FOFA+Quake"
+
+    Args:
+        results: (来源名称, 结果字典) 列表，出错的结果会被跳过并记录在errors中
+
+    Returns:
+        dict: 包含results（ResultStore）、fields、size、duplicates和errors的字典
+    """
+    merged = {}
+    errors = []
+    total = 0
+    for source, result in results:
+        if "error" in result and result["error"] is not False:
+            errors.append((source, str(result["error"])))
+            continue
+        total += result.get("size", 0)
+        for row in normalize_rows(result):
+            key = (row[1], row[2])
+            if not row[1]:
+                # 没有IP的结果无法去重，按主机名单独保留
+                key = (row[0], row[2])
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = row + [source]
+                continue
+            for i, value in enumerate(row):
+                if not existing[i] and value:
+                    existing[i] = value
+            if source not in existing[-1].split("+"):
+                existing[-1] = f"{existing[-1]}+{source}"
+
+    fields = FIELDS + [SOURCE_FIELD]
+    rows = ResultStore.from_rows(fields, merged.values())
+    fetched = sum(len(result.get("results", [])) for _, result in results
+                  if not ("error" in result and result["error"] is not False))
+    return {
+        "results": rows,
+        "fields": fields,
+        "size": total,
+        "duplicates": fetched - len(rows),
+        "errors": errors
+    }
@@ -0,0 +1,136 @@
+import threading
+
+"""
+共享的HTTP会话，所有对外请求复用同一个连接池（keep-alive），避免每次请求都重新建立TCP+TLS连接
+
+requests在第一次创建会话时才导入，启动时只需要设置连接池配置
+
+FOFA和Quake的检索请求通过async_http的aiohttp会话发送，连接池大小同样使用这里的配置，
+请求数和新建连接数通过record_async计入get_stats的统计
+
+这里的请求（账户信息、更新检查等）都是短请求，不支持取消
+"""
+
+# 默认连接池配置
+DEFAULT_POOL_CONNECTIONS = 10  # 缓存的主机连接池数量
+DEFAULT_POOL_MAXSIZE = 10      # 每个主机最多保持的连接数
+
+_lock = threading.Lock()
+_session = None
+_pool_connections = DEFAULT_POOL_CONNECTIONS
+_pool_maxsize = DEFAULT_POOL_MAXSIZE
+_request_count = 0
+# aiohttp会话的统计，主机 -> {"requests": 请求数, "connections": 新建的连接数}
+_async_hosts = {}
+
+
+def configure(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """
+    设置连接池大小，已创建的会话会被关闭并在下次使用时按新配置重建
+
+    Args:
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机的最大连接数，超出时请求会等待空闲连接
+    """
+    global _session, _pool_connections, _pool_maxsize
+    with _lock:
+        _pool_connections = max(1, int(pool_connections))
+        _pool_maxsize = max(1, int(pool_maxsize))
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_pool_config():
+    """获取当前连接池配置 (主机连接池数量, 每个主机的最大连接数)"""
+    with _lock:
+        return _pool_connections, _pool_maxsize
+
+
+def get_session():
+    """获取共享的requests会话，首次调用时创建"""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # pool_block=True 保证每个主机的连接数不会超过pool_maxsize
+            adapter = HTTPAdapter(
+                pool_connections=_pool_connections,
+                pool_maxsize=_pool_maxsize,
+                pool_block=True
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def request(method, url, **kwargs):
+    """通过共享会话发送请求，参数与requests.request一致"""
+    global _request_count
+    session = get_session()
+    with _lock:
+        _request_count += 1
+    return session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    """发送GET请求"""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """发送POST请求"""
+    return request("POST", url, **kwargs)
+
+
+def head(url, **kwargs):
+    """发送HEAD请求"""
+    return request("HEAD", url, **kwargs)
+
+
+def record_async(host, requests=0, connections=0):
+    """记录aiohttp会话发出的请求数和新建的连接数，由async_http的请求跟踪调用"""
+    with _lock:
+        item = _async_hosts.setdefault(host, {"requests": 0, "connections": 0})
+        item["requests"] += requests
+        item["connections"] += connections
+
+
+def get_stats():
+    """
+    获取连接复用统计，包括requests会话和aiohttp会话
+
+    Returns:
+        dict: requests为发出的请求数，connections为新建的连接数，reused为复用已有连接的请求数，
+              hosts为每个主机的明细
+    """
+    with _lock:
+        session = _session
+        total_requests = _request_count
+        hosts = {host: dict(item) for host, item in _async_hosts.items()}
+    total_requests += sum(item["requests"] for item in hosts.values())
+
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                item = hosts.setdefault(f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                                        {"requests": 0, "connections": 0})
+                item["requests"] += pool.num_requests
+                item["connections"] += pool.num_connections
+
+    connections = sum(item["connections"] for item in hosts.values())
+    pool_requests = sum(item["requests"] for item in hosts.values())
+    return {
+        "requests": total_requests,
+        "connections": connections,
+        "reused": max(0, pool_requests - connections),
+        "hosts": hosts
+    }
@@ -0,0 +1,157 @@
+import codecs
+import json
+
+"""
+增量JSON解析：边接收响应数据边解析顶层对象中的某个数组，每解析出一个元素就交给调用方，
+不需要等待完整响应，也不会一次性构建整个响应的对象树
+"""
+
+_WHITESPACE = " \t\r\n"
+
+# 已处理的数据超过该长度时压缩缓冲区
+_COMPACT_SIZE = 64 * 1024
+
+
+class ArrayStreamDecoder:
+    """
+    解析形如 {"key": value, ..., "<array_key>": [item, item, ...], ...} 的JSON对象
+
+    array_key对应数组中的元素通过feed逐个返回，其余顶层字段在fields中，
+    位于数组之前的字段（例如FOFA的size）在解析数组期间就可以读取
+    """
+
+    def __init__(self, array_key, encoding='utf-8'):
+        """
+        Args:
+            array_key: 需要逐个返回元素的顶层数组字段名
+            encoding: 响应编码
+        """
+        self.array_key = array_key
+        self.fields = {}
+        self.bytes_received = 0
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key = None
+
+    def feed(self, chunk):
+        """
+        输入一段响应数据
+
+        Args:
+            chunk: 响应数据（bytes）
+
+        Returns:
+            list: 本次新解析出的数组元素
+        """
+        self.bytes_received += len(chunk)
+        self._buffer += self._text_decoder.decode(chunk)
+        items = self._parse(final=False)
+        if self._pos > _COMPACT_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return items
+
+    def close(self):
+        """
+        结束输入，检查JSON是否完整
+
+        Returns:
+            dict: 数组以外的顶层字段
+
+        Raises:
+            ValueError: 数据不完整或格式错误
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        items = self._parse(final=True)
+        if items:
+            raise ValueError("关闭解析器时仍有未返回的元素")
+        if self._state != "done":
+            raise ValueError("响应JSON不完整")
+        return self.fields
+
+    def _skip_whitespace(self):
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode_value(self, final):
+        """
+        从当前位置解析一个完整的JSON值
+
+        Returns:
+            tuple: (是否成功, 值)，数据不足时返回(False, None)
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise ValueError("响应JSON格式错误")
+            return False, None
+        # 数字和true/false/null正好位于缓冲区末尾时可能还没有接收完整
+        if end == len(self._buffer) and not final and self._buffer[self._pos] not in '"{[':
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char):
+        """当前位置是char时跳过它，否则报错"""
+        if self._buffer[self._pos] != char:
+            raise ValueError(f"响应JSON格式错误: 位置{self._pos}处应为{char!r}")
+        self._pos += 1
+
+    def _parse(self, final):
+        items = []
+        while self._state != "done" and self._skip_whitespace():
+            char = self._buffer[self._pos]
+            if self._state == "start":
+                self._expect("{")
+                self._state = "key"
+            elif self._state == "key":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                ok, key = self._decode_value(final)
+                if not ok:
+                    break
+                self._key = key
+                self._state = "colon"
+            elif self._state == "colon":
+                self._expect(":")
+                self._state = "value"
+            elif self._state == "value":
+                if self._key == self.array_key and char == "[":
+                    self._pos += 1
+                    self._state = "items"
+                    continue
+                ok, value = self._decode_value(final)
+                if not ok:
+                    break
+                self.fields[self._key] = value
+                self._state = "next"
+            elif self._state == "items":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "next"
+                    continue
+                if char == ",":
+                    self._pos += 1
+                    continue
+                ok, item = self._decode_value(final)
+                if not ok:
+                    break
+                items.append(item)
+            elif self._state == "next":
+                if char == ",":
+                    self._pos += 1
+                    self._state = "key"
+                else:
+                    self._expect("}")
+                    self._state = "done"
+        return items
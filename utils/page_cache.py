@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+"""
+分页结果的内存缓存，按查询条件保存已浏览和预取的页面，翻页时直接读取
+
+与query_cache不同，这里保存的是已转换为列式容器的结果，只在本次运行中有效，
+按占用的内存大小淘汰最久未使用的页面
+"""
+
+
+class PageCache:
+    """线程安全的分页结果缓存"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: 缓存结果占用内存的上限（字节），超出时淘汰最久未使用的页面
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()  # (查询键, 页码) -> (结果, 字节数)
+        self._bytes = 0
+
+    @staticmethod
+    def make_key(mode, query, region, size):
+        """根据搜索模式、查询语句、地区和每页数量生成查询键"""
+        raw = json.dumps([mode, query, region or "", size], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def estimate_bytes(result):
+        """估算结果占用的内存大小"""
+        rows = result.get("results")
+        if hasattr(rows, "nbytes"):
+            return rows.nbytes()
+        return len(json.dumps(rows or [], ensure_ascii=False).encode('utf-8'))
+
+    def get(self, query_key, page):
+        """
+        读取缓存的页面
+
+        Returns:
+            dict: 缓存的结果，不存在时返回None
+        """
+        with self._lock:
+            entry = self._pages.get((query_key, page))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end((query_key, page))
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, query_key, page):
+        """判断页面是否已缓存，不影响命中统计和淘汰顺序"""
+        with self._lock:
+            return (query_key, page) in self._pages
+
+    def put(self, query_key, page, result):
+        """写入页面，并淘汰超出内存上限的页面"""
+        size = self.estimate_bytes(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._pages.pop((query_key, page), None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._pages[(query_key, page)] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._pages:
+                _, (_, evicted) = self._pages.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
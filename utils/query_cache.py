@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+"""
+查询结果缓存，保存在SQLite数据库中，支持过期时间和按最近使用时间淘汰
+
+程序中FOFA和Quake共用一个缓存（init_shared_cache），配置页修改的设置通过configure立即生效
+"""
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'results', 'cache', 'query_cache.db')
+
+
+class QueryCache:
+    """线程安全的查询结果缓存"""
+
+    def __init__(self, db_file=DEFAULT_CACHE_FILE, ttl=86400, max_bytes=200 * 1024 * 1024, enabled=True):
+        """
+        Args:
+            db_file: 缓存数据库路径
+            ttl: 缓存有效期（秒）
+            max_bytes: 缓存总大小上限（字节），超出时淘汰最久未使用的记录
+            enabled: 是否启用，未启用时读取总是未命中，也不写入
+        """
+        self.db_file = db_file
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_cache (
+                key TEXT PRIMARY KEY,
+                engine TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL,
+                value TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_cache_accessed ON query_cache (accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(engine, query, region, page, size, fields):
+        """根据引擎、最终查询语句、地区、页码、每页数量和字段生成缓存键"""
+        raw = json.dumps([engine, query, region or "", page, size, fields], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def configure(self, enabled=None, ttl=None, max_bytes=None):
+        """
+        修改缓存设置，立即生效，缩短有效期或降低大小上限时会立即淘汰超出的记录
+
+        Args:
+            enabled: 是否启用，None表示不修改
+            ttl: 缓存有效期（秒），None表示不修改
+            max_bytes: 缓存总大小上限（字节），None表示不修改
+        """
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if ttl is not None:
+                self.ttl = ttl
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+            self._conn.commit()
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Returns:
+            dict: 缓存的查询结果，不存在、已过期或未启用时返回None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created, value FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE query_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, key, engine, result):
+        """写入缓存，并淘汰超出大小上限的记录"""
+        if not self.enabled:
+            return
+        value = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (key, engine, created, accessed, size, value) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, engine, now, now, len(value), value)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """删除过期记录，并按最近使用时间淘汰直到总大小不超过上限，调用方需持有锁"""
+        self._conn.execute("DELETE FROM query_cache WHERE created < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM query_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM query_cache ORDER BY accessed").fetchall():
+            self._conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM query_cache")
+            self._conn.commit()
+
+    def get_stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: 命中次数、未命中次数、命中率、记录数和总大小
+        """
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM query_cache"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": total
+            }
+
+
+_shared_lock = threading.Lock()
+_shared = None
+
+
+def init_shared_cache(enabled=True, ttl=86400, max_bytes=200 * 1024 * 1024):
+    """
+    创建程序共用的缓存，已创建时按参数修改设置
+
+    Returns:
+        QueryCache: 共用的缓存
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = QueryCache(ttl=ttl, max_bytes=max_bytes, enabled=enabled)
+            return _shared
+    _shared.configure(enabled, ttl, max_bytes)
+    return _shared
+
+
+def get_shared_cache():
+    """获取程序共用的缓存，尚未创建时返回None"""
+    return _shared
+
+
+def configure(enabled, ttl, max_bytes):
+    """修改共用缓存的设置，立即生效，尚未创建时不做任何事情（创建时会读取配置）"""
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.configure(enabled, ttl, max_bytes)
@@ -0,0 +1,117 @@
+import threading
+import time
+
+"""
+API额度跟踪：定期从账户信息接口获取剩余额度，并在每次请求后扣减本地估算值，
+批量检索前据此判断额度是否足够
+
+额度统一为两种: requests为剩余查询次数，rows为剩余可获取的数据条数（Quake为积分，按返回条数扣除），
+引擎不限制的项为None
+"""
+
+ENGINE_NAMES = {"fofa": "FOFA", "quake": "Quake"}
+
+_lock = threading.Lock()
+_accounts = {}  # 引擎 -> 最近一次从接口获取的剩余额度
+_used = {}  # 引擎 -> 获取额度之后本地记录的消耗
+_updated = {}  # 引擎 -> 获取额度的时间
+
+
+def update(engine, remaining):
+    """
+    设置从账户信息接口获取的剩余额度，并清空之前记录的消耗
+
+    Args:
+        engine: 引擎名称，fofa或quake
+        remaining: 包含requests和rows的字典，值为None表示不限制
+    """
+    with _lock:
+        _accounts[engine] = {"requests": remaining.get("requests"), "rows": remaining.get("rows")}
+        _used[engine] = {"requests": 0, "rows": 0}
+        _updated[engine] = time.time()
+
+
+def record(engine, requests=0, rows=0):
+    """记录一次请求的消耗"""
+    with _lock:
+        used = _used.setdefault(engine, {"requests": 0, "rows": 0})
+        used["requests"] += requests
+        used["rows"] += rows
+
+
+def get_remaining(engine):
+    """
+    获取估算的剩余额度
+
+    Returns:
+        dict: requests和rows的剩余值，未获取过额度时返回None
+    """
+    with _lock:
+        account = _accounts.get(engine)
+        if account is None:
+            return None
+        used = _used.get(engine, {"requests": 0, "rows": 0})
+        return {key: None if value is None else max(0, value - used[key])
+                for key, value in account.items()}
+
+
+def can_afford(engine, requests=0, rows=0):
+    """判断剩余额度是否足够，未获取过额度时视为足够"""
+    remaining = get_remaining(engine)
+    if remaining is None:
+        return True
+    for key, cost in (("requests", requests), ("rows", rows)):
+        if remaining[key] is not None and remaining[key] < cost:
+            return False
+    return True
+
+
+def affordable_count(engine, costs):
+    """
+    按顺序累计每项任务的消耗，计算剩余额度够完成前几项
+
+    Args:
+        engine: 引擎名称
+        costs: (请求次数, 数据条数) 列表
+
+    Returns:
+        int: 额度足够完成的任务数
+    """
+    remaining = get_remaining(engine)
+    if remaining is None:
+        return len(costs)
+    total_requests = 0
+    total_rows = 0
+    for count, (requests, rows) in enumerate(costs):
+        total_requests += requests
+        total_rows += rows
+        if ((remaining["requests"] is not None and total_requests > remaining["requests"])
+                or (remaining["rows"] is not None and total_rows > remaining["rows"])):
+            return count
+    return len(costs)
+
+
+def remaining_text(engine):
+    """生成单个引擎的剩余额度文本，未获取过额度时返回空字符串"""
+    remaining = get_remaining(engine)
+    if remaining is None:
+        return ""
+    parts = []
+    if engine == "quake":
+        if remaining["rows"] is not None:
+            parts.append(f"积分 {remaining['rows']}")
+    else:
+        if remaining["requests"] is not None:
+            parts.append(f"查询 {remaining['requests']} 次")
+        if remaining["rows"] is not None:
+            parts.append(f"数据 {remaining['rows']} 条")
+    if not parts:
+        return ""
+    return f"{ENGINE_NAMES.get(engine, engine)}剩余{'，'.join(parts)}"
+
+
+def status_text():
+    """生成所有引擎的剩余额度文本，用于状态栏显示"""
+    with _lock:
+        engines = list(_accounts.keys())
+    return " | ".join(text for text in (remaining_text(engine) for engine in engines) if text)
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+"""
+令牌桶限速器，每个搜索引擎共用一个，多个请求并发时也能保证总体请求频率不超过限制
+"""
+
+# 默认限速配置: 每秒请求数, 桶容量(允许的突发请求数)
+DEFAULT_LIMITS = {
+    "fofa": (2.0, 2),
+    "quake": (1.0, 1)
+}
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate: 每秒生成的令牌数，即平均每秒允许的请求数
+            capacity: 桶容量，空闲时最多积累的令牌数
+        """
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        预订一个令牌
+
+        Returns:
+            float: 需要等待的秒数，令牌充足时为0
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 令牌不足时允许欠账，后来的请求依次排在后面，保证按速率精确放行
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire_async(self):
+        """获取一个令牌，不足时等待，等待期间不阻塞事件循环，任务取消时立即结束"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_lock = threading.Lock()
+_limiters = {}
+
+
+def configure(engine, rate, capacity):
+    """设置指定引擎的限速，会替换已有的限速器"""
+    with _lock:
+        _limiters[engine] = TokenBucket(rate, capacity)
+
+
+def get_limiter(engine):
+    """获取指定引擎的限速器，未配置时使用默认限速"""
+    with _lock:
+        limiter = _limiters.get(engine)
+        if limiter is None:
+            rate, capacity = DEFAULT_LIMITS.get(engine, (1.0, 1))
+            limiter = TokenBucket(rate, capacity)
+            _limiters[engine] = limiter
+        return limiter
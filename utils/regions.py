@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+"""
+省份/城市名称对照表，首次使用时从data/regions.json加载，之后按名称O(1)查找
+"""
+
+REGION_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'regions.json')
+
+_lock = threading.Lock()
+_table = None
+
+
+def _load():
+    """加载对照表，只在第一次调用时读取文件"""
+    global _table
+    with _lock:
+        if _table is None:
+            provinces = {}
+            cities = {}
+            try:
+                with open(REGION_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for region in data.get("regions", []):
+                    province = region["province"]
+                    provinces[province] = [city["name"] for city in region.get("cities", [])]
+                    for city in region.get("cities", []):
+                        # 同名城市的拼音相同，保留第一个即可
+                        cities.setdefault(city["name"], dict(city, province=province))
+                version = data.get("version", 0)
+            except Exception as e:
+                print(f"加载地区对照表失败: {e}")
+                version = 0
+            _table = {"version": version, "provinces": provinces, "cities": cities}
+        return _table
+
+
+def pinyin_name(name):
+    """
+    使用pypinyin将城市名转换为FOFA使用的拼音形式，去掉末尾的"市"、"区"等后缀
+
+    只有对照表中没有的名称才会用到，pypinyin在这里才导入，避免启动时加载其词典
+    """
+    from pypinyin import pinyin, Style
+
+    trans_list = []
+    for syllables in pinyin(name[:-1], style=Style.NORMAL):
+        for syllable in syllables:
+            trans_list.append(syllable.capitalize())
+    return ''.join(trans_list)
+
+
+def get_version():
+    """获取对照表版本号"""
+    return _load()["version"]
+
+
+def get_china_regions():
+    """
+    获取省份及其下属城市
+
+    Returns:
+        dict: 省份名称到城市名称列表的映射，顺序与对照表一致
+    """
+    return _load()["provinces"]
+
+
+def get_city(name):
+    """获取城市的对照信息，包含name、province、fofa和quake，不存在时返回None"""
+    return _load()["cities"].get(name)
+
+
+def to_fofa(name):
+    """将中文城市名转换为FOFA检索使用的形式"""
+    city = get_city(name)
+    if city is not None:
+        return city["fofa"]
+    return pinyin_name(name)
+
+
+def to_quake(name):
+    """将中文城市名转换为Quake检索使用的形式"""
+    city = get_city(name)
+    if city is not None:
+        return city["quake"]
+    return name
@@ -0,0 +1,279 @@
+import re
+import threading
+from array import array
+
+from utils.result_store import DictColumn
+
+"""
+查询结果的列索引，用于在已加载的结果中快速筛选和排序
+
+标题、服务器、域名等文本字段建立分词倒排索引，端口、协议、城市等取值较少的字段建立哈希索引。
+两种索引都只保存 键 -> 行号列表，不需要逐行比较：分词索引在键中查找包含关键字的词，
+哈希索引按整个值精确查找（port:80 不匹配 8080），多个部分组成的值（如“中国 浙江 杭州”）每一部分也可以精确查找。
+IP、主机等没有索引的字段逐行查找，单独的关键字同时匹配已索引和没有索引的字段。
+结果容器追加行后，下次查询时只为新增的行建立索引。
+"""
+
+# 建立分词倒排索引的字段
+TOKEN_FIELDS = {"title", "server", "domain"}
+
+# 建立哈希索引的字段
+HASH_FIELDS = {"port", "protocol", "city", "country", "province", "os", "source", "change", "指纹系统名称"}
+
+# 英文和数字连续字符为一个词，中文连续字符为一个词
+TOKEN_PATTERN = re.compile(r"[0-9a-z_\-]+|[\u4e00-\u9fff]+")
+
+# 哈希索引中值的各部分之间的分隔符
+VALUE_SEPARATOR = re.compile(r"[\s,，]+")
+
+# 筛选条件，字段:关键字 或 单独的关键字，关键字可以用引号包含空格
+CONDITION_PATTERN = re.compile(r'(?:([^\s:：]+)[:：])?(?:"([^"]*)"|(\S+))')
+
+
+def tokenize(text):
+    """将文本转为小写并分词"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def hash_keys(value):
+    """哈希索引的键：小写的整个值，以及按空格和逗号分隔的每一部分"""
+    value = value.lower()
+    keys = {part for part in VALUE_SEPARATOR.split(value) if part}
+    keys.add(value)
+    return keys
+
+
+def parse_filter(text, aliases=None):
+    """
+    解析筛选文本
+
+    Examples:
+        'server:nginx city:杭州 登录' -> [("server", "nginx"), ("city", "杭州"), (None, "登录")]
+
+    Args:
+        text: 筛选文本，多个条件之间为“并且”关系
+        aliases: 字段别名（如中文表头）到字段名的映射
+
+    Returns:
+        list: (字段名, 关键字) 列表，字段名为None时匹配所有已索引的字段
+    """
+    aliases = aliases or {}
+    conditions = []
+    for field, quoted, word in CONDITION_PATTERN.findall(text):
+        term = (quoted if quoted else word).strip().lower()
+        if not term:
+            continue
+        if field:
+            field = aliases.get(field, aliases.get(field.lower(), field))
+        conditions.append((field or None, term))
+    return conditions
+
+
+class ColumnIndex:
+    """单列索引，保存 键 -> 行号列表"""
+    __slots__ = ("tokenized", "postings", "indexed")
+
+    def __init__(self, tokenized):
+        """
+        Args:
+            tokenized: True为分词倒排索引，False为按整个值建立的哈希索引
+        """
+        self.tokenized = tokenized
+        self.postings = {}
+        self.indexed = 0  # 已建立索引的行数
+
+    def update(self, column, end):
+        """为[indexed, end)范围内的行建立索引"""
+        postings = self.postings
+        # 服务器等字段重复值较多，相同的值只分词一次
+        cache = {}
+        for row in range(self.indexed, end):
+            value = column[row]
+            keys = cache.get(value)
+            if keys is None:
+                keys = cache[value] = set(tokenize(value)) if self.tokenized else hash_keys(value)
+            for key in keys:
+                rows = postings.get(key)
+                if rows is None:
+                    rows = postings[key] = array('I')
+                rows.append(row)
+        self.indexed = max(self.indexed, end)
+
+    def match(self, term, column):
+        """
+        查找匹配关键字的行，分词索引查找包含关键字的值，哈希索引查找等于关键字的值
+
+        Args:
+            term: 小写关键字
+            column: 对应的列，关键字包含多个词时用于核对原值
+
+        Returns:
+            set: 匹配的行号
+        """
+        if not self.tokenized:
+            return set(self.postings.get(term, ()))
+
+        words = tokenize(term)
+        if not words:
+            return set()
+        rows = None
+        for word in words:
+            matched = self._union(key for key in self.postings if word in key)
+            rows = matched if rows is None else rows & matched
+            if not rows:
+                return set()
+        if len(words) > 1 or words[0] != term:
+            # 关键字包含多个词或标点时，核对原值中是否包含完整的关键字
+            rows = {row for row in rows if term in column[row].lower()}
+        return rows
+
+    def _union(self, keys):
+        rows = set()
+        for key in keys:
+            rows.update(self.postings[key])
+        return rows
+
+
+class ResultIndex:
+    """
+    结果容器的索引，线程安全，可以在后台线程中建立和查询
+
+    所有方法只读取结果容器，不修改
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store: ResultStore结果容器
+        """
+        self.store = store
+        self._lock = threading.Lock()
+        self.indexes = {}
+        for col, field in enumerate(store.fields):
+            if field in TOKEN_FIELDS:
+                self.indexes[col] = ColumnIndex(tokenized=True)
+            elif field in HASH_FIELDS:
+                self.indexes[col] = ColumnIndex(tokenized=False)
+        self._sort_keys = {}  # 列号 -> (行数, 排序键)
+
+    def build(self, count=None):
+        """为前count行建立索引，默认为结果容器当前的全部行，可以在显示结果后提前在后台调用"""
+        count = len(self.store) if count is None else count
+        with self._lock:
+            self.update(count)
+
+    def update(self, count):
+        """为前count行建立索引，调用前需要持有锁"""
+        for col, index in self.indexes.items():
+            if index.indexed < count:
+                index.update(self.store.columns[col], count)
+
+    def invalidate(self, field):
+        """结果容器中该字段的值被修改后调用，下次查询时重新建立该字段的索引"""
+        if field not in self.store.fields:
+            return
+        col = self.store.fields.index(field)
+        with self._lock:
+            if col in self.indexes:
+                self.indexes[col] = ColumnIndex(self.indexes[col].tokenized)
+            self._sort_keys.pop(col, None)
+
+    def match(self, field, term, count):
+        """
+        查找前count行中指定字段匹配关键字的行
+
+        Args:
+            field: 字段名，为None时匹配任意字段
+            term: 小写关键字
+            count: 参与查找的行数
+
+        Returns:
+            set: 匹配的行号
+        """
+        store = self.store
+        if field is None:
+            rows = set()
+            for col in range(len(store.fields)):
+                rows |= self._match_column(col, term, count)
+            return rows
+        if field not in store.fields:
+            return set()
+        return self._match_column(store.fields.index(field), term, count)
+
+    def _match_column(self, col, term, count):
+        index = self.indexes.get(col)
+        if index is not None:
+            return index.match(term, self.store.columns[col])
+        # 没有索引的字段（IP、主机等）逐行查找包含关键字的值
+        column = self.store.columns[col]
+        return {row for row in range(count) if term in column[row].lower()}
+
+    def sort_keys(self, col, count):
+        """
+        生成前count行指定列的排序键，结果容器没有变化时重复使用
+
+        字典编码列先对不重复的值排序，每行只查一次排名；全部为数字的列按数值排序
+        """
+        cached = self._sort_keys.get(col)
+        if cached is not None and cached[0] == count:
+            return cached[1]
+
+        column = self.store.columns[col]
+        if isinstance(column, DictColumn):
+            values = column.values
+            ranked = sorted(range(len(values)), key=lambda code: self._value_key(values[code]))
+            rank = [0] * len(values)
+            for position, code in enumerate(ranked):
+                rank[code] = position
+            codes = column.codes
+            keys = [rank[codes[row]] for row in range(count)]
+        else:
+            values = [column[row] for row in range(count)]
+            if all(value.isdigit() for value in values if value):
+                keys = [int(value) if value else -1 for value in values]
+            else:
+                keys = values
+        self._sort_keys[col] = (count, keys)
+        return keys
+
+    @staticmethod
+    def _value_key(value):
+        return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+    def query(self, conditions, sort_col=None, descending=False, count=None):
+        """
+        筛选并排序
+
+        Args:
+            conditions: parse_filter返回的条件列表，多个条件之间为“并且”关系
+            sort_col: 排序的列号，为None时保持原始顺序
+            descending: 是否降序
+            count: 参与查询的行数，默认为结果容器当前的行数
+
+        Returns:
+            list: 按显示顺序排列的行号，没有筛选和排序条件时返回None
+        """
+        count = len(self.store) if count is None else count
+        if not conditions and sort_col is None:
+            return None
+
+        with self._lock:
+            if conditions:
+                self.update(count)
+                rows = None
+                for field, term in conditions:
+                    matched = self.match(field, term, count)
+                    rows = matched if rows is None else rows & matched
+                    if not rows:
+                        break
+                rows = [row for row in rows if row < count]
+            else:
+                rows = range(count)
+
+            if sort_col is None:
+                return sorted(rows)
+            keys = self.sort_keys(sort_col, count)
+            if conditions:
+                # 先按行号排序，保证排序键相同时保持原始顺序
+                rows = sorted(rows)
+            return sorted(rows, key=keys.__getitem__, reverse=descending)
@@ -0,0 +1,180 @@
+from array import array
+
+"""
+按列存储的查询结果容器
+
+重复较多的字段（协议、服务器、城市、指纹名称等）使用字典编码，每行只保存一个整数编号；
+其余字符串字段以UTF-8字节拼接在一个bytearray中，按偏移量读取。
+按行访问时返回RowView，不复制数据。
+"""
+
+# 使用字典编码的字段，这些字段的取值种类少、重复多
+DICT_ENCODED_FIELDS = {"port", "protocol", "server", "city", "country", "province", "os",
+                       "source", "change", "指纹系统名称"}
+
+
+class DictColumn:
+    """字典编码列，相同的值只保存一份"""
+    __slots__ = ("codes", "values", "lookup")
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values = []
+        self.lookup = {}
+
+    def encode(self, value):
+        """获取值的编号，新值追加到字典中"""
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def nbytes(self):
+        """估算占用的字节数"""
+        return (self.codes.itemsize * len(self.codes)
+                + sum(len(value.encode('utf-8')) for value in self.values))
+
+
+class StringColumn:
+    """字符串列，所有值拼接在同一个bytearray中，offsets记录每个值的结束位置"""
+    __slots__ = ("data", "offsets")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q')
+
+    def append(self, value):
+        self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.offsets)
+        start = self.offsets[index - 1] if index > 0 else 0
+        return self.data[start:self.offsets[index]].decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def nbytes(self):
+        """估算占用的字节数"""
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class RowView:
+    """结果行视图，按需从各列读取值，行为与只读列表一致"""
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return [self.store.columns[i][self.index] for i in range(*col.indices(len(self.store.columns)))]
+        return self.store.columns[col][self.index]
+
+    def __len__(self):
+        return len(self.store.columns)
+
+    def __iter__(self):
+        for column in self.store.columns:
+            yield column[self.index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def to_list(self):
+        """复制为列表"""
+        return list(self)
+
+
+class ResultStore:
+    """列式结果容器，界面显示、导出和批量合并共用"""
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields: 字段名列表，决定列的顺序
+        """
+        self.fields = list(fields)
+        self.columns = [DictColumn() if field in DICT_ENCODED_FIELDS else StringColumn()
+                        for field in self.fields]
+
+    @classmethod
+    def from_rows(cls, fields, rows, prefix=()):
+        """由结果行创建容器，prefix为每行前面额外添加的值"""
+        store = cls(fields)
+        store.extend(rows, prefix)
+        return store
+
+    def append(self, row, prefix=()):
+        """
+        追加一行，值统一转换为字符串，缺少的列补空字符串
+
+        Args:
+            row: 结果行
+            prefix: 添加在行首的值，例如批量检索时的指纹名称
+        """
+        values = list(prefix) + list(row) if prefix else row
+        count = len(values)
+        for i, column in enumerate(self.columns):
+            value = values[i] if i < count else ""
+            column.append(value if isinstance(value, str) else str(value))
+
+    def extend(self, rows, prefix=()):
+        """追加多行"""
+        for row in rows:
+            self.append(row, prefix)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RowView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("行号超出范围")
+        return RowView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield RowView(self, index)
+
+    def value(self, row, col):
+        """读取单个值"""
+        return self.columns[col][row]
+
+    def column(self, field):
+        """读取整列的值"""
+        column = self.columns[self.fields.index(field)]
+        return [column[i] for i in range(len(column))]
+
+    def to_columns(self):
+        """
+        转换为字段名到值列表的字典，用于创建DataFrame
+
+        Returns:
+            dict: 按字段顺序排列的列数据
+        """
+        return {field: self.column(field) for field in self.fields}
+
+    def nbytes(self):
+        """估算数据占用的字节数"""
+        return sum(column.nbytes() for column in self.columns)
@@ -0,0 +1,206 @@
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+
+from utils import cancel
+
+"""
+搜索请求的重试策略：指数退避加随机抖动，支持Retry-After，并区分可重试错误和致命错误
+
+重试在协程中执行（见utils.async_http），调用方的任务已取消时（见utils.cancel）不再重试，返回表示已取消的结果
+"""
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 重试也无法恢复的HTTP状态码（凭证无效、无权限）
+FATAL_STATUS = {401, 403}
+
+# 表示需要停止检索的错误码（凭证无效、无API权限、F点或积分不足），FOFA的错误码在errmsg开头的方括号中，
+# Quake的错误码在响应的code字段中；只有出现在这里的错误码才会中止整个批量检索
+FATAL_CODES = {
+    "-700",    # FOFA: Account Invalid
+    "-701",    # FOFA: API Key错误
+    "820031",  # FOFA: F点余额不足
+    "u3004",   # Quake: Token无效
+    "u3009",   # Quake: 无API调用权限
+    "u3011",   # Quake: 积分不足
+    "t6003",   # Quake: API鉴权失败
+}
+
+# 没有错误码时，与这些完整错误信息相同的错误也需要停止检索
+FATAL_MESSAGES = {"Account Invalid", "账号无效", "F点余额不足", "积分不足", "用户积分不足", "余额不足"}
+
+# 表示稍后重试即可恢复的错误码（频率限制）
+RETRYABLE_CODES = {"u3015"}
+
+# 错误信息中表示稍后重试即可恢复的关键字（频率限制、服务繁忙）
+RETRYABLE_KEYWORDS = ("频率", "过快", "频繁", "繁忙", "稍后", "超时", "too many", "Too Many",
+                      "Time Out", "timeout")
+
+
+class RetryPolicy:
+    """重试策略"""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0):
+        """
+        Args:
+            max_attempts: 最多尝试次数（包含第一次请求）
+            base_delay: 第一次重试前的基础等待秒数，之后每次翻倍
+            max_delay: 单次等待的最长秒数
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+
+    def delay(self, attempt, retry_after=None):
+        """
+        计算第attempt次失败后的等待时间
+
+        Args:
+            attempt: 已经失败的次数，从1开始
+            retry_after: 服务端通过Retry-After要求的等待秒数
+
+        Returns:
+            float: 等待秒数
+        """
+        backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        # 抖动，避免多个线程同时重试
+        delay = random.uniform(backoff / 2, backoff)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头
+
+    Returns:
+        float: 等待秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def split_error(message):
+    """
+    拆分错误信息中的错误码，例如"[-700] Account Invalid"拆分为("-700", "Account Invalid")，
+    带有说明前缀的信息只保留最后一段，例如"API返回错误: 积分不足"拆分为(None, "积分不足")
+
+    Returns:
+        tuple: (错误码, 错误信息)，没有错误码时错误码为None
+    """
+    text = str(message).rsplit(": ", 1)[-1].strip()
+    match = re.match(r"\[\s*([^\]]+?)\s*\]\s*(.*)", text)
+    if match:
+        return match.group(1), match.group(2).strip()
+    return None, text
+
+
+def classify(result):
+    """
+    根据错误信息中的错误码或完整的错误信息标记结果是否可重试或致命，已标记过的结果保持不变
+
+    Returns:
+        dict: 传入的result
+    """
+    error = result.get("error")
+    if not error or "retryable" in result or "fatal" in result:
+        return result
+
+    message = str(error)
+    code, text = split_error(message)
+    if code in FATAL_CODES or text in FATAL_MESSAGES:
+        result["fatal"] = True
+    elif code in RETRYABLE_CODES or any(keyword in message for keyword in RETRYABLE_KEYWORDS):
+        result["retryable"] = True
+    return result
+
+
+def _is_cancelled(result):
+    """请求因任务取消而失败"""
+    return "error" in result and result["error"] is not False and cancel.is_cancelled()
+
+
+def _finish(result):
+    """去掉重试用的内部标记"""
+    result.pop("retryable", None)
+    result.pop("retry_after", None)
+    return result
+
+
+async def run_with_retry(attempt, policy=None):
+    """
+    执行请求，失败且可重试时按策略等待后重试
+
+    Args:
+        attempt: 执行一次请求的函数，返回协程，协程的结果为结果字典，可重试的错误需带有retryable标记
+        policy: 重试策略，默认使用RetryPolicy()
+
+    Returns:
+        dict: 最后一次请求的结果
+    """
+    policy = policy or RetryPolicy()
+    for count in range(1, policy.max_attempts + 1):
+        if cancel.is_cancelled():
+            return cancel.cancelled_result()
+        result = await attempt()
+        if _is_cancelled(result):
+            return cancel.cancelled_result()
+        if not result.get("retryable") or count == policy.max_attempts:
+            return _finish(result)
+        wait = policy.delay(count, result.get("retry_after"))
+        print(f"请求失败，{wait:.1f}秒后重试({count}/{policy.max_attempts - 1}): {result.get('error')}")
+        # 任务取消时等待中的协程会被取消
+        await asyncio.sleep(wait)
+
+
+async def iter_with_retry(attempt, policy=None):
+    """
+    run_with_retry的异步生成器版本，用于流式返回结果的请求
+
+    attempt返回一个异步生成器，正常时逐批产出结果字典，出错时产出一个带error的结果字典后结束。
+    已经产出过数据的请求出错时不再重试，避免调用方收到重复的数据
+
+    Yields:
+        dict: 每批结果，最后一项可能是出错的结果
+    """
+    policy = policy or RetryPolicy()
+    for count in range(1, policy.max_attempts + 1):
+        if cancel.is_cancelled():
+            yield cancel.cancelled_result()
+            return
+        delivered = False
+        failed = None
+        stream = attempt()
+        try:
+            async for result in stream:
+                if "error" in result and result["error"] is not False:
+                    failed = result
+                    break
+                delivered = True
+                yield result
+        finally:
+            await stream.aclose()
+        if failed is None:
+            return
+        if _is_cancelled(failed):
+            yield cancel.cancelled_result()
+            return
+        if delivered or not failed.get("retryable") or count == policy.max_attempts:
+            yield _finish(failed)
+            return
+        wait = policy.delay(count, failed.get("retry_after"))
+        print(f"请求失败，{wait:.1f}秒后重试({count}/{policy.max_attempts - 1}): {failed.get('error')}")
+        await asyncio.sleep(wait)
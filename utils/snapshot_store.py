@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.dedup import asset_key
+
+"""
+资产快照，保存在SQLite数据库中，按引擎、查询语句和地区记录上次检索的时间和每个资产的内容摘要，
+增量检索时与上次的快照比较，只保留新增或内容有变化的资产
+"""
+
+DEFAULT_SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'results', 'snapshots', 'snapshots.db')
+
+# 资产状态
+STATUS_NEW = "新增"
+STATUS_CHANGED = "变化"
+
+
+class SnapshotStore:
+    """线程安全的资产快照存储"""
+
+    def __init__(self, db_file=DEFAULT_SNAPSHOT_FILE):
+        """
+        Args:
+            db_file: 快照数据库路径
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                query_key TEXT PRIMARY KEY,
+                engine TEXT NOT NULL,
+                query TEXT NOT NULL,
+                last_run REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot_assets (
+                query_key TEXT NOT NULL,
+                asset_key TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (query_key, asset_key)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(engine, query, region):
+        """根据引擎、查询语句和地区生成快照键"""
+        raw = json.dumps([engine, query, region or ""], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_last_run(self, engine, query, region=""):
+        """
+        获取上次检索的时间
+
+        Returns:
+            float: 上次检索的时间戳，没有快照时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_run FROM snapshots WHERE query_key = ?",
+                (self.make_key(engine, query, region),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def diff_and_update(self, engine, query, region, fields, rows, run_time=None):
+        """
+        将本次结果与快照比较，并用本次结果更新快照
+
+        本次没有返回的资产保留在快照中，增量检索只返回最近更新的资产，不代表其他资产已下线
+
+        Args:
+            engine: 引擎名称
+            query: 查询语句（不含时间条件）
+            region: 地区
+            fields: 结果字段
+            rows: 本次检索的结果行
+            run_time: 本次检索开始的时间，默认为当前时间
+
+        Returns:
+            list: (结果行, 状态) 列表，只包含新增或有变化的资产
+        """
+        run_time = run_time or time.time()
+        query_key = self.make_key(engine, query, region)
+        host_col = fields.index("host") if "host" in fields else None
+        ip_col = fields.index("ip") if "ip" in fields else None
+        port_col = fields.index("port") if "port" in fields else None
+
+        changes = []
+        with self._lock:
+            known = dict(self._conn.execute(
+                "SELECT asset_key, digest FROM snapshot_assets WHERE query_key = ?", (query_key,)
+            ).fetchall())
+
+            updates = []
+            seen = set()
+            for row in rows:
+                key = "\n".join(asset_key(
+                    str(row[host_col]) if host_col is not None else "",
+                    str(row[ip_col]) if ip_col is not None else "",
+                    str(row[port_col]) if port_col is not None else ""
+                ))
+                # 同一次结果中重复出现的资产只比较第一条
+                if key in seen:
+                    continue
+                seen.add(key)
+                digest = hashlib.sha1(json.dumps(list(row), ensure_ascii=False).encode('utf-8')).hexdigest()
+                previous = known.get(key)
+                if previous == digest:
+                    continue
+                changes.append((row, STATUS_NEW if previous is None else STATUS_CHANGED))
+                known[key] = digest
+                updates.append((query_key, key, digest, run_time))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshot_assets (query_key, asset_key, digest, last_seen) "
+                "VALUES (?, ?, ?, ?)", updates
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (query_key, engine, query, last_run) VALUES (?, ?, ?, ?)",
+                (query_key, engine, query, run_time)
+            )
+            self._conn.commit()
+        return changes
+
+    def clear(self):
+        """清空所有快照"""
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshot_assets")
+            self._conn.execute("DELETE FROM snapshots")
+            self._conn.commit()
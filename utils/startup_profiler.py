@@ -0,0 +1,301 @@
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+"""
+启动耗时分析：记录每个模块的导入耗时、配置和指纹的加载耗时、各页面的创建耗时，
+启动完成后写入JSON报告
+
+启用方式（二选一）:
+    python main.py --profile-startup[=报告路径]
+    VRST_PROFILE_STARTUP=1 或 VRST_PROFILE_STARTUP=报告路径
+
+其他参数:
+    --profile-all-tabs  写入报告前创建全部选项卡的页面
+    --profile-exit      写入报告后退出程序，用于benchmarks/startup_bench.py
+
+模块导入耗时通过替换builtins.__import__统计，importlib.import_module直接导入的模块不在统计范围内。
+未启用时phase和mark不做任何事情，不影响正常启动。
+"""
+
+ENV_VAR = "VRST_PROFILE_STARTUP"
+FLAG_PROFILE = "--profile-startup"
+FLAG_ALL_TABS = "--profile-all-tabs"
+FLAG_EXIT = "--profile-exit"
+
+DEFAULT_REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'results', 'profile')
+
+_profiler = None
+
+
+class StartupProfiler:
+    """启动耗时记录器，时间均为相对启动开始的毫秒数"""
+
+    def __init__(self, start=None, report_file=None, all_tabs=False, exit_after_report=False):
+        """
+        Args:
+            start: 启动开始的time.perf_counter()值，默认为当前时间
+            report_file: 报告路径，默认为results/profile/startup_<时间>.json
+            all_tabs: 写入报告前是否创建全部选项卡的页面
+            exit_after_report: 写入报告后是否退出程序
+        """
+        self.start = start if start is not None else time.perf_counter()
+        self.report_file = report_file or os.path.join(
+            DEFAULT_REPORT_DIR, time.strftime("startup_%Y%m%d_%H%M%S.json"))
+        self.all_tabs = all_tabs
+        self.exit_after_report = exit_after_report
+        self.imports = []
+        self.phases = []
+        self.marks = {}
+        self._local = threading.local()
+        self._original_import = None
+
+    def elapsed_ms(self, now=None):
+        """从启动开始到now的毫秒数"""
+        return ((now if now is not None else time.perf_counter()) - self.start) * 1000
+
+    def install_import_hook(self):
+        """开始统计模块导入耗时"""
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def remove_import_hook(self):
+        """停止统计模块导入耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        # 已导入的模块直接返回，不计时
+        if level == 0 and name in sys.modules:
+            module = sys.modules[name]
+            if not fromlist or all(item == '*' or hasattr(module, item) for item in fromlist):
+                return original(name, globals, locals, fromlist, level)
+
+        target = self._resolve_name(name, globals, level)
+        loaded_before = target in sys.modules
+        submodules = [f"{target}.{item}" for item in fromlist or ()
+                      if item != '*' and f"{target}.{item}" not in sys.modules]
+
+        # 栈中保存各层导入中子模块的累计耗时，用于计算模块自身的耗时
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        begin = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            end = time.perf_counter()
+            elapsed = end - begin
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            loaded = [] if loaded_before or target not in sys.modules else [target]
+            loaded += [module for module in submodules if module in sys.modules]
+            if loaded:
+                self.imports.append({
+                    "module": ", ".join(loaded),
+                    "start_ms": round(self.elapsed_ms(begin), 3),
+                    "cumulative_ms": round(elapsed * 1000, 3),
+                    "self_ms": round(max(0.0, elapsed - children) * 1000, 3),
+                    "depth": len(stack),
+                    "thread": threading.current_thread().name
+                })
+
+    @staticmethod
+    def _resolve_name(name, globals, level):
+        """将相对导入转换为完整的模块名"""
+        if level == 0:
+            return name
+        try:
+            package = (globals or {}).get('__package__') or (globals or {}).get('__name__', '')
+            return importlib.util.resolve_name('.' * level + name, package)
+        except (ImportError, ValueError):
+            return name
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append({
+                "name": name,
+                "start_ms": round(self.elapsed_ms(begin), 3),
+                "duration_ms": round((end - begin) * 1000, 3),
+                "thread": threading.current_thread().name
+            })
+
+    def mark(self, name):
+        """记录到达某个时间点的耗时，同名的时间点只记录第一次"""
+        self.marks.setdefault(name, round(self.elapsed_ms(), 3))
+
+    def report(self):
+        """
+        生成报告
+
+        Returns:
+            dict: 包含总耗时、时间点、阶段和模块导入耗时的报告
+        """
+        imports = sorted(self.imports, key=lambda item: item["cumulative_ms"], reverse=True)
+        return {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "qt_platform": os.environ.get("QT_QPA_PLATFORM", ""),
+            "total_ms": round(self.elapsed_ms(), 3),
+            "marks": dict(self.marks),
+            "phases": list(self.phases),
+            "imports": {
+                # 只累加最外层的导入，避免重复计算嵌套导入的耗时
+                "total_ms": round(sum(item["cumulative_ms"] for item in imports if item["depth"] == 0), 3),
+                "count": len(imports),
+                "modules": imports
+            }
+        }
+
+    def write_report(self, path=None, report=None):
+        """
+        写入JSON报告
+
+        Args:
+            path: 报告路径，默认为创建时指定的路径
+            report: 已生成的报告，默认重新生成
+
+        Returns:
+            str: 报告路径，写入失败时返回None
+        """
+        path = path or self.report_file
+        report = report or self.report()
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"写入启动耗时报告失败: {e}")
+            return None
+        return path
+
+
+def parse_args(argv, environ=None):
+    """
+    从命令行参数和环境变量中读取启动分析的设置，并从argv中移除相关参数
+
+    Returns:
+        dict: 启动分析的设置，未启用时返回None
+    """
+    environ = os.environ if environ is None else environ
+    enabled = False
+    report_file = None
+    all_tabs = False
+    exit_after_report = False
+
+    value = environ.get(ENV_VAR, "").strip()
+    if value and value.lower() not in ("0", "false", "no"):
+        enabled = True
+        if value.lower() not in ("1", "true", "yes"):
+            report_file = value
+
+    remaining = []
+    for arg in argv:
+        if arg == FLAG_PROFILE:
+            enabled = True
+        elif arg.startswith(FLAG_PROFILE + "="):
+            enabled = True
+            report_file = arg.split("=", 1)[1] or report_file
+        elif arg == FLAG_ALL_TABS:
+            all_tabs = True
+        elif arg == FLAG_EXIT:
+            exit_after_report = True
+        else:
+            remaining.append(arg)
+    argv[:] = remaining
+
+    if not enabled:
+        return None
+    return {"report_file": report_file, "all_tabs": all_tabs, "exit_after_report": exit_after_report}
+
+
+def enable(start=None, report_file=None, all_tabs=False, exit_after_report=False):
+    """
+    启用启动分析并开始统计模块导入耗时，需要在导入其他模块之前调用
+
+    Returns:
+        StartupProfiler: 启动耗时记录器
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler(start, report_file, all_tabs, exit_after_report)
+        _profiler.install_import_hook()
+    return _profiler
+
+
+def enable_from_args(argv, start=None, environ=None):
+    """
+    按命令行参数和环境变量启用启动分析
+
+    Returns:
+        StartupProfiler: 启动耗时记录器，未启用时返回None
+    """
+    options = parse_args(argv, environ)
+    if options is None:
+        return None
+    return enable(start, **options)
+
+
+def get_profiler():
+    """获取启动耗时记录器，未启用时返回None"""
+    return _profiler
+
+
+def is_enabled():
+    """是否已启用启动分析"""
+    return _profiler is not None
+
+
+@contextmanager
+def phase(name):
+    """记录一个启动阶段的耗时，未启用时不做任何事情"""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.phase(name):
+        yield
+
+
+def mark(name):
+    """记录到达某个时间点的耗时，未启用时不做任何事情"""
+    if _profiler is not None:
+        _profiler.mark(name)
+
+
+def finish():
+    """
+    停止统计并写入报告，之后不再记录
+
+    Returns:
+        str: 报告路径，未启用或写入失败时返回None
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler = _profiler
+    profiler.remove_import_hook()
+    report = profiler.report()
+    path = profiler.write_report(report=report)
+    _profiler = None
+    if path:
+        print(f"启动耗时报告已写入 {path}，总耗时 {report['total_ms']:.0f} ms")
+    return path